@@ -9,6 +9,9 @@ import logging
 import json
 from time import sleep
 from .util.RequestHandler import RequestHandler
+from .util.RetryPolicy import RetryPolicy
+from .util.JsonCodec import JsonCodec
+from .util.Tracing import Tracing
 from .models.TaskResponse import TaskResponse
 from .models.AnaplanVersion import AnaplanVersion
 from .util.Util import MappingParameterError, UnknownTaskTypeError, RequestFailedError
@@ -67,6 +70,8 @@ class Action(object):
         mapping_params: Optional[dict],
     ):
         self._authorization = conn.authorization.token_value
+        if conn.transport is not None:
+            self._handler = conn.transport
         self._workspace = conn.workspace
         self._model = conn.model
         self._action_id = action_id
@@ -103,6 +108,14 @@ class Action(object):
         """Get the retry count"""
         return self._retry_count
 
+    @property
+    def retry_policy(self) -> RetryPolicy:
+        """Get the retry policy for creating the task. A task POST is not idempotent, so it is
+        only repeated when the server cannot have started the task."""
+        return RetryPolicy(
+            max_attempts=max(self._retry_count, 1), backoff_base=10, backoff_multiplier=1.5
+        )
+
     @property
     def mapping_params(self) -> dict:
         """If defined, get the mapping parameters"""
@@ -111,6 +124,32 @@ class Action(object):
         else:
             raise MappingParameterError("Unable to return empty mapping parameters.")
 
+    @property
+    def endpoint(self) -> str:
+        """Get the tasks endpoint of the Anaplan action
+
+        :raises UnknownTaskTypeError: Action ID prefix does not match any known action type
+        :return: API endpoint used to create and monitor tasks for the action
+        :rtype: str
+        """
+        if self._action_id[:3] not in self._action_type:
+            raise UnknownTaskTypeError(
+                f"Provided action ID {self._action_id} does not match any know action type"
+            )
+
+        return (
+            f"workspaces/{self._workspace}/models/{self._model}"
+            f"{self._action_type[self._action_id[:3]]}{self._action_id}/tasks"
+        )
+
+    def request_body(self) -> str:
+        """Get the JSON body sent when executing the action
+
+        :return: Serialized POST body
+        :rtype: str
+        """
+        return json.dumps(self.post_body)
+
     def execute(self) -> TaskResponse:
         """Triggers the specified action
 
@@ -123,15 +162,7 @@ class Action(object):
             "Content-Type": "application/json",
         }
 
-        if self._action_id[:3] not in self._action_type:
-            raise UnknownTaskTypeError(
-                f"Provided action ID {self._action_id} does not match any know action type"
-            )
-
-        endpoint = (
-            f"workspaces/{self._workspace}/models/{self._model}"
-            f"{self._action_type[self._action_id[:3]]}{self._action_id}/tasks"
-        )
+        endpoint = self.endpoint
 
         task_id = self.post_task(endpoint, post_header)
         return self.check_status(endpoint, task_id)
@@ -143,32 +174,24 @@ class Action(object):
         :type url: str
         :param post_header: Head for the POST request, containing the authorization and content type
         :type post_header: dict
+        :raises RequestFailedError: Task could not be created within the retry policy
         :return: Task ID for the executed action
         """
-        state = 0
-        sleep_time = 10
-        run_action = None
-
-        while state < self.retry_count:
-            try:
-                run_action = self._handler.make_request(
-                    url, "POST", data=json.dumps(self.post_body), headers=post_header
+        try:
+            with Tracing.span("anaplan.task_post", action_id=self.action_id):
+                run_action = JsonCodec.decode(
+                    self._handler.make_request(
+                        url,
+                        "POST",
+                        data=self.request_body(),
+                        headers=post_header,
+                        retry_policy=self.retry_policy,
+                        context={"operation": "task_post", "action_id": self.action_id},
+                    )
                 )
-            except Exception as e:
-                logger.error(f"Error running action {e}", exc_info=True)
-            if run_action.status_code == 200:
-                break
-            logger.debug(
-                f"Request failed, waiting {sleep_time} seconds before retrying."
-            )
-            state += 1
-            sleep_time *= 1.5
-            sleep(sleep_time)
-
-        run_action = run_action.json()
-
-        if state > self.retry_count:
-            raise RequestFailedError(f"Unable to execute {self.action_id}")
+        except Exception as e:
+            logger.error(f"Error running action {e}", exc_info=True)
+            raise RequestFailedError(f"Unable to execute {self.action_id}: {e}")
 
         if "task" not in run_action or "taskId" not in run_action["task"]:
             raise ValueError("Unable to fetch task ID.")
@@ -191,23 +214,34 @@ class Action(object):
         }
         status = ""
         status_url = f"{url}/{task_id}"
+        poll = 0
 
         logger.debug("Checking task status.")
 
         while True:
+            poll += 1
             try:
-                get_status = self._handler.make_request(
-                    status_url, "GET", headers=post_header
-                ).json()
+                with Tracing.span("anaplan.task_poll", task_id=task_id, poll=poll) as span:
+                    response = self._handler.make_request(
+                        status_url,
+                        "GET",
+                        headers=post_header,
+                        context={
+                            "operation": "task_poll",
+                            "action_id": self.action_id,
+                            "task_id": task_id,
+                            "poll": poll,
+                        },
+                    )
+                    # Only the task state is decoded while polling, the full results once complete
+                    status = JsonCodec.task_state(response.content) or status
+                    span.set_attribute("task_state", status)
             except Exception as e:
                 logger.error(f"Error getting result for task {e}", exc_info=True)
                 raise Exception(f"Error getting result for task {e}")
 
-            if "task" in get_status and "taskState" in get_status["task"]:
-                status = get_status["task"]["taskState"]
-
             if status == "COMPLETE":
-                results = get_status["task"]
+                results = JsonCodec.decode(response)["task"]
                 logger.info("Task completed")
                 break
             sleep(1)  # Wait 1 second before continuing loop
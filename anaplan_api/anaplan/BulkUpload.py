@@ -0,0 +1,115 @@
+from __future__ import annotations
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from time import monotonic
+from typing import TYPE_CHECKING, Dict, Mapping, Optional, Union
+from .FileUpload import FileUpload
+from .Resources import Resources
+from .ResourceParserFile import ResourceParserFile
+from .StreamUpload import StreamUpload
+from .UploadLimits import UploadLimits
+from .UploadSource import PathSource, UploadSource
+from .models.FileUploadResult import FileUploadResult
+from .util.Tracing import Tracing
+
+if TYPE_CHECKING:
+    from .models.AnaplanConnection import AnaplanConnection
+    from .models.AnaplanResourceFile import AnaplanResourceFile
+
+logger = logging.getLogger(__name__)
+
+
+class BulkUpload:
+    """Uploads several files to one model at once. The model's files list is fetched once for all
+    of them, and every file's chunks share one limit on requests in flight and on compressions.
+
+    :param conn: Object with authentication, workspace, and model details
+    :type conn: AnaplanConnection
+    :param sources: Data to upload by file ID, anything file_upload accepts
+    :type sources: Mapping[str, Any]
+    :param chunk_size: Chunk size in megabytes, or "auto"
+    :type chunk_size: Union[int, str]
+    :param max_chunks: Chunk requests in flight across all files, keep within the handler's pool size
+    :type max_chunks: int
+    :param compressors: Chunks compressed at once across all files, defaults to the CPU count
+    :type compressors: int, optional
+    :param max_files: Files uploaded at once, defaults to max_chunks
+    :type max_files: int, optional
+    :param abort_on_error: Stop the remaining uploads when one file fails
+    :type abort_on_error: bool
+    """
+
+    def __init__(
+        self,
+        conn: AnaplanConnection,
+        sources: Mapping,
+        chunk_size: Union[int, str] = 10,
+        max_chunks: int = 4,
+        compressors: Optional[int] = None,
+        max_files: Optional[int] = None,
+        abort_on_error: bool = False,
+    ):
+        self.conn = conn
+        self.sources = sources
+        self.chunk_size = chunk_size
+        self.limits = UploadLimits(max_chunks, compressors)
+        self.max_files = max(min(max_files or max_chunks, len(sources)), 1)
+        self.abort_on_error = abort_on_error
+
+    def run(self) -> Dict[str, FileUploadResult]:
+        """Upload every file, returning once all have finished or been aborted
+
+        :return: Status, upload summary, error and timings of each file, by file ID
+        :rtype: Dict[str, FileUploadResult]
+        """
+        started = monotonic()
+        files = Resources(self.conn, "files").get_resources()
+        file_resources = ResourceParserFile().get_parser(files)
+
+        with ThreadPoolExecutor(self.max_files, thread_name_prefix="anaplan-upload-file") as pool:
+            futures = {
+                file_id: pool.submit(
+                    copy_context().run, self._upload, file_id, data, file_resources, started
+                )
+                for file_id, data in self.sources.items()
+            }
+            return {file_id: future.result() for file_id, future in futures.items()}
+
+    def _upload(
+        self, file_id: str, data, file_resources: AnaplanResourceFile, started: float
+    ) -> FileUploadResult:
+        file_started = monotonic()
+        if self.limits.aborted:
+            return FileUploadResult(file_id, "aborted", _started=file_started - started)
+
+        try:
+            with Tracing.span("anaplan.file_upload", file_id=file_id, chunk_size=self.chunk_size):
+                source = UploadSource.of(data)
+                uploader_class = FileUpload if isinstance(source, PathSource) else StreamUpload
+                uploader = uploader_class(self.conn, file_id, file_resources=file_resources)
+                response = uploader.upload(
+                    self.chunk_size, source, self.limits.max_chunks, limits=self.limits
+                )
+        except Exception as e:
+            status = "aborted" if self.limits.aborted else "failed"
+            if status == "failed":
+                logger.error(f"Error uploading file {file_id}: {e}")
+                if self.abort_on_error:
+                    logger.warning("Aborting the remaining uploads.")
+                    self.limits.abort()
+            return FileUploadResult(
+                file_id,
+                status,
+                _error=e,
+                _started=file_started - started,
+                _elapsed=monotonic() - file_started,
+            )
+
+        return FileUploadResult(
+            file_id,
+            "skipped" if response.skipped else "complete",
+            response,
+            _started=file_started - started,
+            _elapsed=monotonic() - file_started,
+        )
@@ -0,0 +1,170 @@
+import logging
+import threading
+from collections import deque
+from itertools import chain
+from typing import Deque, Generator, Optional, Tuple
+from .UploadSource import Chunk, UploadSource
+
+logger = logging.getLogger(__name__)
+
+_MB = 1024**2
+
+
+class ChunkSizeTuner:
+    """Chooses the size of each upload chunk from measurements of the chunks already sent.
+
+    Send times are fitted against compressed sizes to estimate the per-request latency and the
+    bandwidth of a connection. Chunks are then sized so latency is about ``overhead`` of each
+    request's time, scaled up by the observed compression ratio, and limited so no chunk takes
+    longer than ``max_send_time`` to send again if it fails. The first chunk is sent at the
+    minimum size and later ones at ``initial`` until the first estimates are available. Sizes
+    change by at most a factor of two per chunk and stay within Anaplan's 1-50 MB chunk limits.
+
+    :param initial: Chunk size in bytes until throughput has been measured
+    :type initial: int
+    :param min_size: Smallest chunk in bytes
+    :type min_size: int
+    :param max_size: Largest chunk in bytes
+    :type max_size: int
+    :param overhead: Fraction of each request's time that latency may take up
+    :type overhead: float
+    :param max_send_time: Longest time in seconds a chunk should take to send
+    :type max_send_time: float
+    :param window: Number of recent chunks the estimates are fitted to
+    :type window: int
+    """
+
+    def __init__(
+        self,
+        initial: int = 8 * _MB,
+        min_size: int = 1 * _MB,
+        max_size: int = 50 * _MB,
+        overhead: float = 0.1,
+        max_send_time: float = 30.0,
+        window: int = 16,
+    ):
+        if not min_size <= initial <= max_size:
+            raise ValueError("initial must be between min_size and max_size")
+        if not 0 < overhead < 1:
+            raise ValueError("overhead must be between 0 and 1")
+        self.initial = initial
+        self.min_size = min_size
+        self.max_size = max_size
+        self.overhead = overhead
+        self.max_send_time = max_send_time
+        self._lock = threading.Lock()
+        self._sends: Deque[Tuple[int, float]] = deque(maxlen=window)
+        self._size = initial
+        self._bytes_in = 0
+        self._bytes_out = 0
+        self._bandwidth: Optional[float] = None
+        self._latency: Optional[float] = None
+        self._smallest: Optional[int] = None
+        self._largest: Optional[int] = None
+
+    @property
+    def size(self) -> int:
+        """Get the size of the next chunk
+
+        :return: Chunk size in bytes
+        :rtype: int
+        """
+        with self._lock:
+            return self._size
+
+    def chunks(self, source: UploadSource) -> Generator[Chunk, None, None]:
+        """Read a source in chunks of the current size, which may change between chunks. Chunks are
+        memoryview slices of the source's blocks where a block holds a whole chunk, and are otherwise
+        copied once into a buffer of the chunk's size.
+
+        :param source: Data to upload
+        :type source: UploadSource
+        :return: Chunks in upload order
+        :rtype: Generator[Union[bytes, memoryview], None, None]
+        """
+        blocks = source.chunks(self.min_size)
+        # Probe with the smallest chunk first, so a second size is available to fit the estimates
+        sizes = chain([self.min_size], iter(lambda: self.size, None))
+        try:
+            for chunk in UploadSource._rechunk(blocks, sizes.__next__):
+                size = len(chunk)
+                with self._lock:
+                    self._smallest = min(self._smallest or size, size)
+                    self._largest = max(self._largest or size, size)
+                yield chunk
+        finally:
+            blocks.close()
+
+    def observe_compression(self, bytes_in: int, bytes_out: int) -> None:
+        """Record the size of a chunk before and after compression
+
+        :param bytes_in: Uncompressed size
+        :type bytes_in: int
+        :param bytes_out: Compressed size
+        :type bytes_out: int
+        """
+        with self._lock:
+            self._bytes_in += bytes_in
+            self._bytes_out += bytes_out
+
+    def observe_send(self, bytes_sent: int, elapsed: float) -> None:
+        """Record the time a compressed chunk took to send and choose the size of later chunks
+
+        :param bytes_sent: Compressed size
+        :type bytes_sent: int
+        :param elapsed: Seconds from sending the request to its response, including retries
+        :type elapsed: float
+        """
+        with self._lock:
+            self._sends.append((bytes_sent, elapsed))
+            if self._fit():
+                self._size = self._next_size()
+
+    def _fit(self) -> bool:
+        """Fit send time = latency + bytes / bandwidth to the recent chunks by least squares"""
+        count = len(self._sends)
+        if count < 2:
+            return False
+        mean_bytes = sum(sent for sent, _ in self._sends) / count
+        mean_time = sum(elapsed for _, elapsed in self._sends) / count
+        variance = sum((sent - mean_bytes) ** 2 for sent, _ in self._sends)
+        if variance <= 0:
+            return False
+        slope = (
+            sum((sent - mean_bytes) * (elapsed - mean_time) for sent, elapsed in self._sends)
+            / variance
+        )
+        if slope <= 0:
+            return False
+        self._bandwidth = 1 / slope
+        self._latency = max(mean_time - slope * mean_bytes, 0.0)
+        return True
+
+    def _next_size(self) -> int:
+        ratio = self._bytes_in / self._bytes_out if self._bytes_out else 1.0
+        # Latency is `overhead` of a request when sending takes latency * (1 - overhead) / overhead
+        send_time = self._latency * (1 - self.overhead) / self.overhead
+        send_time = min(max(send_time, 0.0), self.max_send_time)
+        size = int(self._bandwidth * send_time * ratio)
+        size = min(max(size, self._size // 2), self._size * 2)
+        size = min(max(size, self.min_size), self.max_size)
+        return size - size % self.min_size or self.min_size
+
+    def report(self) -> dict:
+        """Get the settings chosen and the estimates they were based on
+
+        :return: Initial chunk size, final size chosen from the estimates, and smallest and largest
+            sizes actually sent in bytes, bandwidth in bytes per second, latency in seconds and
+            compression ratio
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                "initial": self.initial,
+                "final": self._size,
+                "smallest": self._smallest,
+                "largest": self._largest,
+                "bandwidth": self._bandwidth,
+                "latency": self._latency,
+                "compression_ratio": self._bytes_in / self._bytes_out if self._bytes_out else None,
+            }
@@ -48,16 +48,25 @@ class File:
         :type conn: AnaplanConnection
         :param file_id: ID of the specified file in the Anaplan model
         :type file_id: str
+        :param file_resources: Files list already fetched from the model, so several files can share
+            one request
+        :type file_resources: AnaplanResourceFile, optional
         """
         self._conn = conn
         self._file_id = file_id
+        if conn.transport is not None:
+            self._handler = conn.transport
         self._workspace = conn.workspace
         self._model = conn.model
         self._endpoint = (
             f"workspaces/{self._workspace}/models/{self._model}/files/{self._file_id}/"
         )
 
-        self.get_metadata()
+        file_resources = kwargs.get("file_resources")
+        if file_resources is not None:
+            self._file_resources = file_resources
+        else:
+            self.get_metadata()
         self.set_file_details()
 
     def get_metadata(self):
@@ -152,6 +161,15 @@ class File:
         """
         return self._chunk_count
 
+    @property
+    def metadata(self) -> dict:
+        """Returns the fields the files list holds for the specified file.
+
+        :return: ID, name, chunk count and format of the specified file
+        :rtype: dict
+        """
+        return self._file_resources.entry(self._file_id)
+
     @property
     def endpoint(self) -> str:
         """Returns the URL of the specified Anaplan file.
@@ -1,5 +1,6 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, BinaryIO, Iterator, Union
+from contextlib import nullcontext
 import logging
 from .File import File
 from .models.AnaplanVersion import AnaplanVersion
@@ -27,21 +28,79 @@ class FileDownload(File):
         """Sets the chunk count of the specified file to download based on Anaplan metadata"""
         self._chunk_count = super().chunk_count
 
+    def iter_chunks(self, block_size: int = 1024**2) -> Iterator[bytes]:
+        """Stream all chunks of the specified file from Anaplan as raw byte blocks
+
+        Only one block is held in memory at a time and each chunk's connection is released
+        as soon as it has been read.
+
+        :param block_size: Maximum size of each yielded block in bytes
+        :type block_size: int
+        :raises Exception: Exception from RequestHandler exception group
+        :return: Iterator over the file contents
+        :rtype: Iterator[bytes]
+        """
+        conn = self._conn
+        endpoint = f"{super().endpoint}chunks/"
+
+        get_header = {
+            "Authorization": conn.authorization.token_value,
+        }
+
+        for current_chunk in range(int(self._chunk_count)):
+            received = 0
+            try:
+                logger.debug(f"Downloading chunk {current_chunk}")
+                with self._handler.stream_request(
+                    f"{endpoint}{current_chunk}",
+                    "GET",
+                    headers=get_header,
+                    block_size=block_size,
+                    context={
+                        "operation": "download_chunk",
+                        "file_id": self._file_id,
+                        "chunk": current_chunk,
+                    },
+                ) as blocks:
+                    for block in blocks:
+                        received += len(block)
+                        yield block
+            except Exception as e:
+                logger.error(f"Error downloading chunk {e}", exc_info=True)
+                raise Exception(f"Error downloading chunk {e}")
+            if not received:
+                logger.error(f"There was a problem downloading {self._file_id}")
+                return
+
+            logger.debug(f"Chunk {current_chunk} downloaded successfully.")
+
+    def download_to(self, file: Union[str, BinaryIO]) -> int:
+        """Download the specified file from Anaplan straight to disk or a binary file object
+
+        :param file: Path of the destination file, or a writable binary file object
+        :type file: Union[str, BinaryIO]
+        :return: Number of bytes written
+        :rtype: int
+        """
+        written = 0
+        with open(file, "wb") if isinstance(file, str) else nullcontext(file) as out:
+            for block in self.iter_chunks():
+                written += out.write(block)
+
+        logger.info("File download complete!")
+        return written
+
     def download_file(self) -> str:
-        """Download all chunks of the specified file from Anaplan
-
-        :raises HTTPError: HTTP error code
-        :raises ConnectionError: Network-related errors
-        :raises SSLError: Server-side SSL certificate errors
-        :raises Timeout: Request timeout errors
-        :raises ConnectTimeout: Timeout error when attempting to connect
-        :raises ReadTimeout: Timeout error waiting for server response
+        """Download all chunks of the specified file from Anaplan. Each chunk is decoded with the charset
+        the server declares, or the one detected from its content, so use iter_chunks or download_to to
+        stream large files in bounded memory.
+
+        :raises Exception: Exception from RequestHandler exception group
         :return: Contents of the specified file.
         :rtype: str
         """
         conn = self._conn
         endpoint = f"{super().endpoint}chunks/"
-        current_chunk = 0
 
         file_data = []
 
@@ -49,11 +108,18 @@ class FileDownload(File):
             "Authorization": conn.authorization.token_value,
         }
 
-        while int(current_chunk) < int(self._chunk_count):
+        for current_chunk in range(int(self._chunk_count)):
             try:
                 logger.debug(f"Downloading chunk {current_chunk}")
                 file_contents = self._handler.make_request(
-                    "".join([endpoint, str(current_chunk)]), "GET", headers=get_header
+                    f"{endpoint}{current_chunk}",
+                    "GET",
+                    headers=get_header,
+                    context={
+                        "operation": "download_chunk",
+                        "file_id": self._file_id,
+                        "chunk": current_chunk,
+                    },
                 ).text
             except Exception as e:
                 logger.error(f"Error downloading chunk {e}", exc_info=True)
@@ -64,7 +130,6 @@ class FileDownload(File):
 
             logger.debug(f"Chunk {current_chunk} downloaded successfully.")
             file_data.append(file_contents)
-            current_chunk = str(int(current_chunk) + 1)
 
         logger.info("File download complete!")
         return "".join(file_data)
@@ -1,44 +1,46 @@
 import logging
-from functools import partial
+from typing import Optional, Union
 from .Upload import Upload
+from .UploadLimits import UploadLimits
+from .UploadManifest import UploadManifest
+from .UploadSource import PathSource, UploadSource
+from .models.UploadResponse import UploadResponse
 
 logger = logging.getLogger(__name__)
 
 
 class FileUpload(Upload):
-    def upload(self, chunk_size: int, file: str):
+    def upload(
+        self,
+        chunk_size: Union[int, str],
+        file: Union[str, UploadSource],
+        workers: int = 1,
+        encoding: Optional[str] = None,
+        manifest: Optional[UploadManifest] = None,
+        limits: Optional[UploadLimits] = None,
+    ) -> Optional[UploadResponse]:
         """Upload a local file to Anaplan model
 
-        :param chunk_size: Desired size of the chunk, in megabytes
-        :type chunk_size: int
-        :param file: Path to the local file to be uploaded to Anaplan
-        :type file: str
+        :param chunk_size: Desired size of the chunk, in megabytes, or "auto" to tune it while uploading
+        :type chunk_size: Union[int, str]
+        :param file: Path to the local file to be uploaded to Anaplan, or a PathSource
+        :type file: Union[str, UploadSource]
+        :param workers: Number of chunks uploaded concurrently
+        :type workers: int
+        :param encoding: Encoding of the file, which is converted to UTF-8 while uploading.
+            None uploads the file's bytes unchanged.
+        :type encoding: str, optional
+        :param manifest: Manifest recording confirmed chunks, so an interrupted upload can resume
+        :type manifest: UploadManifest, optional
+        :param limits: Chunk request and compression limits shared with the uploads of other files
+        :type limits: UploadLimits, optional
+        :return: Chunk count, sizes and per-stage timings of the upload
+        :rtype: UploadResponse, optional
         """
-        endpoint = f"{super().endpoint}"
+        source = file if isinstance(file, UploadSource) else PathSource(file, encoding)
 
-        metadata_update = super().file_metadata(endpoint)
-        # Confirm that the metadata update for the requested file was OK before proceeding with file upload
-        if metadata_update:
-            logger.info(f"Starting upload of file {super().file_id}.")
-
-            try:
-                with open(file, "rt") as file:
-                    # Enumerate the file contents in specified chunk size
-                    for chunk_num, data in enumerate(
-                        iter(partial(file.read, chunk_size * (1024**2)), "")
-                    ):
-                        if not data:
-                            break
-                        complete = super().file_data(
-                            f"{endpoint}chunks/{str(chunk_num)}",
-                            chunk_num,
-                            data.encode("utf-8"),
-                        )
-            except OSError as e:
-                logger.error(f"Error opening file {file}: {e}", exc_info=True)
-                raise OSError(f"Error opening file {file}: {e}")
-
-            if complete:
-                complete_upload = super().file_metadata(f"{endpoint}complete")
-                if complete_upload:
-                    logger.info(f"Upload of file {super().file_id} complete.")
+        try:
+            return super().upload_source(chunk_size, source, workers, manifest, limits=limits)
+        except OSError as e:
+            logger.error(f"Error opening file {file}: {e}", exc_info=True)
+            raise OSError(f"Error opening file {file}: {e}")
@@ -30,8 +30,11 @@ class Model(User):
         logger.info(f"Fetching models for {user_id}")
 
         try:
-            model_list = (
-                super()._handler.make_request(url, "GET", headers=get_header).json()
+            model_list = super()._handler.get_json(
+                url,
+                headers=get_header,
+                cache=True,
+                context={"operation": "list_models"},
             )
         except Exception as e:
             logger.error(f"Error getting models list: {e}", exc_info=True)
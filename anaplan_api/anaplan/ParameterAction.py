@@ -7,8 +7,9 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 import json
 import logging
-from time import sleep
 from .Action import Action
+from .util.JsonCodec import JsonCodec
+from .util.Tracing import Tracing
 from .util.Util import RequestFailedError, InvalidTaskTypeError
 
 if TYPE_CHECKING:
@@ -71,6 +72,14 @@ class ParameterAction(Action):
 
         return json.loads(body_value)
 
+    def request_body(self) -> str:
+        """Get the JSON body with runtime mapping parameters
+
+        :return: Serialized POST body
+        :rtype: str
+        """
+        return json.dumps(self.build_request_body())
+
     def post_task(self, url: str, post_header: dict, post_body: dict) -> str:
         """Overrides parent method to send mapping parameters when executing the specified import
 
@@ -80,41 +89,26 @@ class ParameterAction(Action):
         :type post_header: dict
         :param post_body: JSON-formatted Mapping parameters
         :type post_body: dict
-        :raises HTTPError: HTTP error code
-        :raises ConnectionError: Network-related errors
-        :raises SSLError: Server-side SSL certificate errors
-        :raises Timeout: Request timeout errors
-        :raises ConnectTimeout: Timeout error when attempting to connect
-        :raises ReadTimeout: Timeout error waiting for server response
+        :raises RequestFailedError: Task could not be created within the retry policy
         :raises ValueError: Error locating the task ID
         :return: Import action task ID
         :rtype: str
         """
-        retry_count = super().retry_count
-        state = 0
-        sleep_time = 10
-
-        while True:
-            try:
-                run_action = (
-                    super()
-                    .handler.make_request(
-                        url, "POST", headers=post_header, data=post_body
+        try:
+            with Tracing.span("anaplan.task_post", action_id=self._action_id):
+                run_action = JsonCodec.decode(
+                    super().handler.make_request(
+                        url,
+                        "POST",
+                        headers=post_header,
+                        data=json.dumps(post_body),
+                        retry_policy=self.retry_policy,
+                        context={"operation": "task_post", "action_id": self._action_id},
                     )
-                    .json()
                 )
-                if run_action.status_code != 200 and state < retry_count:
-                    sleep(sleep_time)
-                    state += 1
-                    sleep_time *= 1.5
-                else:
-                    break
-            except Exception as e:
-                logger.error(f"Error running action {e}", exc_info=True)
-                raise Exception(f"Error running action {e}")
-
-        if state > self.retry_count:
-            raise RequestFailedError(f"Unable to execute {self._action_id}")
+        except Exception as e:
+            logger.error(f"Error running action {e}", exc_info=True)
+            raise RequestFailedError(f"Unable to execute {self._action_id}: {e}")
 
         if "task" not in run_action or "taskId" not in run_action["task"]:
             raise ValueError("Unable to fetch task ID.")
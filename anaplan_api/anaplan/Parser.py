@@ -51,6 +51,8 @@ class Parser(object):
         :type url: str
         """
         self._authorization = conn.authorization.token_value
+        if conn.transport is not None:
+            self._handler = conn.transport
         self._endpoint = url
         self._results.extend(self.parse_response(conn, results, url))
 
@@ -3,6 +3,7 @@ from typing import TYPE_CHECKING
 import logging
 from .util.RequestHandler import RequestHandler
 from .models.AnaplanVersion import AnaplanVersion
+from .util.Tracing import Tracing
 from .util.Util import ResourceNotFoundError, RequestFailedError
 
 if TYPE_CHECKING:
@@ -45,6 +46,8 @@ class Resources:
         :type resource: str
         """
         self._authorization = conn.authorization.token_value
+        if conn.transport is not None:
+            self._handler = conn.transport
         self._workspace = conn.workspace
         self._model = conn.model
         self._endpoint = (
@@ -90,15 +93,30 @@ class Resources:
 
         logger.debug(f"Fetching {self._resource}")
         try:
-            response = self._handler.make_request(
-                self._endpoint, headers=get_header
-            ).json()
+            with Tracing.span("anaplan.list_resources", resource=self._resource):
+                response = self._handler.get_json(
+                    self._endpoint,
+                    headers=get_header,
+                    cache=True,
+                    context={"operation": "list_resources", "resource": self._resource},
+                )
         except Exception as e:
             logger.error(
                 f"Error fetching resource {self._resource}, {e}", exc_info=True
             )
         logger.debug(f"Finished fetching {self._resource}")
 
+        return self.parse_response(response)
+
+    def parse_response(self, response: dict) -> dict:
+        """Validate a resource listing response and extract the requested resource
+
+        :param response: JSON response from the resource listing endpoint
+        :type response: dict
+        :raises RequestFailedError: Error returned by Anaplan API server for specified request
+        :raises KeyError: Error if response does not contain the specified resource
+        :return: JSON list of the specified resource
+        """
         if "status" not in response or "code" not in response["status"]:
             raise KeyError(f"Status or code not found in response: {response}")
 
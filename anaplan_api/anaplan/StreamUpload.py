@@ -1,54 +1,42 @@
 import logging
-from functools import partial
-from io import StringIO, BytesIO
+from typing import Optional, Union
 from .Upload import Upload
+from .UploadLimits import UploadLimits
+from .UploadManifest import UploadManifest
+from .UploadSource import UploadSource
+from .models.UploadResponse import UploadResponse
 
 logger = logging.getLogger(__name__)
 
 
 class StreamUpload(Upload):
-    def upload(self, chunk_size, data):
-        """Upload data held in memory to Anaplan model
-
-        :param chunk_size: Upload request body size in MB between 1 and 50
-        :type chunk_size: int
-        :param data: String data to be uploaded to Anaplan
-        :type data: str
+    def upload(
+        self,
+        chunk_size: Union[int, str],
+        data,
+        workers: int = 1,
+        manifest: Optional[UploadManifest] = None,
+        limits: Optional[UploadLimits] = None,
+    ) -> Optional[UploadResponse]:
+        """Upload data held in memory or streamed from a file object or iterable to Anaplan model
+
+        :param chunk_size: Upload request body size in MB between 1 and 50, or "auto" to tune it while uploading
+        :type chunk_size: Union[int, str]
+        :param data: String or bytes data, a file object, an iterable of bytes, str or rows, or an UploadSource
+        :param workers: Number of chunks uploaded concurrently
+        :type workers: int
+        :param manifest: Manifest recording confirmed chunks, so an interrupted upload can resume
+        :type manifest: UploadManifest, optional
+        :param limits: Chunk request and compression limits shared with the uploads of other files
+        :type limits: UploadLimits, optional
+        :return: Chunk count, sizes and per-stage timings of the upload
+        :rtype: UploadResponse, optional
         """
-
-        stream_upload = False
-        endpoint = f"{super().endpoint}"
-        io_data = StringIO(data)  # Convert str to StingIO for enumeration
-
         try:
-            io_bytes = BytesIO(data.encode('utf-8'))
+            source = UploadSource.of(data, detect_paths=False)
         except TypeError as e:
             logger.error(f"Error converting data to bytes: {e}", exc_info=True)
             raise TypeError(f"Error converting data to bytes: {e}")
-        except MemoryError as e:
-            logger.error(f"Error converting data to BytesIO: {e}", exc_info=True)
-            raise MemoryError(f"Error converting data to BytesIO: {e}")
-
-        metadata_update = super().file_metadata(
-            endpoint
-        )  # Update file metadata to begin upload process
-
-        if metadata_update:
-            logger.info(f"Starting upload of file {super().file_id}.")
-            # Loop through enumerated data, sending chunks of the specified size to Anaplan until all data is uploaded
-            for chunk_num, chunk in enumerate(
-                iter(partial(io_bytes.read, chunk_size * (1024**2)), b"")
-            ):
-                if not chunk:
-                    break
-                stream_upload = super().file_data(
-                    f"{endpoint}chunks/{str(chunk_num)}",
-                    chunk_num,
-                    chunk
-                )
 
-            # Once all data is uploaded mark the file complete to indicate the file is ready for use
-            if stream_upload:
-                complete_upload = super().file_metadata(f"{endpoint}complete")
-                if complete_upload:
-                    logger.info(f"Upload of file {super().file_id} complete.")
+        # Chunks are read from the source as they are uploaded, so the data is never copied whole
+        return super().upload_source(chunk_size, source, workers, manifest, limits=limits)
@@ -1,14 +1,16 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING, List
 import logging
-from io import StringIO
+import io
 import pandas as pd
 from pandas.errors import EmptyDataError, ParserError, ParserWarning
 
 from .TaskFactoryGenerator import TaskFactoryGenerator
 from .FileDownload import FileDownload
 from .models.ActionResponse import ActionResponse
+from .util.IterStream import IterStream
 from .util.RequestHandler import RequestHandler
+from .util.Tracing import Tracing
 from .models.AnaplanVersion import AnaplanVersion
 
 if TYPE_CHECKING:
@@ -41,6 +43,8 @@ class TaskController:
         mapping_params: dict = None,
     ):
         self._conn = conn
+        if conn.transport is not None:
+            self._handler = conn.transport
         self._action_id = action_id
         self._retry_count = retry_count
         self._mapping_params = mapping_params
@@ -63,8 +67,11 @@ class TaskController:
         task = self._action.execute()
         self._task_id = task.results["taskId"]
 
-        parser = factory.get_parser(conn=self._conn, results=task.results, url=task.url)
-        self._parser_responses = parser.results
+        with Tracing.span("anaplan.task_parse", task_id=self._task_id):
+            parser = factory.get_parser(
+                conn=self._conn, results=task.results, url=task.url
+            )
+            self._parser_responses = parser.results
 
         dumps: List[DataFrame] = list()
         files: List[str] = list()
@@ -73,11 +80,12 @@ class TaskController:
                 dumps.append(self.get_error_dump(response.task_endpoint))
                 pass
             if response.file:
-                files.append(
-                    FileDownload(
-                        conn=self._conn, file_id=response.file_id
-                    ).download_file()
-                )
+                with Tracing.span("anaplan.file_download", file_id=response.file_id):
+                    files.append(
+                        FileDownload(
+                            conn=self._conn, file_id=response.file_id
+                        ).download_file()
+                    )
 
         return ActionResponse(self._parser_responses, dumps, files)
 
@@ -98,22 +106,23 @@ class TaskController:
         }
 
         edf = pd.DataFrame()
-        dump = ""
 
         try:
             logger.debug("Fetching error dump")
-            dump = self._handler.make_request(
-                f"{endpoint}", "GET", headers=post_header
-            ).text
+            # Parse while the body streams in rather than buffering the whole dump as bytes and str
+            with Tracing.span("anaplan.error_dump"), self._handler.stream_request(
+                f"{endpoint}",
+                "GET",
+                headers=post_header,
+                context={"operation": "error_dump"},
+            ) as blocks:
+                edf = pd.read_csv(io.BufferedReader(IterStream(blocks)))
             logger.debug("Error dump downloaded.")
-        except Exception as e:
-            logger.error(f"Error fetching error dump {e}", exc_info=True)
-
-        try:
-            edf = pd.read_csv(StringIO(dump))
         except (EmptyDataError, ParserError) as e:
             logger.error(f"Error loading error dump to dataframe {e}", exc_info=True)
         except ParserWarning as w:
             logger.warning(f"Warning raised while parsing csv {w}", exc_info=True)
+        except Exception as e:
+            logger.error(f"Error fetching error dump {e}", exc_info=True)
 
         return edf
@@ -6,15 +6,45 @@
 # Output:			Anaplan JWT and token expiry time
 # ===============================================================================
 import logging
-import io
-import json
-import gzip
+import zlib
+from typing import Iterable, List, Optional, Union
 from .File import File
+from .ChunkSizeTuner import ChunkSizeTuner
+from .UploadCache import UploadCache
+from .UploadLimits import UploadLimits
+from .UploadManifest import UploadManifest
+from .UploadPipeline import UploadPipeline
+from .UploadPlan import UploadPlan
+from .UploadSource import UploadSource
+from .models.UploadResponse import UploadResponse
+from .util.CompressionBackend import CompressionBackend
+from .util.RetryPolicy import RetryPolicy
+from .util.Tracing import Tracing
 
 logger = logging.getLogger(__name__)
 
 
 class Upload(File):
+    _compression_backend: CompressionBackend = CompressionBackend.default()
+    _upload_cache: Optional[UploadCache] = None
+
+    @classmethod
+    def set_compression_backend(cls, backend: CompressionBackend) -> None:
+        """Compress the chunks of every upload with another backend
+
+        :param backend: Backend shared by all uploads, such as ZlibBackend() or IsalBackend()
+        :type backend: CompressionBackend
+        """
+        Upload._compression_backend = backend
+
+    @classmethod
+    def set_upload_cache(cls, upload_cache: Optional[UploadCache]) -> None:
+        """Skip uploads of data a file already holds, or upload every time with None
+
+        :param upload_cache: Cache shared by all uploads
+        :type upload_cache: UploadCache, optional
+        """
+        Upload._upload_cache = upload_cache
 
     @property
     def endpoint(self) -> str:
@@ -55,6 +85,158 @@ class Upload(File):
     def upload(self, chunk_size: int, file: str):
         pass
 
+    def upload_source(
+        self,
+        chunk_size: Union[int, str],
+        source: UploadSource,
+        workers: int = 1,
+        manifest: Optional[UploadManifest] = None,
+        verify: bool = True,
+        limits: Optional[UploadLimits] = None,
+    ) -> Optional[UploadResponse]:
+        """Upload data read lazily from a source, marking the file complete once every chunk is confirmed
+
+        :param chunk_size: Desired size of the chunk, in megabytes, or "auto" to size chunks from the
+            measured bandwidth, latency and compression ratio
+        :type chunk_size: Union[int, str]
+        :param source: Data to upload
+        :type source: UploadSource
+        :param workers: Number of chunks uploaded concurrently
+        :type workers: int
+        :param manifest: Manifest recording confirmed chunks, so an interrupted upload resumes from
+            where it stopped instead of starting again
+        :type manifest: UploadManifest, optional
+        :param verify: With a manifest, check the server's chunk list before completing the upload
+            and send any missing chunks again
+        :type verify: bool
+        :param limits: Send and compression slots shared with the uploads of other files
+        :type limits: UploadLimits, optional
+        :raises Exception: A chunk could not be uploaded, or the server is missing chunks
+        :return: Chunk count, sizes and per-stage timings of the upload, marked skipped when the upload
+            cache shows the file already holds the data
+        :rtype: UploadResponse, optional
+        """
+        endpoint = self.endpoint
+        response = None
+        plan = UploadPlan(self, chunk_size, source, manifest, Upload._upload_cache)
+        skipped = plan.skip()
+        if skipped is not None:
+            return skipped
+
+        # Posting the metadata starts the upload again, discarding the chunks already sent
+        metadata_update = plan.resume() or self.file_metadata(endpoint)
+        # Confirm that the metadata update for the requested file was OK before proceeding with file upload
+        if metadata_update:
+            logger.info(f"Starting upload of file {self.file_id}.")
+
+            response = self._upload_source_chunks(endpoint, plan, workers, limits)
+            if manifest is not None and response.chunks and verify:
+                response = self._verify_chunks(endpoint, plan, workers, response, limits)
+
+            # Only mark the file complete once every chunk has been confirmed
+            if response.chunks and self.file_metadata(f"{endpoint}complete"):
+                metadata = self._listed_metadata() if plan.upload_cache is not None else None
+                plan.completed(response, metadata)
+
+        return response
+
+    def _listed_metadata(self) -> Optional[dict]:
+        """Fetch the files list again for the upload cache, after an upload changed the file"""
+        try:
+            self.get_metadata()
+            self.set_file_details()
+            return self.metadata
+        except Exception as e:
+            logger.warning(f"Upload of file {self.file_id} left out of the upload cache: {e}")
+            return None
+
+    def _upload_source_chunks(
+        self,
+        endpoint: str,
+        plan: UploadPlan,
+        workers: int,
+        limits: Optional[UploadLimits] = None,
+    ) -> UploadResponse:
+        chunks = plan.chunks()
+        try:
+            response = self.upload_chunks(
+                endpoint, chunks, workers, manifest=plan.manifest, tuner=plan.tuner, limits=limits
+            )
+        finally:
+            chunks.close()
+        return plan.checked(response)
+
+    def _verify_chunks(
+        self,
+        endpoint: str,
+        plan: UploadPlan,
+        workers: int,
+        response: UploadResponse,
+        limits: Optional[UploadLimits] = None,
+    ) -> UploadResponse:
+        """Send chunks missing from the server's chunk list again, once"""
+        if not plan.missing(response, self.chunk_list(endpoint)):
+            return response
+        response = self._upload_source_chunks(endpoint, plan, workers, limits)
+        plan.received(response, self.chunk_list(endpoint))
+        return response
+
+    def upload_chunks(
+        self,
+        endpoint: str,
+        chunks: Iterable[bytes],
+        workers: int = 1,
+        max_buffered: Optional[int] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        compression_level: int = 6,
+        compressors: Optional[int] = None,
+        manifest: Optional[UploadManifest] = None,
+        tuner: Optional[ChunkSizeTuner] = None,
+        limits: Optional[UploadLimits] = None,
+    ) -> UploadResponse:
+        """Upload chunks through an UploadPipeline, so reading, compression and sending overlap.
+        Up to ``workers`` chunk requests are in flight, at most ``max_buffered`` chunks wait between
+        stages, and a chunk that fails is retried on its own by the retry policy before the upload is
+        abandoned.
+
+        :param endpoint: URL of the specified file
+        :type endpoint: str
+        :param chunks: Uncompressed chunk data in upload order
+        :type chunks: Iterable[bytes]
+        :param workers: Number of chunks uploaded concurrently, keep within the handler's pool size
+        :type workers: int
+        :param max_buffered: Maximum chunks queued between stages, defaults to one uncompressed chunk per
+            compressor and twice the workers of compressed chunks
+        :type max_buffered: int, optional
+        :param retry_policy: Policy for each chunk's PUT, defaults to the handler-wide policy
+        :type retry_policy: RetryPolicy, optional
+        :param compression_level: zlib compression level from 1 (fastest) to 9 (smallest)
+        :type compression_level: int
+        :param compressors: Number of chunks compressed concurrently, defaults to the workers up to the CPU count
+        :type compressors: int, optional
+        :param manifest: Manifest recording confirmed chunks, chunks it already holds are skipped
+        :type manifest: UploadManifest, optional
+        :param tuner: Chunk size tuner to report each chunk's compression ratio and send time to
+        :type tuner: ChunkSizeTuner, optional
+        :param limits: Send and compression slots shared with the uploads of other files
+        :type limits: UploadLimits, optional
+        :raises Exception: A chunk could not be uploaded
+        :return: Chunk count, sizes and the time spent in each stage
+        :rtype: UploadResponse
+        """
+        return UploadPipeline(
+            self,
+            endpoint,
+            workers,
+            compressors,
+            max_buffered,
+            compression_level,
+            retry_policy,
+            manifest,
+            tuner,
+            limits,
+        ).run(chunks)
+
     def file_metadata(self, endpoint: str) -> bool:
         """Update file metadata in Anaplan model as first step in file upload process
 
@@ -63,22 +245,13 @@ class Upload(File):
         :return: Whether metadata was successfully updated
         :rtype: bool
         """
-        authorization = super().connection.authorization.token_value
-
-        file_id = super().file_id
-
-        post_header = {
-            "Authorization": authorization,
-            "Content-Type": "application/json",
-        }
-
-        stream_metadata = {"id": file_id, "chunkCount": -1}
+        request = UploadPlan.metadata_request(self, endpoint)
+        operation = request["context"]["operation"]
 
         try:
             logger.debug("Updating file metadata.")
-            meta_post = super().handler.make_request(
-                endpoint, "POST", headers=post_header, data=json.dumps(stream_metadata)
-            )
+            with Tracing.span(f"anaplan.{operation}", file_id=self.file_id):
+                super().handler.make_request(**request)
             logger.debug("Complete!")
         except Exception as e:
             logger.error(f"Error setting metadata {e}", exc_info=True)
@@ -86,8 +259,26 @@ class Upload(File):
 
         return True
 
+    def chunk_list(self, endpoint: str) -> List[int]:
+        """Get the chunks of the file that the server has received
+
+        :param endpoint: URL of the specified file
+        :type endpoint: str
+        :raises Exception: Exception from RequestHandler exception group
+        :return: IDs of the received chunks
+        :rtype: List[int]
+        """
+        try:
+            with Tracing.span("anaplan.chunk_list", file_id=self.file_id):
+                chunk_list = super().handler.get_json(**UploadPlan.chunk_list_request(self, endpoint))
+        except Exception as e:
+            logger.error(f"Error fetching chunk list {e}", exc_info=True)
+            raise Exception(f"Error fetching chunk list {e}")
+
+        return UploadPlan.chunk_ids(chunk_list)
+
     def file_data(self, url: str, chunk_num: int, data: bytes) -> bool:
-        """Upload data chunk to the specified file
+        """Compress a data chunk and upload it to the specified file
 
         :param url: URL of the  specified file
         :type url: str
@@ -99,25 +290,53 @@ class Upload(File):
         :return: Whether file data upload was successful
         :rtype: bool
         """
+        return self.send_chunk(url, chunk_num, self.compress_chunk(chunk_num, data))
 
-        authorization = super().connection.authorization.token_value
-
-        put_header = {
-            "Authorization": authorization,
-            "Content-Type": "application/x-gzip",
-        }
+    def compress_chunk(self, chunk_num: int, data: bytes, level: int = 6) -> bytes:
+        """Gzip a data chunk
 
+        :param chunk_num: ID of the chunk being compressed
+        :type chunk_num: int
+        :param data: Uncompressed data
+        :type data: bytes
+        :param level: zlib compression level from 1 (fastest) to 9 (smallest)
+        :type level: int
+        :raises OSError: Data could not be compressed
+        :return: Gzip-compressed data
+        :rtype: bytes
+        """
         try:
-            data = Upload.compress_data(data)
-        except OSError as e:
+            with Tracing.span("anaplan.compress", chunk=chunk_num, bytes_in=len(data)) as span:
+                compressed = Upload.compress_data(data, level)
+                span.set_attribute("bytes_out", len(compressed))
+        except (OSError, zlib.error) as e:
             logger.error(f"Error compressing data: {e}", exc_info=True)
             raise OSError(f"Error compressing data: {e}")
+        return compressed
 
+    def send_chunk(
+        self, url: str, chunk_num: int, data: bytes, retry_policy: Optional[RetryPolicy] = None
+    ) -> bool:
+        """Upload a gzip-compressed data chunk to the specified file
+
+        :param url: URL of the  specified file
+        :type url: str
+        :param chunk_num: ID of the chunk being uploaded
+        :type chunk_num: int
+        :param data: Gzip-compressed data
+        :type data: bytes
+        :param retry_policy: Policy for this request, defaults to the handler-wide policy
+        :type retry_policy: RetryPolicy, optional
+        :raises Exception: Exception from RequestHandler exception group
+        :return: Whether file data upload was successful
+        :rtype: bool
+        """
         try:
             logger.debug(f"Attempting to upload chunk {chunk_num + 1}")
-            stream_upload = super().handler.make_request(
-                url, "PUT", headers=put_header, data=data
-            )
+            with Tracing.span("anaplan.upload_chunk", chunk=chunk_num, bytes=len(data)):
+                super().handler.make_request(
+                    **UploadPlan.chunk_request(self, url, chunk_num, data, retry_policy)
+                )
             logger.debug(f"Chunk {chunk_num + 1} uploaded successfully.")
         except Exception as e:
             logger.error(f"Error uploading chunk {chunk_num + 1}, {e}", exc_info=True)
@@ -126,9 +345,16 @@ class Upload(File):
         return True
 
     @staticmethod
-    def compress_data(upload_data: bytes):
-        output = io.BytesIO()
-        with gzip.GzipFile(fileobj=output, mode="wb") as gz_stream:
-            gz_stream.write(upload_data)
-        compressed_data = output.getvalue()
-        return compressed_data
+    def compress_data(upload_data: bytes, level: int = 6) -> bytes:
+        """Gzip data in one pass with the compression backend. Backends release the GIL while
+        compressing, so chunks can be compressed on other threads while requests are in flight.
+
+        :param upload_data: Uncompressed data
+        :type upload_data: bytes
+        :param level: zlib compression level from 1 (fastest) to 9 (smallest)
+        :type level: int
+        :raises OSError: Data could not be compressed
+        :return: Gzip-compressed data
+        :rtype: bytes
+        """
+        return Upload._compression_backend.compress(upload_data, level)
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+from .UploadSource import UploadSource
+
+logger = logging.getLogger(__name__)
+
+
+class UploadCache:
+    """Local record of the content last uploaded to each Anaplan file, used to skip uploading the
+    same data again. Each entry maps a workspace, model and file ID to the SHA-256 hash of the
+    uploaded data, the chunk size, the number of chunks, the file's entry in the server's files list
+    after the upload and the upload time.
+
+    An upload is skipped when the server still lists the file exactly as it did after the recorded
+    upload and the source hashes to the recorded value. The entry is removed before any new upload
+    starts, so an upload that fails part way is never mistaken for a complete one.
+
+    The files list holds no modification time or size, only the name, chunk count and format, so
+    data uploaded to the file by another client is not detected if it leaves those unchanged. Use
+    the cache only where this client is the file's sole writer, or bound how long an entry is
+    trusted with ``max_age``. Uploads use no cache until Upload.set_upload_cache is called.
+
+    :param path: JSON file the entries are saved to, None to keep them in memory only
+    :type path: Union[str, os.PathLike], optional
+    :param max_age: Seconds after its upload an entry stops being trusted, None to trust it until
+        the file's listing changes
+    :type max_age: float, optional
+    """
+
+    def __init__(self, path: Union[str, os.PathLike, None] = None, max_age: Optional[float] = None):
+        self.path = Path(path) if path is not None else None
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+
+        if self.path is not None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as file:
+                    self._entries = json.load(file)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable upload cache {self.path}: {e}")
+
+    @staticmethod
+    def key(workspace: str, model: str, file_id: str) -> str:
+        """Build the key of a file's entry
+
+        :rtype: str
+        """
+        return f"{workspace}/{model}/{file_id}"
+
+    @staticmethod
+    def digest(source: UploadSource, chunk_size: int) -> Tuple[str, int]:
+        """Hash a source in one streaming pass over its chunks. The hash does not depend on the
+        chunk size, which only sets how much is read at a time
+
+        :param source: Data to upload, which must be rereadable
+        :type source: UploadSource
+        :param chunk_size: Chunk size in bytes
+        :type chunk_size: int
+        :return: SHA-256 hex digest and bytes read
+        :rtype: Tuple[str, int]
+        """
+        content_hash = hashlib.sha256()
+        size = 0
+        chunks = source.chunks(chunk_size)
+        try:
+            for chunk in chunks:
+                content_hash.update(chunk)
+                size += len(chunk)
+        finally:
+            chunks.close()
+        return content_hash.hexdigest(), size
+
+    def get(self, key: str) -> Optional[dict]:
+        """Get the entry of a file
+
+        :param key: Key built by :meth:`key`
+        :type key: str
+        :return: Hash, chunk size, chunk count, files list entry and upload time of the last upload
+        :rtype: dict, optional
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return dict(entry) if entry is not None else None
+
+    def candidate(self, key: str, metadata: dict) -> bool:
+        """Check whether the server lists the file as it did after the recorded upload, so the source
+        is worth hashing
+
+        :param key: Key built by :meth:`key`
+        :type key: str
+        :param metadata: File's current entry in the server's files list
+        :type metadata: dict
+        :rtype: bool
+        """
+        entry = self.get(key)
+        return (
+            entry is not None
+            and entry.get("metadata") == metadata
+            and (self.max_age is None or time.time() - entry["uploaded"] <= self.max_age)
+        )
+
+    def unchanged(self, key: str, digest: str, metadata: dict) -> bool:
+        """Check whether the file already holds this content
+
+        :param key: Key built by :meth:`key`
+        :type key: str
+        :param digest: Hash of the data to upload
+        :type digest: str
+        :param metadata: File's current entry in the server's files list
+        :type metadata: dict
+        :rtype: bool
+        """
+        entry = self.get(key)
+        return entry is not None and entry["hash"] == digest and self.candidate(key, metadata)
+
+    def record(self, key: str, digest: str, chunk_size: int, chunks: int, metadata: dict) -> None:
+        """Record a completed upload
+
+        :param key: Key built by :meth:`key`
+        :type key: str
+        :param digest: Hash of the uploaded data
+        :type digest: str
+        :param chunk_size: Chunk size in bytes
+        :type chunk_size: int
+        :param chunks: Number of chunks sent
+        :type chunks: int
+        :param metadata: File's entry in the server's files list after the upload
+        :type metadata: dict
+        """
+        with self._lock:
+            self._entries[key] = {
+                "hash": digest,
+                "chunk_size": chunk_size,
+                "chunks": chunks,
+                "metadata": metadata,
+                "uploaded": time.time(),
+            }
+            self._save()
+
+    def forget(self, key: str) -> None:
+        """Remove the entry of a file whose content is about to change
+
+        :param key: Key built by :meth:`key`
+        :type key: str
+        """
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._save()
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        temp = self.path.with_name(f"{self.path.name}.tmp")
+        with open(temp, "w", encoding="utf-8") as file:
+            json.dump(self._entries, file)
+        os.replace(temp, self.path)
@@ -1,21 +1,31 @@
 from __future__ import annotations
 from typing import Union, TYPE_CHECKING
-from pathlib import Path
 from .FileUpload import FileUpload
 from .StreamUpload import StreamUpload
+from .UploadSource import PathSource, UploadSource
 
 if TYPE_CHECKING:
     from .models.AnaplanConnection import AnaplanConnection
 
 
 class UploadFactory:
-    _is_file: bool
+    _source: UploadSource
 
-    def __init__(self, data: str):
+    def __init__(self, data):
         """
-        :param data: Filepath or data to upload
+        :param data: Filepath, data to upload, file object, iterable of bytes, str or rows, or UploadSource.
+            Strings are only treated as paths when they name an existing file and contain no line break.
         """
-        self._is_file = Path(data).is_file()
+        self._source = UploadSource.of(data)
+
+    @property
+    def source(self) -> UploadSource:
+        """Get the source the data is read from
+
+        :return: Source of the upload data
+        :rtype: UploadSource
+        """
+        return self._source
 
     def get_uploader(
         self, conn: AnaplanConnection, file_id: str
@@ -30,7 +40,7 @@ class UploadFactory:
         :return: Initialized upload object
         :rtype: Union[FileUpload, StreamUpload]
         """
-        if self._is_file:
+        if isinstance(self._source, PathSource):
             return FileUpload(conn, file_id)
         else:
             return StreamUpload(conn, file_id)
@@ -0,0 +1,35 @@
+import os
+import threading
+from typing import Optional
+
+
+class UploadLimits:
+    """Limits shared by the uploads of several files, so uploading them together keeps the same
+    number of chunk requests in flight and compressions running as a single upload would
+
+    :param max_chunks: Chunk requests in flight across all files
+    :type max_chunks: int
+    :param compressors: Chunks compressed at once across all files, defaults to the CPU count
+    :type compressors: int, optional
+    """
+
+    def __init__(self, max_chunks: int = 4, compressors: Optional[int] = None):
+        if max_chunks < 1 or (compressors is not None and compressors < 1):
+            raise ValueError("max_chunks and compressors must be at least 1")
+        self.max_chunks = max_chunks
+        self.compressors = compressors or os.cpu_count() or 1
+        self.send = threading.BoundedSemaphore(self.max_chunks)
+        self.compress = threading.BoundedSemaphore(self.compressors)
+        self._aborted = threading.Event()
+
+    @property
+    def aborted(self) -> bool:
+        """Get whether the remaining uploads should stop
+
+        :rtype: bool
+        """
+        return self._aborted.is_set()
+
+    def abort(self) -> None:
+        """Stop the uploads sharing these limits at their next chunk"""
+        self._aborted.set()
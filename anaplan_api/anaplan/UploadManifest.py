@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+class UploadManifest:
+    """Local record of the chunks of an upload that Anaplan has confirmed, so an interrupted upload
+    can continue where it stopped. The manifest holds the file ID, a fingerprint of the source, the
+    chunk size and a SHA-256 hash of each confirmed chunk. It is rewritten as each chunk is
+    confirmed and deleted once the upload is complete.
+
+    A chunk is only skipped on resume when the same chunk of the source still has the same hash,
+    so a chunk that changed since the interrupted upload is sent again.
+
+    :param path: Path of the JSON manifest file
+    :type path: Union[str, os.PathLike]
+    """
+
+    _VERSION = 1
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._state: dict = {}
+        self._chunks: Dict[int, str] = {}
+
+    @property
+    def chunks(self) -> Dict[int, str]:
+        """Get the hashes of the confirmed chunks
+
+        :return: SHA-256 hex digest of each confirmed chunk, by chunk number
+        :rtype: Dict[int, str]
+        """
+        with self._lock:
+            return dict(self._chunks)
+
+    def start(
+        self,
+        workspace: str,
+        model: str,
+        file_id: str,
+        fingerprint: Optional[str],
+        chunk_size: int,
+    ) -> bool:
+        """Load the manifest of an interrupted upload of the same source, or start a new one
+
+        :param workspace: ID of the workspace
+        :type workspace: str
+        :param model: ID of the model
+        :type model: str
+        :param file_id: ID of the file being uploaded
+        :type file_id: str
+        :param fingerprint: Fingerprint of the source, None if the source has none
+        :type fingerprint: str, optional
+        :param chunk_size: Chunk size in bytes
+        :type chunk_size: int
+        :return: Whether an interrupted upload with confirmed chunks is being resumed
+        :rtype: bool
+        """
+        state = {
+            "version": self._VERSION,
+            "workspace": workspace,
+            "model": model,
+            "file_id": file_id,
+            "fingerprint": fingerprint,
+            "chunk_size": chunk_size,
+        }
+        chunks: Dict[int, str] = {}
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                saved = json.load(file)
+            if all(saved.get(key) == value for key, value in state.items()):
+                chunks = {int(num): digest for num, digest in saved.get("chunks", {}).items()}
+            else:
+                logger.info(f"Manifest {self.path} belongs to another upload, starting again.")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+
+        with self._lock:
+            self._state = state
+            self._chunks = chunks
+            self._save()
+
+        if chunks:
+            logger.info(f"Resuming upload of file {file_id}, {len(chunks)} chunks already confirmed.")
+        return bool(chunks)
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        """Hash a chunk of uncompressed data
+
+        :param data: Chunk data
+        :type data: bytes
+        :return: SHA-256 hex digest
+        :rtype: str
+        """
+        return hashlib.sha256(data).hexdigest()
+
+    def confirmed(self, chunk_num: int, digest: str) -> bool:
+        """Check whether a chunk with this content has already been confirmed
+
+        :param chunk_num: ID of the chunk
+        :type chunk_num: int
+        :param digest: Hash of the chunk's current data
+        :type digest: str
+        :rtype: bool
+        """
+        with self._lock:
+            return self._chunks.get(chunk_num) == digest
+
+    def confirm(self, chunk_num: int, digest: str) -> None:
+        """Record a chunk confirmed by Anaplan and save the manifest
+
+        :param chunk_num: ID of the chunk
+        :type chunk_num: int
+        :param digest: Hash of the chunk's data
+        :type digest: str
+        """
+        with self._lock:
+            self._chunks[chunk_num] = digest
+            self._save()
+
+    def discard(self, chunk_nums: Iterable[int]) -> None:
+        """Forget chunks so they are sent again, e.g. ones missing from the server's chunk list
+
+        :param chunk_nums: IDs of the chunks
+        :type chunk_nums: Iterable[int]
+        """
+        with self._lock:
+            for chunk_num in chunk_nums:
+                self._chunks.pop(chunk_num, None)
+            self._save()
+
+    def beyond(self, chunk_count: int) -> List[int]:
+        """Get confirmed chunks past the end of the source, left by a longer interrupted upload
+
+        :param chunk_count: Number of chunks in the source
+        :type chunk_count: int
+        :rtype: List[int]
+        """
+        with self._lock:
+            return sorted(num for num in self._chunks if num >= chunk_count)
+
+    def clear(self) -> None:
+        """Delete the manifest once the upload is complete"""
+        with self._lock:
+            self._chunks = {}
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _save(self) -> None:
+        """Write the manifest to a temporary file and move it into place, so an interruption leaves
+        either the old or the new manifest"""
+        state = dict(self._state, chunks={str(num): self._chunks[num] for num in sorted(self._chunks)})
+        temp = self.path.with_name(f"{self.path.name}.tmp")
+        with open(temp, "w", encoding="utf-8") as file:
+            json.dump(state, file)
+        os.replace(temp, self.path)
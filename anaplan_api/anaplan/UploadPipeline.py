@@ -0,0 +1,302 @@
+from __future__ import annotations
+import logging
+import os
+import threading
+from contextvars import copy_context
+from queue import Empty, Full, Queue
+from time import monotonic
+from typing import TYPE_CHECKING, Callable, Iterable, List, Optional
+from .models.UploadResponse import UploadResponse
+
+if TYPE_CHECKING:
+    from .ChunkSizeTuner import ChunkSizeTuner
+    from .Upload import Upload
+    from .UploadLimits import UploadLimits
+    from .UploadManifest import UploadManifest
+    from .util.RetryPolicy import RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class UploadPipeline:
+    """Uploads chunks through three overlapping stages joined by bounded queues. The calling thread
+    reads the source, compressor threads gzip each chunk, and sender threads PUT it, so chunk n+1
+    is read and compressed while chunk n is on the wire. The compression backend releases the GIL,
+    so each compressor thread compresses its chunk on a separate core, and compressed chunks are
+    handed to the senders in chunk order.
+
+    :param upload: Upload whose file the chunks belong to
+    :type upload: Upload
+    :param endpoint: URL of the specified file
+    :type endpoint: str
+    :param workers: Number of sender threads, keep within the handler's pool size
+    :type workers: int
+    :param compressors: Number of compressor threads, defaults to the workers up to the CPU count
+    :type compressors: int, optional
+    :param max_buffered: Uncompressed chunks held at once, and capacity of the send queue. By default
+        each compressor holds one uncompressed chunk, the next is only read once it has been
+        compressed, and twice the workers of compressed chunks wait to be sent.
+    :type max_buffered: int, optional
+    :param compression_level: zlib compression level from 1 (fastest) to 9 (smallest)
+    :type compression_level: int
+    :param retry_policy: Policy for each chunk's PUT, defaults to the handler-wide policy
+    :type retry_policy: RetryPolicy, optional
+    :param manifest: Manifest recording confirmed chunks. Compressor threads hash each chunk and
+        skip the ones it has already confirmed.
+    :type manifest: UploadManifest, optional
+    :param tuner: Chunk size tuner that is told the compression ratio and send time of each chunk
+    :type tuner: ChunkSizeTuner, optional
+    :param limits: Send and compression slots shared with the uploads of other files
+    :type limits: UploadLimits, optional
+    """
+
+    _POLL_INTERVAL = 0.1
+
+    def __init__(
+        self,
+        upload: Upload,
+        endpoint: str,
+        workers: int = 1,
+        compressors: Optional[int] = None,
+        max_buffered: Optional[int] = None,
+        compression_level: int = 6,
+        retry_policy: Optional[RetryPolicy] = None,
+        manifest: Optional[UploadManifest] = None,
+        tuner: Optional[ChunkSizeTuner] = None,
+        limits: Optional[UploadLimits] = None,
+    ):
+        if compressors is None:
+            compressors = min(workers, os.cpu_count() or 1)
+        if workers < 1 or compressors < 1:
+            raise ValueError("workers and compressors must be at least 1")
+        self.upload = upload
+        self.endpoint = endpoint
+        self.workers = workers
+        self.compressors = compressors
+        self.max_buffered = max_buffered
+        self.compression_level = compression_level
+        self.retry_policy = retry_policy
+        self.manifest = manifest
+        self.tuner = tuner
+        self.limits = limits
+        self._failed = threading.Event()
+        self._read_slots: Optional[threading.Semaphore] = None
+        self._error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._turn = threading.Condition()
+        self._next_chunk = 0
+        self._compress_time = 0.0
+        self._send_time = 0.0
+        self._bytes_sent = 0
+        self._resumed = 0
+
+    def run(self, chunks: Iterable[bytes]) -> UploadResponse:
+        """Upload every chunk, returning once all are confirmed
+
+        :param chunks: Uncompressed chunk data in upload order
+        :type chunks: Iterable[bytes]
+        :raises Exception: A chunk could not be compressed or uploaded
+        :return: Chunk count, sizes and the time spent in each stage
+        :rtype: UploadResponse
+        """
+        started = monotonic()
+        # Uncompressed chunks are the largest, so one is only read once a compressor has released one
+        self._read_slots = threading.Semaphore(max(self.max_buffered or self.compressors, 1))
+        compress_queue: Queue = Queue()
+        send_queue: Queue = Queue(max(self.max_buffered or 2 * self.workers, 1))
+        compressors = self._start(self.compressors, self._compress, compress_queue, send_queue)
+        senders = self._start(self.workers, self._send, send_queue)
+
+        chunk_count = 0
+        bytes_read = 0
+        read_time = 0.0
+        try:
+            source = iter(chunks)
+            while not self._failed.is_set():
+                if self.limits is not None and self.limits.aborted:
+                    raise Exception(f"Upload of file {self.upload.file_id} aborted")
+                if not self._acquire(self._read_slots):
+                    break
+                read_started = monotonic()
+                data = next(source, None)
+                read_time += monotonic() - read_started
+                if data is None:
+                    break
+                chunk_count += 1
+                bytes_read += len(data)
+                if not self._put(compress_queue, (chunk_count - 1, data)):
+                    break
+                # Release the chunk before reading the next one, the compressor now owns it
+                data = None
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._finish(compressors, compress_queue)
+            self._finish(senders, send_queue)
+
+        if self._error is not None:
+            raise self._error
+
+        return UploadResponse(
+            self.upload.file_id,
+            chunk_count,
+            bytes_read,
+            self._bytes_sent,
+            read_time,
+            self._compress_time,
+            self._send_time,
+            monotonic() - started,
+            self.compressors,
+            self.workers,
+            self._resumed,
+        )
+
+    def _start(self, count: int, stage: Callable, *queues: Queue) -> List[threading.Thread]:
+        """Start the threads of a stage, each in its own copy of the caller's context so spans
+        nest under the upload"""
+        threads = [
+            threading.Thread(
+                target=copy_context().run,
+                args=(stage, *queues),
+                name=f"anaplan-upload-{stage.__name__.strip('_')}-{i}",
+                daemon=True,
+            )
+            for i in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _finish(self, threads: List[threading.Thread], queue: Queue) -> None:
+        """Signal the end of input to a stage and wait for its threads"""
+        for _ in threads:
+            if not self._put(queue, None):
+                break
+        for thread in threads:
+            thread.join()
+
+    def _fail(self, error: BaseException) -> None:
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._failed.set()
+
+    def _put(self, queue: Queue, item) -> bool:
+        """Put an item on a queue, giving up if another stage has failed"""
+        while not self._failed.is_set():
+            try:
+                queue.put(item, timeout=self._POLL_INTERVAL)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _take(self, queue: Queue):
+        """Take the next item from a queue, None at the end of input or if another stage has failed"""
+        while not self._failed.is_set():
+            try:
+                return queue.get(timeout=self._POLL_INTERVAL)
+            except Empty:
+                continue
+        return None
+
+    def _acquire(self, slots: threading.Semaphore) -> bool:
+        """Take a slot, giving up if this upload has failed or the uploads sharing limits have been
+        aborted"""
+        while not self._failed.is_set():
+            if self.limits is not None and self.limits.aborted:
+                self._fail(Exception(f"Upload of file {self.upload.file_id} aborted"))
+                break
+            if slots.acquire(timeout=self._POLL_INTERVAL):
+                return True
+        return False
+
+    def _compress(self, compress_queue: Queue, send_queue: Queue) -> None:
+        busy = 0.0
+        skipped = 0
+        try:
+            while True:
+                item = self._take(compress_queue)
+                if item is None:
+                    break
+                chunk_num, data = item
+                item = None
+                if self.limits is not None and not self._acquire(self.limits.compress):
+                    break
+                try:
+                    compress_started = monotonic()
+                    digest = compressed = None
+                    if self.manifest is not None:
+                        digest = self.manifest.digest(data)
+                    if digest is None or not self.manifest.confirmed(chunk_num, digest):
+                        compressed = self.upload.compress_chunk(
+                            chunk_num, data, self.compression_level
+                        )
+                        if self.tuner is not None:
+                            self.tuner.observe_compression(len(data), len(compressed))
+                    busy += monotonic() - compress_started
+                finally:
+                    # Release the slot before waiting for this chunk's turn to be sent
+                    if self.limits is not None:
+                        self.limits.compress.release()
+                data = None
+                # The uncompressed chunk is no longer held, so the next one can be read
+                self._read_slots.release()
+                if compressed is None:
+                    skipped += 1
+                    if not self._hand_over(send_queue, chunk_num, None):
+                        break
+                elif not self._hand_over(send_queue, chunk_num, (chunk_num, compressed, digest)):
+                    break
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            with self._lock:
+                self._compress_time += busy
+                self._resumed += skipped
+
+    def _hand_over(self, send_queue: Queue, chunk_num: int, item) -> bool:
+        """Wait for the previous chunk to reach the send queue, then queue this one, so chunks are
+        sent in order whichever compressor finishes first. A skipped chunk passes None."""
+        with self._turn:
+            while self._next_chunk != chunk_num:
+                if self._failed.is_set():
+                    return False
+                self._turn.wait(self._POLL_INTERVAL)
+            queued = item is None or self._put(send_queue, item)
+            self._next_chunk += 1
+            self._turn.notify_all()
+        return queued
+
+    def _send(self, send_queue: Queue) -> None:
+        busy = 0.0
+        sent = 0
+        try:
+            while True:
+                item = self._take(send_queue)
+                if item is None:
+                    break
+                chunk_num, data, digest = item
+                if self.limits is not None and not self._acquire(self.limits.send):
+                    break
+                send_started = monotonic()
+                try:
+                    self.upload.send_chunk(
+                        f"{self.endpoint}chunks/{chunk_num}", chunk_num, data, self.retry_policy
+                    )
+                finally:
+                    if self.limits is not None:
+                        self.limits.send.release()
+                if self.manifest is not None:
+                    self.manifest.confirm(chunk_num, digest)
+                busy += monotonic() - send_started
+                sent += len(data)
+                if self.tuner is not None:
+                    self.tuner.observe_send(len(data), monotonic() - send_started)
+                logger.debug(f"Chunk {chunk_num + 1} confirmed.")
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            with self._lock:
+                self._send_time += busy
+                self._bytes_sent += sent
@@ -0,0 +1,292 @@
+from __future__ import annotations
+import hashlib
+import json
+import logging
+from dataclasses import replace
+from time import monotonic
+from typing import TYPE_CHECKING, Generator, List, Optional, Union
+from .ChunkSizeTuner import ChunkSizeTuner
+from .UploadCache import UploadCache
+from .models.UploadResponse import UploadResponse
+
+if TYPE_CHECKING:
+    from .File import File
+    from .UploadManifest import UploadManifest
+    from .UploadSource import Chunk, UploadSource
+    from .util.RetryPolicy import RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class UploadPlan:
+    """Steps of uploading a source that do not depend on the transport, shared by Upload and AsyncUpload:
+    choosing the chunk size, the upload cache and manifest bookkeeping, checking the chunks the server
+    received and building each request. The upload classes only send the requests.
+
+    :param file: File being uploaded
+    :type file: File
+    :param chunk_size: Desired size of the chunk, in megabytes, or "auto" to size chunks from the
+        measured bandwidth, latency and compression ratio
+    :type chunk_size: Union[int, str]
+    :param source: Data to upload
+    :type source: UploadSource
+    :param manifest: Manifest recording confirmed chunks, so an interrupted upload resumes from
+        where it stopped
+    :type manifest: UploadManifest, optional
+    :param upload_cache: Record of the data each file already holds, None to upload every time
+    :type upload_cache: UploadCache, optional
+    """
+
+    def __init__(
+        self,
+        file: File,
+        chunk_size: Union[int, str],
+        source: UploadSource,
+        manifest: Optional[UploadManifest] = None,
+        upload_cache: Optional[UploadCache] = None,
+    ):
+        self.file = file
+        self.source = source
+        self.manifest = manifest
+        self.upload_cache = upload_cache
+        self.cache_key = UploadCache.key(file.workspace, file.model, file.file_id)
+        self.tuner: Optional[ChunkSizeTuner] = None
+        self.digest: Optional[str] = None
+        if chunk_size == "auto":
+            self.tuner = ChunkSizeTuner()
+            self.size = self.tuner.initial
+            if manifest is not None:
+                # The manifest matches chunks by number, so their boundaries must not move between runs
+                logger.info(
+                    f"Uploading resumable file {file.file_id} in fixed chunks of {self.size // 1024**2} MB."
+                )
+                self.tuner = None
+        else:
+            self.size = chunk_size * (1024**2)
+
+    def skip(self) -> Optional[UploadResponse]:
+        """Check the source against the upload cache. The source is only hashed here when the server
+        lists the file as it did after the recorded upload, so async callers run this in an executor.
+
+        :return: Response marked skipped if the file already holds the data, None to upload it
+        :rtype: UploadResponse, optional
+        """
+        if self.upload_cache is None:
+            return None
+        metadata = self.file.metadata
+        if self.source.rereadable and self.upload_cache.candidate(self.cache_key, metadata):
+            started = monotonic()
+            digest, bytes_read = UploadCache.digest(self.source, self.size)
+            entry = self.upload_cache.get(self.cache_key)
+            if entry is not None and self.upload_cache.unchanged(self.cache_key, digest, metadata):
+                logger.info(f"File {self.file.file_id} is unchanged since its last upload, skipping.")
+                elapsed = monotonic() - started
+                return UploadResponse(
+                    self.file.file_id,
+                    entry["chunks"],
+                    bytes_read,
+                    0,
+                    elapsed,
+                    0.0,
+                    0.0,
+                    elapsed,
+                    _chunk_size=entry["chunk_size"],
+                    _skipped=True,
+                )
+        self.upload_cache.forget(self.cache_key)
+        return None
+
+    def resume(self) -> bool:
+        """Open the manifest, checking it belongs to this file and source
+
+        :return: Whether an interrupted upload is resumed, so the metadata must not be posted again
+        :rtype: bool
+        """
+        return self.manifest is not None and self.manifest.start(
+            self.file.workspace,
+            self.file.model,
+            self.file.file_id,
+            self.source.fingerprint(),
+            self.size,
+        )
+
+    def chunks(self) -> Generator[Chunk, None, None]:
+        """Read the source in chunks of the planned size, hashing them as they are read when the
+        upload cache is used
+
+        :return: Uncompressed chunks in upload order
+        :rtype: Generator[Union[bytes, memoryview], None, None]
+        """
+        if self.tuner is not None:
+            chunks = self.tuner.chunks(self.source)
+        else:
+            chunks = self.source.chunks(self.size)
+        if self.upload_cache is None:
+            return chunks
+        return self._hashed(chunks)
+
+    def _hashed(self, chunks: Generator[Chunk, None, None]) -> Generator[Chunk, None, None]:
+        """Hash the chunks passing through, keeping the digest only once every chunk was read"""
+        self.digest = None
+        content_hash = hashlib.sha256()
+        try:
+            for chunk in chunks:
+                content_hash.update(chunk)
+                yield chunk
+        finally:
+            chunks.close()
+        self.digest = content_hash.hexdigest()
+
+    def checked(self, response: UploadResponse) -> UploadResponse:
+        """Check the chunks sent against the manifest and add the chunk size to the response
+
+        :param response: Response of the chunk upload
+        :type response: UploadResponse
+        :raises Exception: The source is shorter than the interrupted upload recorded in the manifest
+        :rtype: UploadResponse
+        """
+        stale = self.manifest.beyond(response.chunks) if self.manifest is not None else []
+        if stale:
+            raise Exception(
+                f"Source of file {self.file.file_id} is shorter than the interrupted upload in "
+                f"{self.manifest.path}, delete the manifest to upload it again"
+            )
+        if self.tuner is not None:
+            tuning = self.tuner.report()
+            return replace(response, _chunk_size=tuning["largest"] or self.size, _tuning=tuning)
+        return replace(response, _chunk_size=self.size)
+
+    def missing(self, response: UploadResponse, received: List[int]) -> List[int]:
+        """Find the chunks sent that the server has not received, and forget them in the manifest
+        so they are sent again
+
+        :param response: Response of the chunk upload
+        :type response: UploadResponse
+        :param received: IDs of the chunks in the server's chunk list
+        :type received: List[int]
+        :return: IDs of the missing chunks
+        :rtype: List[int]
+        """
+        missing = sorted(set(range(response.chunks)) - set(received))
+        if missing:
+            logger.warning(
+                f"Server is missing chunks {missing} of file {self.file.file_id}, sending them again."
+            )
+            self.manifest.discard(missing)
+        return missing
+
+    def received(self, response: UploadResponse, received: List[int]) -> None:
+        """Check that the server received every chunk sent
+
+        :param response: Response of the chunk upload
+        :type response: UploadResponse
+        :param received: IDs of the chunks in the server's chunk list
+        :type received: List[int]
+        :raises Exception: Chunks are still missing
+        """
+        missing = sorted(set(range(response.chunks)) - set(received))
+        if missing:
+            logger.error(f"Chunks {missing} of file {self.file.file_id} were not received")
+            raise Exception(f"Chunks {missing} of file {self.file.file_id} were not received")
+
+    def completed(self, response: UploadResponse, metadata: Optional[dict] = None) -> None:
+        """Clear the manifest and record the upload in the cache once the file is marked complete
+
+        :param response: Response of the chunk upload
+        :type response: UploadResponse
+        :param metadata: File's entry in the server's files list after the upload, None to leave
+            the upload out of the cache
+        :type metadata: dict, optional
+        """
+        logger.info(f"Upload of file {self.file.file_id} complete.")
+        if self.manifest is not None:
+            self.manifest.clear()
+        if self.upload_cache is not None and self.digest is not None and metadata is not None:
+            self.upload_cache.record(
+                self.cache_key, self.digest, response.chunk_size, response.chunks, metadata
+            )
+
+    @staticmethod
+    def metadata_request(file: File, endpoint: str) -> dict:
+        """Build the request posting the file metadata, which starts the upload, or marking it complete
+
+        :param file: File being uploaded
+        :type file: File
+        :param endpoint: URL of the specified file, or of its complete action
+        :type endpoint: str
+        :return: Arguments for the handler's make_request
+        :rtype: dict
+        """
+        operation = "upload_complete" if endpoint.endswith("complete") else "file_metadata"
+        return {
+            "endpoint": endpoint,
+            "method": "POST",
+            "headers": {
+                "Authorization": file.connection.authorization.token_value,
+                "Content-Type": "application/json",
+            },
+            "data": json.dumps({"id": file.file_id, "chunkCount": -1}),
+            "idempotent": True,  # Re-sending the same metadata leaves the file unchanged
+            "context": {"operation": operation, "file_id": file.file_id},
+        }
+
+    @staticmethod
+    def chunk_request(
+        file: File, url: str, chunk_num: int, data: bytes, retry_policy: Optional[RetryPolicy] = None
+    ) -> dict:
+        """Build the request sending a gzip-compressed chunk
+
+        :param file: File being uploaded
+        :type file: File
+        :param url: URL of the chunk
+        :type url: str
+        :param chunk_num: ID of the chunk
+        :type chunk_num: int
+        :param data: Gzip-compressed data
+        :type data: bytes
+        :param retry_policy: Policy for this request, defaults to the handler-wide policy
+        :type retry_policy: RetryPolicy, optional
+        :return: Arguments for the handler's make_request
+        :rtype: dict
+        """
+        return {
+            "endpoint": url,
+            "method": "PUT",
+            "headers": {
+                "Authorization": file.connection.authorization.token_value,
+                "Content-Type": "application/x-gzip",
+            },
+            "data": data,
+            "retry_policy": retry_policy,
+            "context": {"operation": "upload_chunk", "file_id": file.file_id, "chunk": chunk_num},
+        }
+
+    @staticmethod
+    def chunk_list_request(file: File, endpoint: str) -> dict:
+        """Build the request listing the chunks the server has received
+
+        :param file: File being uploaded
+        :type file: File
+        :param endpoint: URL of the specified file
+        :type endpoint: str
+        :return: Arguments for the handler's get_json
+        :rtype: dict
+        """
+        return {
+            "endpoint": f"{endpoint}chunks",
+            "headers": {
+                "Authorization": file.connection.authorization.token_value,
+                "Content-Type": "application/json",
+            },
+            "context": {"operation": "chunk_list", "file_id": file.file_id},
+        }
+
+    @staticmethod
+    def chunk_ids(chunk_list: dict) -> List[int]:
+        """Get the IDs in a chunk list response
+
+        :param chunk_list: Parsed chunk list
+        :type chunk_list: dict
+        :rtype: List[int]
+        """
+        return [int(chunk["id"]) for chunk in chunk_list.get("chunks", [])]
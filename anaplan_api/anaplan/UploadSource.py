@@ -0,0 +1,467 @@
+import codecs
+import csv
+import hashlib
+import io
+import logging
+import mmap
+import os
+from abc import ABC, abstractmethod
+from functools import partial
+from pathlib import Path
+from typing import BinaryIO, Callable, Generator, IO, Iterable, Optional, Sequence, Union
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.csv
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+Chunk = Union[bytes, memoryview]
+
+# Strings longer than this, or containing a line break, are always treated as data
+_MAX_PATH_LENGTH = 4096
+# Rows are encoded in blocks of about this many characters rather than one at a time
+_ROW_BLOCK = 64 * 1024
+# Table rows are serialized in batches of about this fraction of a chunk
+_BATCH_FRACTION = 4
+# Rows serialized in the first batch, used to estimate the size of a row
+_SAMPLE_ROWS = 1000
+
+
+class UploadSource(ABC):
+    """Data to upload to an Anaplan file, read lazily in chunks of an exact size in bytes so only
+    the chunks being compressed or sent are held in memory. Data is uploaded as UTF-8; text is
+    encoded and other source encodings are transcoded as the chunks are read."""
+
+    # Whether chunks can be read more than once, e.g. to hash the data before uploading it
+    rereadable = False
+
+    @abstractmethod
+    def chunks(self, chunk_size: int) -> Generator[Chunk, None, None]:
+        """Read the data in chunks of chunk_size bytes, the last one shorter
+
+        :param chunk_size: Chunk size in bytes
+        :type chunk_size: int
+        :return: Chunks in upload order
+        :rtype: Generator[Union[bytes, memoryview], None, None]
+        """
+
+    def fingerprint(self) -> Optional[str]:
+        """Identify the data, so a resumed upload can tell whether its source is the one it started with
+
+        :return: Fingerprint of the data, None if it cannot be identified without reading it
+        :rtype: str, optional
+        """
+        return None
+
+    @staticmethod
+    def of(data, detect_paths: bool = True) -> "UploadSource":
+        """Wrap data passed to file_upload in the matching source
+
+        :param data: An UploadSource, a path, str or bytes data, a binary or text file object,
+            a DataFrame or Arrow table, or an iterable of bytes, str or rows
+        :param detect_paths: Treat a str naming an existing file as a path rather than as data
+        :type detect_paths: bool
+        :raises TypeError: Data of an unsupported type
+        :rtype: UploadSource
+        """
+        if isinstance(data, UploadSource):
+            return data
+        if isinstance(data, os.PathLike):
+            return PathSource(data)
+        if isinstance(data, str):
+            if detect_paths and UploadSource._is_path(data):
+                return PathSource(data)
+            return MemorySource(data)
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            return MemorySource(data)
+        if isinstance(data, pd.DataFrame):
+            return DataFrameSource(data)
+        if pyarrow is not None and isinstance(
+            data, (pyarrow.Table, pyarrow.RecordBatch, pyarrow.RecordBatchReader)
+        ):
+            return ArrowSource(data)
+        if hasattr(data, "read"):
+            return FileObjectSource(data)
+        if isinstance(data, Iterable):
+            return IterableSource(data)
+        raise TypeError(f"Cannot upload data of type {type(data).__name__}")
+
+    @staticmethod
+    def _is_path(data: str) -> bool:
+        """Check whether a string names an existing file without stat'ing multi-line or oversized data"""
+        if not data or len(data) > _MAX_PATH_LENGTH or "\n" in data or "\0" in data:
+            return False
+        try:
+            return Path(data).is_file()
+        except (OSError, ValueError):
+            return False
+
+    @staticmethod
+    def _rechunk(
+        blocks: Iterable[Chunk], chunk_size: Union[int, Callable[[], int]]
+    ) -> Generator[Chunk, None, None]:
+        """Regroup blocks of any size into chunks of exactly chunk_size bytes, or of the size returned
+        by calling chunk_size as each chunk starts. Whole chunks within a block are yielded as
+        memoryview slices of it, and the rest is copied once into a new buffer per chunk, so at most
+        one partly filled chunk is held besides the current block."""
+        next_size = chunk_size if callable(chunk_size) else lambda: chunk_size
+        size = next_size()
+        buffer = None
+        filled = 0
+        for block in blocks:
+            view = memoryview(block).cast("B")
+            offset = 0
+            while offset < len(view):
+                if not filled and len(view) - offset >= size:
+                    yield view[offset : offset + size]
+                    offset += size
+                    size = next_size()
+                    continue
+                if buffer is None:
+                    buffer = bytearray(size)
+                take = min(size - filled, len(view) - offset)
+                buffer[filled : filled + take] = view[offset : offset + take]
+                filled += take
+                offset += take
+                if filled == size:
+                    yield memoryview(buffer)
+                    buffer = None
+                    filled = 0
+                    size = next_size()
+        if filled:
+            yield memoryview(buffer)[:filled]
+
+
+class MemorySource(UploadSource):
+    """str or bytes data held in memory. Bytes are sliced without copying; text is encoded in small
+    slices into one chunk at a time instead of all at once, so memory use above the caller's data
+    stays at about one chunk.
+
+    :param data: Data to upload
+    :type data: Union[str, bytes, bytearray, memoryview]
+    """
+
+    rereadable = True
+
+    def __init__(self, data: Union[str, bytes, bytearray, memoryview]):
+        self.data = data
+
+    def chunks(self, chunk_size: int) -> Generator[Chunk, None, None]:
+        if isinstance(self.data, str):
+            text = self.data
+            # Small slices are encoded straight into each chunk's buffer, so neither a chunk-sized
+            # slice of the text nor its encoded copy is held alongside the chunk
+            yield from UploadSource._rechunk(
+                (
+                    text[start : start + _ROW_BLOCK].encode("utf-8")
+                    for start in range(0, len(text), _ROW_BLOCK)
+                ),
+                chunk_size,
+            )
+            return
+        view = memoryview(self.data).cast("B")
+        for start in range(0, len(view), chunk_size):
+            yield view[start : start + chunk_size]
+
+    def fingerprint(self) -> Optional[str]:
+        if isinstance(self.data, str):
+            return None
+        return hashlib.sha256(self.data).hexdigest()
+
+
+class FileObjectSource(UploadSource):
+    """An open file object. Binary files that support fileno are memory-mapped and yielded as
+    memoryview slices of the mapping, other binary files are read with readinto into one new buffer
+    per chunk, and text files are encoded as they are read. The file is not closed.
+
+    :param file: File opened in binary or text mode
+    :type file: IO
+    :param encoding: Encoding of a binary file, transcoded to UTF-8 unless it already is.
+        None uploads the bytes unchanged.
+    :type encoding: str, optional
+    """
+
+    def __init__(self, file: IO, encoding: Optional[str] = None):
+        self.file = file
+        self.encoding = encoding
+
+    def chunks(self, chunk_size: int) -> Generator[Chunk, None, None]:
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1 byte")
+        if isinstance(self.file, io.TextIOBase) or isinstance(self.file.read(0), str):
+            yield from UploadSource._rechunk(
+                (
+                    block.encode("utf-8")
+                    for block in iter(partial(self.file.read, chunk_size), "")
+                ),
+                chunk_size,
+            )
+        elif self.encoding is not None and codecs.lookup(self.encoding).name != "utf-8":
+            yield from self._transcoded_chunks(chunk_size)
+        elif self._mappable():
+            yield from self._mapped_chunks(chunk_size)
+        else:
+            yield from self._buffered_chunks(chunk_size)
+
+    def _mappable(self) -> bool:
+        try:
+            return os.fstat(self.file.fileno()).st_size > self.file.tell()
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            return False
+
+    def _mapped_chunks(self, chunk_size: int) -> Generator[memoryview, None, None]:
+        mapped = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        try:
+            for start in range(self.file.tell(), len(view), chunk_size):
+                yield view[start : start + chunk_size]
+        finally:
+            view.release()
+            try:
+                mapped.close()
+            except BufferError:
+                # A chunk is still referenced, e.g. by a failed upload's traceback. The mapping
+                # is closed when the last reference is collected.
+                logger.debug("Deferring unmap of uploaded file until its chunks are released")
+
+    def _buffered_chunks(self, chunk_size: int) -> Generator[memoryview, None, None]:
+        source: BinaryIO = self.file
+        while True:
+            view = memoryview(bytearray(chunk_size))
+            filled = 0
+            while filled < chunk_size:
+                read = source.readinto(view[filled:])
+                if not read:
+                    break
+                filled += read
+            if not filled:
+                return
+            yield view[:filled]
+            if filled < chunk_size:
+                return
+
+    def _transcoded_chunks(self, chunk_size: int) -> Generator[bytes, None, None]:
+        decoder = codecs.getincrementaldecoder(self.encoding)()
+
+        def blocks():
+            while True:
+                block = self.file.read(chunk_size)
+                yield decoder.decode(block, final=not block).encode("utf-8")
+                if not block:
+                    return
+
+        yield from UploadSource._rechunk(blocks(), chunk_size)
+
+
+class PathSource(UploadSource):
+    """A local file, opened when the upload starts and closed when it ends
+
+    :param path: Path to the file
+    :type path: Union[str, os.PathLike]
+    :param encoding: Encoding of the file, transcoded to UTF-8 unless it already is.
+        None uploads the file's bytes unchanged.
+    :type encoding: str, optional
+    """
+
+    rereadable = True
+
+    def __init__(self, path: Union[str, os.PathLike], encoding: Optional[str] = None):
+        self.path = path
+        self.encoding = encoding
+
+    def chunks(self, chunk_size: int) -> Generator[Chunk, None, None]:
+        with open(self.path, "rb") as file:
+            yield from FileObjectSource(file, self.encoding).chunks(chunk_size)
+
+    def fingerprint(self) -> Optional[str]:
+        """Identify the file by its path, size and modification time"""
+        stat = os.stat(self.path)
+        return f"{os.path.abspath(self.path)}:{stat.st_size}:{stat.st_mtime_ns}:{self.encoding}"
+
+
+class IterableSource(UploadSource):
+    """An iterable of bytes, str or rows, such as a generator streaming a database extract. Rows
+    are written as CSV lines. The iterable is consumed once.
+
+    :param items: Blocks of bytes or text, or rows of values
+    :type items: Iterable
+    :param header: Column names written before the first item
+    :type header: Sequence[str], optional
+    :param delimiter: Field separator for rows
+    :type delimiter: str
+    """
+
+    def __init__(
+        self, items: Iterable, header: Optional[Sequence[str]] = None, delimiter: str = ","
+    ):
+        self.items = items
+        self.header = header
+        self.delimiter = delimiter
+
+    @property
+    def rereadable(self) -> bool:
+        return isinstance(self.items, (list, tuple))
+
+    def chunks(self, chunk_size: int) -> Generator[Chunk, None, None]:
+        yield from UploadSource._rechunk(self._blocks(), chunk_size)
+
+    def _blocks(self) -> Generator[Chunk, None, None]:
+        text = io.StringIO()
+        writer = csv.writer(text, delimiter=self.delimiter, lineterminator="\n")
+        if self.header is not None:
+            writer.writerow(self.header)
+
+        for item in self.items:
+            if isinstance(item, (bytes, bytearray, memoryview)):
+                if text.tell():
+                    yield text.getvalue().encode("utf-8")
+                    text.seek(0)
+                    text.truncate()
+                yield item
+                continue
+            if isinstance(item, str):
+                text.write(item)
+            else:
+                writer.writerow(item)
+            if text.tell() >= _ROW_BLOCK:
+                yield text.getvalue().encode("utf-8")
+                text.seek(0)
+                text.truncate()
+
+        if text.tell():
+            yield text.getvalue().encode("utf-8")
+
+
+class DataFrameSource(UploadSource):
+    """A pandas DataFrame written as CSV one batch of rows at a time, so only the frame and a batch
+    of about a quarter chunk of text are held in memory rather than the whole CSV. Batches are
+    serialized by DataFrame.to_csv, or by the faster pyarrow.csv when use_arrow is set. Arrow writes
+    dates with a time, floats without a trailing ".0" and quotes every string, and it rejects object
+    columns of mixed types, so the uploaded text differs from to_csv.
+
+    :param frame: Data to upload
+    :type frame: pandas.DataFrame
+    :param index: Write the index as the first column
+    :type index: bool
+    :param delimiter: Field separator
+    :type delimiter: str
+    :param use_arrow: Serialize with pyarrow.csv instead of DataFrame.to_csv
+    :type use_arrow: bool
+    """
+
+    rereadable = True
+
+    def __init__(
+        self,
+        frame: pd.DataFrame,
+        index: bool = False,
+        delimiter: str = ",",
+        use_arrow: bool = False,
+    ):
+        if use_arrow and pyarrow is None:
+            raise ImportError("pyarrow is required to serialize with Arrow, install anaplan-api[arrow]")
+        self.frame = frame
+        self.index = index
+        self.delimiter = delimiter
+        self.use_arrow = use_arrow
+
+    def chunks(self, chunk_size: int) -> Generator[Chunk, None, None]:
+        yield from UploadSource._rechunk(self._blocks(chunk_size), chunk_size)
+
+    def _blocks(self, chunk_size: int) -> Generator[bytes, None, None]:
+        rows = _SAMPLE_ROWS
+        start = 0
+        while True:
+            batch = self.frame.iloc[start : start + rows]
+            block = self._serialize(batch, header=start == 0)
+            yield block
+            start += len(batch)
+            if start >= len(self.frame):
+                return
+            rows = _batch_rows(len(block), len(batch), chunk_size)
+
+    def _serialize(self, batch: pd.DataFrame, header: bool) -> bytes:
+        if self.use_arrow:
+            # Arrow appends a preserved index as the last column, so move it to the front first
+            batch = batch.reset_index() if self.index else batch
+            return _arrow_csv(
+                pyarrow.RecordBatch.from_pandas(batch, preserve_index=False),
+                header,
+                self.delimiter,
+            )
+        return batch.to_csv(
+            header=header, index=self.index, sep=self.delimiter, lineterminator="\n"
+        ).encode("utf-8")
+
+
+class ArrowSource(UploadSource):
+    """An Arrow table, record batch or stream of record batches written as CSV by pyarrow.csv one
+    slice of rows at a time. Slices share the table's buffers, so only one batch of text, about a
+    quarter chunk, is held in memory alongside the table. A reader or iterable is consumed once.
+
+    :param data: Table, record batch, RecordBatchReader or iterable of record batches
+    :type data: Union[pyarrow.Table, pyarrow.RecordBatch, pyarrow.RecordBatchReader, Iterable]
+    :param delimiter: Field separator
+    :type delimiter: str
+    :raises ImportError: pyarrow is not installed
+    """
+
+    def __init__(self, data, delimiter: str = ","):
+        if pyarrow is None:
+            raise ImportError("pyarrow is required to upload Arrow data, install anaplan-api[arrow]")
+        self.data = data
+        self.delimiter = delimiter
+
+    @property
+    def rereadable(self) -> bool:
+        return isinstance(self.data, (pyarrow.Table, pyarrow.RecordBatch))
+
+    def chunks(self, chunk_size: int) -> Generator[Chunk, None, None]:
+        yield from UploadSource._rechunk(self._blocks(chunk_size), chunk_size)
+
+    def _batches(self) -> Iterable:
+        if isinstance(self.data, pyarrow.Table):
+            return self.data.to_batches()
+        if isinstance(self.data, pyarrow.RecordBatch):
+            return [self.data]
+        return self.data
+
+    def _blocks(self, chunk_size: int) -> Generator[bytes, None, None]:
+        rows = _SAMPLE_ROWS
+        header = True
+        schema = getattr(self.data, "schema", None)
+        for batch in self._batches():
+            schema = batch.schema
+            offset = 0
+            while offset < batch.num_rows:
+                piece = batch.slice(offset, rows)
+                block = _arrow_csv(piece, header, self.delimiter)
+                yield block
+                header = False
+                offset += piece.num_rows
+                rows = _batch_rows(len(block), piece.num_rows, chunk_size)
+        if header and schema is not None:
+            # Without any rows, upload the column names alone
+            yield _arrow_csv(schema.empty_table(), True, self.delimiter)
+
+
+def _batch_rows(block_size: int, rows: int, chunk_size: int) -> int:
+    """Estimate the rows per batch that serialize to about a quarter chunk from the last batch"""
+    if not rows or not block_size:
+        return _SAMPLE_ROWS
+    return max(int(chunk_size / _BATCH_FRACTION / (block_size / rows)), 1)
+
+
+def _arrow_csv(batch, header: bool, delimiter: str) -> bytes:
+    """Write a record batch as CSV with pyarrow.csv"""
+    sink = io.BytesIO()
+    pyarrow.csv.write_csv(
+        batch,
+        sink,
+        pyarrow.csv.WriteOptions(include_header=header, delimiter=delimiter),
+    )
+    return sink.getvalue()
@@ -32,6 +32,8 @@ class User:
         """
         self._conn = conn
         self._user_id = user_id
+        if conn.transport is not None:
+            self._handler = conn.transport
 
     def get_current_user(self):
         """Get the ID of the current user
@@ -57,9 +59,12 @@ class User:
 
         try:
             logger.debug("Retrieving details of current user.")
-            user_details = self._handler.make_request(
-                url, "GET", headers=get_header
-            ).json()
+            user_details = self._handler.get_json(
+                url,
+                headers=get_header,
+                cache=True,
+                context={"operation": "user_details"},
+            )
         except Exception as e:
             logger.error(f"Error fetching user details {e}", exc_info=True)
             raise Exception(f"Error fetching user details {e}")
@@ -91,9 +96,12 @@ class User:
 
         try:
             logger.debug("Retrieving details of current user.")
-            user_details = self._handler.make_request(
-                url, "GET", headers=get_header
-            ).json()
+            user_details = self._handler.get_json(
+                url,
+                headers=get_header,
+                cache=True,
+                context={"operation": "user_details"},
+            )
         except Exception as e:
             logger.error(f"Error fetching user details {e}", exc_info=True)
             raise Exception(f"Error fetching user details {e}")
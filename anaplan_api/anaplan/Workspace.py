@@ -27,8 +27,11 @@ class Workspace(User):
         logger.info(f"Fetching workspaces for {user_id}")
 
         try:
-            workspace_list = (
-                super()._handler.make_request(url, "GET", headers=get_header).json()
+            workspace_list = super()._handler.get_json(
+                url,
+                headers=get_header,
+                cache=True,
+                context={"operation": "list_workspaces"},
             )
         except Exception as e:
             logger.error(f"Error getting workspace list: {e}", exc_info=True)
@@ -0,0 +1,135 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import asyncio
+import logging
+from .AsyncRequestHandler import AsyncRequestHandler
+from ..models.TaskResponse import TaskResponse
+from ..models.AnaplanVersion import AnaplanVersion
+from ..util.JsonCodec import JsonCodec
+from ..util.Tracing import Tracing
+from ..util.Util import RequestFailedError
+
+if TYPE_CHECKING:
+    from ..Action import Action
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAction:
+    """Runs an Anaplan action task and polls it to completion without blocking the event loop.
+
+    :param _handler: Class for sending API requests
+    :type _handler: AsyncRequestHandler
+    :param _action: Action describing the task endpoint, request body and retry count
+    :type _action: Action
+    :param _poll_interval: Seconds to wait between task status requests
+    :type _poll_interval: float
+    """
+
+    _handler: AsyncRequestHandler = AsyncRequestHandler(AnaplanVersion().base_url)
+    _action: Action
+    _poll_interval: float
+
+    def __init__(self, action: Action, poll_interval: float = 1):
+        self._action = action
+        self._poll_interval = poll_interval
+
+    @property
+    def handler(self) -> AsyncRequestHandler:
+        return self._handler
+
+    @property
+    def action(self) -> Action:
+        return self._action
+
+    async def execute(self) -> TaskResponse:
+        """Triggers the specified action
+
+        :return: TaskResponse object with the details of the completed action
+        """
+        post_header = {
+            "Authorization": self._action.authorization,
+            "Content-Type": "application/json",
+        }
+
+        endpoint = self._action.endpoint
+
+        task_id = await self.post_task(endpoint, post_header)
+        return await self.check_status(endpoint, task_id)
+
+    async def post_task(self, url: str, post_header: dict) -> str:
+        """POST a new task for the action, retrying according to the action's retry policy
+
+        :param url: URL for the action task
+        :type url: str
+        :param post_header: Authorization and content type headers
+        :type post_header: dict
+        :raises RequestFailedError: Task could not be created within the retry policy
+        :return: Task ID for the executed action
+        """
+        try:
+            with Tracing.span("anaplan.task_post", action_id=self._action.action_id):
+                run_action = (
+                    await self._handler.make_request(
+                        url,
+                        "POST",
+                        data=self._action.request_body(),
+                        headers=post_header,
+                        retry_policy=self._action.retry_policy,
+                        context={
+                            "operation": "task_post",
+                            "action_id": self._action.action_id,
+                        },
+                    )
+                ).json()
+        except Exception as e:
+            logger.error(f"Error running action {e}", exc_info=True)
+            raise RequestFailedError(f"Unable to execute {self._action.action_id}: {e}")
+
+        if "task" not in run_action or "taskId" not in run_action["task"]:
+            raise ValueError("Unable to fetch task ID.")
+
+        return run_action["task"]["taskId"]
+
+    async def check_status(self, url: str, task_id: str) -> TaskResponse:
+        """Checks the status of the Anaplan task ID until complete then return the results
+
+        :param url: URL of Anaplan action
+        :param task_id: Anaplan task ID for executed action
+        :return: TaskResponse object with the details of the completed action
+        """
+        post_header = {
+            "Authorization": self._action.authorization,
+            "Content-Type": "application/json",
+        }
+        status_url = f"{url}/{task_id}"
+        poll = 0
+
+        logger.debug("Checking task status.")
+
+        while True:
+            poll += 1
+            try:
+                with Tracing.span("anaplan.task_poll", task_id=task_id, poll=poll) as span:
+                    response = await self._handler.make_request(
+                        status_url,
+                        "GET",
+                        headers=post_header,
+                        context={
+                            "operation": "task_poll",
+                            "action_id": self._action.action_id,
+                            "task_id": task_id,
+                            "poll": poll,
+                        },
+                    )
+                    status = JsonCodec.task_state(response.content)
+                    span.set_attribute("task_state", status)
+            except Exception as e:
+                logger.error(f"Error getting result for task {e}", exc_info=True)
+                raise Exception(f"Error getting result for task {e}")
+
+            if status == "COMPLETE":
+                logger.info("Task completed")
+                return TaskResponse(response.json()["task"], status_url)
+
+            await asyncio.sleep(self._poll_interval)
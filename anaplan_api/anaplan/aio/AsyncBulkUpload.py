@@ -0,0 +1,157 @@
+from __future__ import annotations
+import asyncio
+import logging
+from time import monotonic
+from typing import TYPE_CHECKING, Dict, Mapping, Optional, Union
+from ..ResourceParserFile import ResourceParserFile
+from ..UploadSource import PathSource, UploadSource
+from ..models.FileUploadResult import FileUploadResult
+from ..util.Tracing import Tracing
+from .AsyncFileUpload import AsyncFileUpload
+from .AsyncResources import AsyncResources
+from .AsyncStreamUpload import AsyncStreamUpload
+from .AsyncUploadLimits import AsyncUploadLimits
+
+if TYPE_CHECKING:
+    from ..models.AnaplanConnection import AnaplanConnection
+    from ..models.AnaplanResourceFile import AnaplanResourceFile
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBulkUpload:
+    """Uploads several files to one model at once on the running event loop. The model's files list
+    is fetched once for all of them, and every file's chunks share one limit on requests in flight
+    and on compressions. Aborting cancels the uploads still running.
+
+    :param conn: Object with authentication, workspace, and model details
+    :type conn: AnaplanConnection
+    :param sources: Data to upload by file ID, anything file_upload accepts
+    :type sources: Mapping[str, Any]
+    :param chunk_size: Chunk size in megabytes, or "auto"
+    :type chunk_size: Union[int, str]
+    :param max_chunks: Chunk requests in flight across all files
+    :type max_chunks: int
+    :param compressors: Chunks compressed at once across all files, defaults to the CPU count
+    :type compressors: int, optional
+    :param max_files: Files uploaded at once, defaults to max_chunks
+    :type max_files: int, optional
+    :param abort_on_error: Stop the remaining uploads when one file fails
+    :type abort_on_error: bool
+    """
+
+    def __init__(
+        self,
+        conn: AnaplanConnection,
+        sources: Mapping,
+        chunk_size: Union[int, str] = 10,
+        max_chunks: int = 4,
+        compressors: Optional[int] = None,
+        max_files: Optional[int] = None,
+        abort_on_error: bool = False,
+    ):
+        self.conn = conn
+        self.sources = sources
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.compressors = compressors
+        self.max_files = max(min(max_files or max_chunks, len(sources)), 1)
+        self.abort_on_error = abort_on_error
+        self._aborted = False
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def run(self) -> Dict[str, FileUploadResult]:
+        """Upload every file, returning once all have finished or been aborted
+
+        :return: Status, upload summary, error and timings of each file, by file ID
+        :rtype: Dict[str, FileUploadResult]
+        """
+        started = monotonic()
+        limits = AsyncUploadLimits(self.max_chunks, self.compressors)
+        files = await AsyncResources(self.conn, "files").get_resources()
+        file_resources = ResourceParserFile().get_parser(files)
+        file_slots = asyncio.Semaphore(self.max_files)
+
+        self._tasks = {
+            file_id: asyncio.ensure_future(
+                self._upload(file_id, data, file_resources, limits, file_slots, started)
+            )
+            for file_id, data in self.sources.items()
+        }
+        try:
+            await asyncio.wait(self._tasks.values())
+        except BaseException:
+            for task in self._tasks.values():
+                task.cancel()
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+            raise
+        return {file_id: task.result() for file_id, task in self._tasks.items()}
+
+    async def _upload(
+        self,
+        file_id: str,
+        data,
+        file_resources: AnaplanResourceFile,
+        limits: AsyncUploadLimits,
+        file_slots: asyncio.Semaphore,
+        started: float,
+    ) -> FileUploadResult:
+        file_started = None
+        try:
+            async with file_slots:
+                file_started = monotonic()
+                with Tracing.span(
+                    "anaplan.file_upload", file_id=file_id, chunk_size=self.chunk_size
+                ):
+                    source = UploadSource.of(data)
+                    uploader_class = (
+                        AsyncFileUpload if isinstance(source, PathSource) else AsyncStreamUpload
+                    )
+                    uploader = await uploader_class.create(
+                        self.conn, file_id, file_resources=file_resources
+                    )
+                    response = await uploader.upload(
+                        self.chunk_size, source, self.max_chunks, limits=limits
+                    )
+        except asyncio.CancelledError:
+            if not self._aborted:
+                raise
+            return self._result(file_id, "aborted", started, file_started)
+        except Exception as e:
+            if self._aborted:
+                return self._result(file_id, "aborted", started, file_started, error=e)
+            logger.error(f"Error uploading file {file_id}: {e}")
+            if self.abort_on_error:
+                logger.warning("Aborting the remaining uploads.")
+                self._abort()
+            return self._result(file_id, "failed", started, file_started, error=e)
+
+        status = "skipped" if response.skipped else "complete"
+        return self._result(file_id, status, started, file_started, response)
+
+    def _abort(self) -> None:
+        """Cancel the uploads of the other files"""
+        self._aborted = True
+        current = asyncio.current_task()
+        for task in self._tasks.values():
+            if task is not current:
+                task.cancel()
+
+    @staticmethod
+    def _result(
+        file_id: str,
+        status: str,
+        started: float,
+        file_started: Optional[float],
+        response=None,
+        error: Optional[BaseException] = None,
+    ) -> FileUploadResult:
+        now = monotonic()
+        return FileUploadResult(
+            file_id,
+            status,
+            response,
+            error,
+            (file_started or now) - started,
+            now - file_started if file_started is not None else 0.0,
+        )
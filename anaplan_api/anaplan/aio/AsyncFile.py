@@ -0,0 +1,64 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from ..File import File
+from ..ResourceParserFile import ResourceParserFile
+from ..models.AnaplanVersion import AnaplanVersion
+from .AsyncRequestHandler import AsyncRequestHandler
+from .AsyncResources import AsyncResources
+
+if TYPE_CHECKING:
+    from ..models.AnaplanConnection import AnaplanConnection
+
+
+class AsyncFile(File):
+    """A class representing an Anaplan file, with metadata fetched asynchronously.
+
+    Instances should be created with :meth:`create`, which awaits the file metadata
+    that the synchronous File fetches in its constructor.
+    """
+
+    _handler: AsyncRequestHandler = AsyncRequestHandler(AnaplanVersion().base_url)
+
+    def __init__(self, conn: AnaplanConnection, file_id: str, **kwargs):
+        """
+        :param conn: Object with authentication, workspace, and model details
+        :type conn: AnaplanConnection
+        :param file_id: ID of the specified file in the Anaplan model
+        :type file_id: str
+        """
+        self._conn = conn
+        self._file_id = file_id
+        self._workspace = conn.workspace
+        self._model = conn.model
+        self._endpoint = (
+            f"workspaces/{self._workspace}/models/{self._model}/files/{self._file_id}/"
+        )
+
+    @classmethod
+    async def create(cls, conn: AnaplanConnection, file_id: str, **kwargs):
+        """Create the file object and load its metadata
+
+        :param conn: Object with authentication, workspace, and model details
+        :type conn: AnaplanConnection
+        :param file_id: ID of the specified file in the Anaplan model
+        :type file_id: str
+        :param file_resources: Files list already fetched from the model, so several files can share
+            one request
+        :type file_resources: AnaplanResourceFile, optional
+        :raises ResourceNotFoundError: If specified file ID is not found in the model
+        """
+        file = cls(conn, file_id, **kwargs)
+        file_resources = kwargs.get("file_resources")
+        if file_resources is not None:
+            file._file_resources = file_resources
+        else:
+            await file.get_metadata()
+        file.set_file_details()
+        return file
+
+    async def get_metadata(self):
+        """Fetch the files list from Anaplan, then parse it to build an AnaplanResource object"""
+        get_files = AsyncResources(self._conn, "files")
+        file_list = await get_files.get_resources()
+        file_parser = ResourceParserFile()
+        self._file_resources = file_parser.get_parser(file_list)
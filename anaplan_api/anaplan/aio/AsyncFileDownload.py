@@ -0,0 +1,94 @@
+import logging
+from typing import AsyncIterator
+from .AsyncFile import AsyncFile
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncFileDownload(AsyncFile):
+    async def iter_chunks(self, block_size: int = 1024**2) -> AsyncIterator[bytes]:
+        """Stream all chunks of the specified file from Anaplan as raw byte blocks
+
+        :param block_size: Maximum size of each yielded block in bytes
+        :type block_size: int
+        :raises Exception: Exception from AsyncRequestHandler exception group
+        :return: Async iterator over the file contents
+        :rtype: AsyncIterator[bytes]
+        """
+        endpoint = f"{self.endpoint}chunks/"
+
+        get_header = {
+            "Authorization": self._conn.authorization.token_value,
+        }
+
+        for current_chunk in range(int(self._chunk_count)):
+            received = 0
+            try:
+                logger.debug(f"Downloading chunk {current_chunk}")
+                async with self.handler.stream_request(
+                    f"{endpoint}{current_chunk}",
+                    "GET",
+                    headers=get_header,
+                    block_size=block_size,
+                    context={
+                        "operation": "download_chunk",
+                        "file_id": self.file_id,
+                        "chunk": current_chunk,
+                    },
+                ) as blocks:
+                    async for block in blocks:
+                        received += len(block)
+                        yield block
+            except Exception as e:
+                logger.error(f"Error downloading chunk {e}", exc_info=True)
+                raise Exception(f"Error downloading chunk {e}")
+            if not received:
+                logger.error(f"There was a problem downloading {self._file_id}")
+                return
+
+            logger.debug(f"Chunk {current_chunk} downloaded successfully.")
+
+    async def download_file(self) -> str:
+        """Download all chunks of the specified file from Anaplan. Each chunk is decoded with the charset
+        the server declares, or the one detected from its content, so use iter_chunks to stream large
+        files in bounded memory.
+
+        :raises Exception: Exception from AsyncRequestHandler exception group
+        :return: Contents of the specified file.
+        :rtype: str
+        """
+        endpoint = f"{self.endpoint}chunks/"
+
+        file_data = []
+
+        get_header = {
+            "Authorization": self._conn.authorization.token_value,
+        }
+
+        for current_chunk in range(int(self._chunk_count)):
+            try:
+                logger.debug(f"Downloading chunk {current_chunk}")
+                file_contents = (
+                    await self.handler.make_request(
+                        f"{endpoint}{current_chunk}",
+                        "GET",
+                        headers=get_header,
+                        context={
+                            "operation": "download_chunk",
+                            "file_id": self.file_id,
+                            "chunk": current_chunk,
+                        },
+                    )
+                ).text
+            except Exception as e:
+                logger.error(f"Error downloading chunk {e}", exc_info=True)
+                raise Exception(f"Error downloading chunk {e}")
+            if not file_contents:
+                logger.error(f"There was a problem downloading {self._file_id}")
+                break
+
+            logger.debug(f"Chunk {current_chunk} downloaded successfully.")
+            file_data.append(file_contents)
+
+        logger.info("File download complete!")
+        return "".join(file_data)
@@ -0,0 +1,46 @@
+import logging
+from typing import Optional, Union
+from .AsyncUpload import AsyncUpload
+from .AsyncUploadLimits import AsyncUploadLimits
+from ..UploadManifest import UploadManifest
+from ..UploadSource import PathSource, UploadSource
+from ..models.UploadResponse import UploadResponse
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncFileUpload(AsyncUpload):
+    async def upload(
+        self,
+        chunk_size: Union[int, str],
+        file: Union[str, UploadSource],
+        workers: int = 1,
+        encoding: Optional[str] = None,
+        manifest: Optional[UploadManifest] = None,
+        limits: Optional[AsyncUploadLimits] = None,
+    ) -> Optional[UploadResponse]:
+        """Upload a local file to Anaplan model
+
+        :param chunk_size: Desired size of the chunk, in megabytes, or "auto" to tune it while uploading
+        :type chunk_size: Union[int, str]
+        :param file: Path to the local file to be uploaded to Anaplan, or a PathSource
+        :type file: Union[str, UploadSource]
+        :param workers: Number of chunks uploaded concurrently
+        :type workers: int
+        :param encoding: Encoding of the file, which is converted to UTF-8 while uploading.
+            None uploads the file's bytes unchanged.
+        :type encoding: str, optional
+        :param manifest: Manifest recording confirmed chunks, so an interrupted upload can resume
+        :type manifest: UploadManifest, optional
+        :param limits: Chunk request and compression limits shared with the uploads of other files
+        :type limits: AsyncUploadLimits, optional
+        :return: Chunk count, sizes and per-stage timings of the upload
+        :rtype: UploadResponse, optional
+        """
+        source = file if isinstance(file, UploadSource) else PathSource(file, encoding)
+
+        try:
+            return await self.upload_source(chunk_size, source, workers, manifest, limits=limits)
+        except OSError as e:
+            logger.error(f"Error opening file {file}: {e}", exc_info=True)
+            raise OSError(f"Error opening file {file}: {e}")
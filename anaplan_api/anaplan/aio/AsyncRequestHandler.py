@@ -0,0 +1,555 @@
+from __future__ import annotations
+import asyncio
+import logging
+import weakref
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import AsyncIterator, Callable, Optional, Tuple, Union
+from requests.compat import chardet
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from ..util.HedgePolicy import HedgePolicy
+from ..util.HttpCache import HttpCache
+from ..util.JsonCodec import JsonCodec
+from ..util.RateGovernor import RateGovernor
+from ..util.RequestHooks import RequestEvent, RequestHooks
+from ..util.RequestPlan import RequestPlan
+from ..util.RetryPolicy import RetryPolicy
+from ..util.SingleFlight import SingleFlight
+from ..util.TimeoutPolicy import TimeoutPolicy
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - optional dependency
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AsyncResponse:
+    """Fully read response returned by AsyncRequestHandler
+
+    :param status_code: HTTP status code
+    :type status_code: int
+    :param content: Raw response body
+    :type content: bytes
+    :param headers: Response headers
+    :type headers: dict
+    :param url: URL of the request
+    :type url: str
+    """
+
+    status_code: int
+    content: bytes
+    headers: dict = field(default_factory=dict)
+    url: str = ""
+
+    @property
+    def encoding(self) -> str:
+        """Get the charset declared in the Content-Type header, or detect it from the body as
+        requests does when none is declared
+
+        :return: Name of the encoding
+        :rtype: str
+        """
+        encoding = get_encoding_from_headers(CaseInsensitiveDict(self.headers))
+        if encoding is None:
+            encoding = chardet.detect(self.content)["encoding"] or "utf-8"
+        return encoding
+
+    @property
+    def text(self) -> str:
+        """Get the response body decoded with its declared or detected encoding
+
+        :return: Response body
+        :rtype: str
+        """
+        return str(self.content, self.encoding, errors="replace")
+
+    def json(self):
+        """Parse the response body as JSON
+
+        :return: Parsed response body
+        """
+        return JsonCodec.loads(self.content)
+
+
+class AsyncRequestHandler:
+    """Issues API requests from a coroutine. Each event loop gets one pooled aiohttp session,
+    shared by every AsyncRequestHandler, so hundreds of concurrent jobs can share keep-alive connections.
+
+    :param _base_url: URL prepended to every endpoint
+    :type _base_url: str
+    :param _sessions: Shared session for each running event loop
+    :type _sessions: weakref.WeakKeyDictionary
+    :param _limit: Maximum number of open connections per event loop
+    :type _limit: int
+    :param _limit_per_host: Maximum number of open connections to a single host
+    :type _limit_per_host: int
+    :param _retry_policy: Policy applied to requests that do not pass their own
+    :type _retry_policy: RetryPolicy
+    :param _governor: Client-side rate and concurrency limits, disabled when None
+    :type _governor: RateGovernor, optional
+    :param _cache: Conditional GET cache for requests made with cache=True, disabled when None, the default
+    :type _cache: HttpCache, optional
+    :param _single_flight: Coalesces identical concurrent GETs made through get_json
+    :type _single_flight: SingleFlight
+    :param _hooks: Lifecycle hooks notified of every request attempt
+    :type _hooks: RequestHooks
+    :param _timeout_policy: Chooses connect and read timeouts for each request
+    :type _timeout_policy: TimeoutPolicy
+    :param _hedge_policy: Duplicates slow polls and metadata GETs, disabled when None
+    :type _hedge_policy: HedgePolicy, optional
+    """
+
+    _base_url: str
+    _sessions: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+    _limit: int = 100
+    _limit_per_host: int = 20
+    _retry_policy: RetryPolicy = RetryPolicy()
+    _governor: Optional[RateGovernor] = None
+    _cache: Optional[HttpCache] = None
+    _single_flight: SingleFlight = SingleFlight()
+    _hooks: RequestHooks = RequestHooks()
+    _timeout_policy: TimeoutPolicy = TimeoutPolicy()
+    _hedge_policy: Optional[HedgePolicy] = None
+
+    def __init__(self, base_url: str) -> None:
+        self._base_url = base_url
+
+    @classmethod
+    def configure_pool(cls, limit: int = 100, limit_per_host: int = 20) -> None:
+        """Set connection limits for sessions created after this call
+
+        :param limit: Maximum number of open connections per event loop
+        :type limit: int
+        :param limit_per_host: Maximum number of open connections to a single host
+        :type limit_per_host: int
+        """
+        if limit < 1 or limit_per_host < 1:
+            raise ValueError("Connection limits must be at least 1")
+        AsyncRequestHandler._limit = limit
+        AsyncRequestHandler._limit_per_host = limit_per_host
+
+    @classmethod
+    def get_session(cls) -> aiohttp.ClientSession:
+        """Get the session bound to the running event loop, creating it on first use
+
+        :raises ImportError: aiohttp is not installed
+        :return: Pooled client session
+        :rtype: aiohttp.ClientSession
+        """
+        if aiohttp is None:
+            raise ImportError(
+                "aiohttp is required for the asyncio client, install anaplan-api[aio]"
+            )
+
+        loop = asyncio.get_running_loop()
+        session = cls._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=cls._limit, limit_per_host=cls._limit_per_host
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            cls._sessions[loop] = session
+        return session
+
+    @classmethod
+    async def close_session(cls) -> None:
+        """Close the session bound to the running event loop"""
+        session = cls._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+    @classmethod
+    def set_retry_policy(cls, retry_policy: RetryPolicy) -> None:
+        """Replace the retry policy used by requests that do not pass their own
+
+        :param retry_policy: Policy applied to every request
+        :type retry_policy: RetryPolicy
+        """
+        AsyncRequestHandler._retry_policy = retry_policy
+
+    @classmethod
+    def set_cache(cls, cache: Optional[HttpCache]) -> None:
+        """Cache metadata GETs for every handler, or disable caching with None. Caching is off by default.
+
+        :param cache: Cache shared by all async handlers
+        :type cache: HttpCache, optional
+        """
+        AsyncRequestHandler._cache = cache
+
+    @classmethod
+    def set_governor(cls, governor: Optional[RateGovernor]) -> None:
+        """Limit request rate and concurrency for every handler, or remove the limits with None
+
+        :param governor: Governor shared with the synchronous RequestHandler if desired
+        :type governor: RateGovernor, optional
+        """
+        AsyncRequestHandler._governor = governor
+
+    @classmethod
+    def set_timeout_policy(cls, timeout_policy: TimeoutPolicy) -> None:
+        """Replace the policy choosing connect and read timeouts for every async handler
+
+        :param timeout_policy: Policy, which may be shared with the synchronous RequestHandler
+        :type timeout_policy: TimeoutPolicy
+        """
+        AsyncRequestHandler._timeout_policy = timeout_policy
+
+    @classmethod
+    def set_hedge_policy(cls, hedge_policy: Optional[HedgePolicy]) -> None:
+        """Hedge slow idempotent GETs for every async handler, or stop hedging with None
+
+        :param hedge_policy: Policy, whose budget may be shared with the synchronous RequestHandler
+        :type hedge_policy: HedgePolicy, optional
+        """
+        AsyncRequestHandler._hedge_policy = hedge_policy
+
+    @classmethod
+    def add_hook(cls, event: str, hook: Callable[[RequestEvent], None]) -> None:
+        """Register a hook called for every request made by any async handler
+
+        :param event: One of start, first_byte, end, retry or error
+        :type event: str
+        :param hook: Callable receiving the RequestEvent of the attempt, run on the event loop
+        :type hook: Callable[[RequestEvent], None]
+        """
+        AsyncRequestHandler._hooks.register(event, hook)
+
+    @classmethod
+    def remove_hook(cls, event: str, hook: Callable[[RequestEvent], None]) -> None:
+        """Unregister a hook added with add_hook
+
+        :param event: Event the hook was registered for
+        :type event: str
+        :param hook: Hook to remove
+        :type hook: Callable[[RequestEvent], None]
+        """
+        AsyncRequestHandler._hooks.unregister(event, hook)
+
+    async def make_request(
+        self,
+        endpoint: str,
+        method: str = "GET",
+        data=None,
+        headers=None,
+        override_url=None,
+        retry_policy: Optional[RetryPolicy] = None,
+        idempotent: Optional[bool] = None,
+        stream: bool = False,
+        cache: bool = False,
+        context: Optional[dict] = None,
+    ) -> Union[AsyncResponse, aiohttp.ClientResponse]:
+        """Send a request, retrying transient failures according to the retry policy
+
+        :param endpoint: Endpoint appended to the base URL
+        :type endpoint: str
+        :param method: HTTP method
+        :type method: str
+        :param data: Request body
+        :param headers: Request headers
+        :type headers: dict
+        :param override_url: Full URL to use instead of the base URL and endpoint
+        :type override_url: str
+        :param retry_policy: Policy for this request, defaults to the handler-wide policy
+        :type retry_policy: RetryPolicy, optional
+        :param idempotent: Whether the request can safely be repeated, inferred from the method if None
+        :type idempotent: bool, optional
+        :param stream: Return the unread aiohttp response once headers arrive; the caller must release it
+        :type stream: bool
+        :param cache: Serve a GET from the HTTP cache when the server confirms it is unchanged
+        :type cache: bool
+        :param context: Operation the request belongs to, passed to lifecycle hooks
+        :type context: dict, optional
+        :raises Exception: Request failed and could not be retried
+        :return: Successful response
+        :rtype: Union[AsyncResponse, aiohttp.ClientResponse]
+        """
+        url: str = override_url if override_url else self._base_url + endpoint
+        http_cache = self._cache if cache and not stream and method == "GET" else None
+        if http_cache is None:
+            return await self._request(
+                method, url, endpoint, data, headers, retry_policy, idempotent, stream, context
+            )
+
+        cache_key = http_cache.key(url, headers)
+        entry = http_cache.get(cache_key)
+        if entry is not None and entry.fresh:
+            logger.debug(f"Serving {endpoint} from cache")
+            return AsyncResponse(200, entry.content, entry.headers, url)
+        if entry is not None and entry.has_validators:
+            headers = {**(headers or {}), **entry.conditional_headers()}
+
+        response = await self._request(
+            method, url, endpoint, data, headers, retry_policy, idempotent, stream, context
+        )
+        if response.status_code == 304 and entry is not None:
+            logger.debug(f"{endpoint} not modified, serving from cache")
+            return AsyncResponse(200, entry.content, entry.headers, url)
+        if response.status_code == 200:
+            http_cache.store(cache_key, response.content, response.headers)
+        return response
+
+    async def get_json(
+        self,
+        endpoint: str,
+        headers=None,
+        override_url=None,
+        **kwargs,
+    ):
+        """GET an endpoint and parse the JSON body. Identical concurrent GETs for the same auth
+        principal share one request and receive the same parsed object, which must not be modified.
+
+        :param endpoint: Endpoint appended to the base URL
+        :type endpoint: str
+        :param headers: Request headers
+        :type headers: dict
+        :param override_url: Full URL to use instead of the base URL and endpoint
+        :type override_url: str
+        :param kwargs: Additional arguments for make_request
+        :raises Exception: Request failed and could not be retried
+        :return: Parsed response body
+        """
+        url: str = override_url if override_url else self._base_url + endpoint
+
+        async def fetch():
+            response = await self.make_request(
+                endpoint, "GET", headers=headers, override_url=override_url, **kwargs
+            )
+            return response.json()
+
+        return await self._single_flight.do_async(HttpCache.key(url, headers), fetch)
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        endpoint: str,
+        data,
+        headers,
+        retry_policy: Optional[RetryPolicy],
+        idempotent: Optional[bool],
+        stream: bool,
+        context: Optional[dict] = None,
+        events: Optional[list] = None,
+    ) -> Union[AsyncResponse, aiohttp.ClientResponse]:
+        """Send a request through the event loop's session, applying the governor and retry policy.
+        When events is given, the RequestEvent of a successful streamed attempt is appended to it so
+        the caller can report the end of the body."""
+        session = self.get_session()
+        plan = RequestPlan(
+            method,
+            url,
+            endpoint,
+            data,
+            headers,
+            retry_policy if retry_policy else self._retry_policy,
+            idempotent,
+            context,
+            self._governor,
+            self._hooks,
+            self._timeout_policy,
+            self._hedge_policy,
+        )
+        governor = plan.governor
+
+        while True:
+            connect_timeout, read_timeout = plan.timeout()
+            timeout = aiohttp.ClientTimeout(
+                total=plan.remaining(),
+                sock_connect=connect_timeout,
+                sock_read=read_timeout,
+            )
+            try:
+                async with governor.acquire_async(plan.key) if governor else AsyncExitStack():
+                    plan.begin()
+                    sent = monotonic()
+                    if plan.hedge is not None:
+                        response = await self._send_hedged(
+                            plan.hedge,
+                            plan.template,
+                            governor,
+                            plan.key,
+                            session,
+                            method,
+                            url,
+                            data,
+                            headers,
+                            timeout,
+                        )
+                    else:
+                        response = await session.request(
+                            method, url, data=data, headers=headers, timeout=timeout
+                        )
+                    time_to_first_byte = monotonic() - sent
+                    plan.first_byte(response.status, time_to_first_byte)
+                    if response.status < 400:
+                        plan.succeeded(time_to_first_byte)
+                    if stream and response.status < 400:
+                        if events is not None and plan.event is not None:
+                            events.append(plan.event)
+                        else:
+                            plan.end()
+                        return response
+                    try:
+                        content = await response.read()
+                    finally:
+                        response.release()
+                    plan.end(len(content))
+                    if governor and response.status == 429:
+                        await governor.throttled_async(
+                            plan.key, plan.policy.retry_after(response.headers)
+                        )
+                if response.status < 400:
+                    return AsyncResponse(
+                        response.status, content, dict(response.headers), url
+                    )
+                delay = plan.retry_delay(
+                    Exception(f"{response.status} {response.reason} for url: {url}"),
+                    response.status,
+                    response.headers,
+                )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                delay = plan.retry_delay(e)
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    async def _send_hedged(
+        hedge: HedgePolicy,
+        template: str,
+        governor: Optional[RateGovernor],
+        key: Optional[Tuple[str, str, str]],
+        session: aiohttp.ClientSession,
+        method: str,
+        url: str,
+        data,
+        headers,
+        timeout: aiohttp.ClientTimeout,
+    ) -> aiohttp.ClientResponse:
+        """Send a request and, if it has not answered within the hedge delay and the budget allows,
+        a duplicate. The first successful exchange is returned and the other is cancelled.
+        The duplicate needs a free governor slot of its own and is not sent without one."""
+
+        async def send_backup() -> aiohttp.ClientResponse:
+            if governor is not None:
+                pause = await governor.reserve_async(key)
+                if pause > 0:
+                    await asyncio.sleep(pause)
+            return await session.request(
+                method, url, data=data, headers=headers, timeout=timeout
+            )
+
+        sent = monotonic()
+        tasks = [
+            asyncio.ensure_future(
+                session.request(method, url, data=data, headers=headers, timeout=timeout)
+            )
+        ]
+        winner: Optional[asyncio.Future] = None
+        try:
+            delay = hedge.delay(template)
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            slot = None
+            if not done and governor is not None:
+                slot = governor.try_acquire(key)
+            if done or (governor is not None and slot is None) or not hedge.acquire():
+                if slot is not None:
+                    governor.release(key, slot)
+                winner = tasks[0]
+                response = await winner
+            else:
+                logger.debug(f"Hedging {method} {url} after {delay:.2f} seconds")
+                backup = asyncio.ensure_future(send_backup())
+                if governor is not None:
+                    # A done callback also runs for a backup cancelled before it started
+                    backup.add_done_callback(lambda _: governor.release(key, slot))
+                tasks.append(backup)
+                pending = set(tasks)
+                while pending and winner is None:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    winner = next((task for task in done if task.exception() is None), None)
+                if winner is None:
+                    winner = tasks[0]
+                elif winner is tasks[1]:
+                    hedge.won()
+                response = winner.result()
+        finally:
+            for task in tasks:
+                if task is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None:
+                    task.result().release()
+
+        hedge.observe(template, monotonic() - sent)
+        return response
+
+    @asynccontextmanager
+    async def stream_request(
+        self,
+        endpoint: str,
+        method: str = "GET",
+        data=None,
+        headers=None,
+        override_url=None,
+        block_size: int = 1024**2,
+        retry_policy: Optional[RetryPolicy] = None,
+        idempotent: Optional[bool] = None,
+        context: Optional[dict] = None,
+    ) -> AsyncIterator[AsyncIterator[bytes]]:
+        """Send a request and iterate over the raw response body without loading it into memory.
+        The connection is released when the block exits, even if the body was not fully read.
+
+        :param endpoint: Endpoint appended to the base URL
+        :type endpoint: str
+        :param method: HTTP method
+        :type method: str
+        :param data: Request body
+        :param headers: Request headers
+        :type headers: dict
+        :param override_url: Full URL to use instead of the base URL and endpoint
+        :type override_url: str
+        :param block_size: Maximum size of each yielded block in bytes
+        :type block_size: int
+        :param retry_policy: Policy for this request, defaults to the handler-wide policy
+        :type retry_policy: RetryPolicy, optional
+        :param idempotent: Whether the request can safely be repeated, inferred from the method if None
+        :type idempotent: bool, optional
+        :param context: Operation the request belongs to, passed to lifecycle hooks
+        :type context: dict, optional
+        :raises Exception: Request failed and could not be retried
+        :return: Async iterator over byte blocks of the response body
+        :rtype: AsyncIterator[bytes]
+        """
+        url: str = override_url if override_url else self._base_url + endpoint
+        events = []
+        response = await self._request(
+            method, url, endpoint, data, headers, retry_policy, idempotent, True, context, events
+        )
+        event = events[0] if events else None
+        try:
+            if event is None:
+                yield response.content.iter_chunked(block_size)
+            else:
+                event.bytes_received = 0
+                yield self._count_blocks(response.content.iter_chunked(block_size), event)
+        finally:
+            response.release()
+            if event is not None:
+                event.elapsed = monotonic() - event.started
+                self._hooks.emit("end", event)
+
+    @staticmethod
+    async def _count_blocks(
+        blocks: AsyncIterator[bytes], event: RequestEvent
+    ) -> AsyncIterator[bytes]:
+        """Add the size of each block read to the attempt's received bytes"""
+        async for block in blocks:
+            event.bytes_received += len(block)
+            yield block
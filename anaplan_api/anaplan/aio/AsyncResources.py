@@ -0,0 +1,60 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import logging
+from ..Resources import Resources
+from .AsyncRequestHandler import AsyncRequestHandler
+from ..models.AnaplanVersion import AnaplanVersion
+from ..util.Tracing import Tracing
+
+if TYPE_CHECKING:
+    from ..models.AnaplanConnection import AnaplanConnection
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncResources(Resources):
+    """Fetches the list of request resource type from a specified Anaplan model without blocking the event loop"""
+
+    _handler: AsyncRequestHandler = AsyncRequestHandler(AnaplanVersion().base_url)
+
+    def __init__(self, conn: AnaplanConnection, resource: str):
+        """
+        :param conn: Object with authentication, workspace, and model details
+        :type conn: AnaplanConnection
+        :param resource: Type of resource to query the specified model for
+        :type resource: str
+        """
+        super().__init__(conn, resource)
+        # A connection transport is synchronous, so listings keep the shared async handler
+        self._handler = AsyncResources._handler
+
+    async def get_resources(self) -> dict:
+        """Get the list of items of the specified resource
+
+        :raises RequestFailedError: Error returned by Anaplan API server for specified request
+        :raises KeyError: Error if response does not contain the specified resource
+        :return: JSON list of the specified resource
+        """
+        get_header = {
+            "Authorization": self._authorization,
+            "Content-Type": "application/json",
+        }
+
+        response = {}
+
+        logger.debug(f"Fetching {self._resource}")
+        try:
+            with Tracing.span("anaplan.list_resources", resource=self._resource):
+                response = await self._handler.get_json(
+                    self._endpoint,
+                    headers=get_header,
+                    cache=True,
+                    context={"operation": "list_resources", "resource": self._resource},
+                )
+        except Exception as e:
+            logger.error(
+                f"Error fetching resource {self._resource}, {e}", exc_info=True
+            )
+        logger.debug(f"Finished fetching {self._resource}")
+
+        return self.parse_response(response)
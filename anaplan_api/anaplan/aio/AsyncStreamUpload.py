@@ -0,0 +1,41 @@
+import logging
+from typing import Optional, Union
+from .AsyncUpload import AsyncUpload
+from .AsyncUploadLimits import AsyncUploadLimits
+from ..UploadManifest import UploadManifest
+from ..UploadSource import UploadSource
+from ..models.UploadResponse import UploadResponse
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncStreamUpload(AsyncUpload):
+    async def upload(
+        self,
+        chunk_size: Union[int, str],
+        data,
+        workers: int = 1,
+        manifest: Optional[UploadManifest] = None,
+        limits: Optional[AsyncUploadLimits] = None,
+    ) -> Optional[UploadResponse]:
+        """Upload data held in memory or streamed from a file object or iterable to Anaplan model
+
+        :param chunk_size: Upload request body size in MB between 1 and 50, or "auto" to tune it while uploading
+        :type chunk_size: Union[int, str]
+        :param data: String or bytes data, a file object, an iterable of bytes, str or rows, or an UploadSource
+        :param workers: Number of chunks uploaded concurrently
+        :type workers: int
+        :param manifest: Manifest recording confirmed chunks, so an interrupted upload can resume
+        :type manifest: UploadManifest, optional
+        :param limits: Chunk request and compression limits shared with the uploads of other files
+        :type limits: AsyncUploadLimits, optional
+        :return: Chunk count, sizes and per-stage timings of the upload
+        :rtype: UploadResponse, optional
+        """
+        try:
+            source = UploadSource.of(data, detect_paths=False)
+        except TypeError as e:
+            logger.error(f"Error converting data to bytes: {e}", exc_info=True)
+            raise TypeError(f"Error converting data to bytes: {e}")
+
+        return await self.upload_source(chunk_size, source, workers, manifest, limits=limits)
@@ -0,0 +1,137 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, List
+import asyncio
+import logging
+from io import BytesIO
+import pandas as pd
+from pandas.errors import EmptyDataError, ParserError, ParserWarning
+
+from ..TaskFactoryGenerator import TaskFactoryGenerator
+from ..models.ActionResponse import ActionResponse
+from ..models.AnaplanVersion import AnaplanVersion
+from .AsyncAction import AsyncAction
+from .AsyncFileDownload import AsyncFileDownload
+from .AsyncRequestHandler import AsyncRequestHandler
+from ..util.Tracing import Tracing
+
+if TYPE_CHECKING:
+    from ..models.AnaplanConnection import AnaplanConnection
+    from pandas import DataFrame
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTaskController:
+    """Executes an Anaplan action, then fetches error dumps and exported files concurrently"""
+
+    _handler: AsyncRequestHandler = AsyncRequestHandler(AnaplanVersion().base_url)
+    _conn: AnaplanConnection
+    _action_id: str
+    _retry_count: int
+    _mapping_params: dict
+    _poll_interval: float
+
+    def __init__(
+        self,
+        conn: AnaplanConnection,
+        action_id: str,
+        retry_count: int,
+        mapping_params: dict = None,
+        poll_interval: float = 1,
+    ):
+        self._conn = conn
+        self._action_id = action_id
+        self._retry_count = retry_count
+        self._mapping_params = mapping_params
+        self._poll_interval = poll_interval
+
+    async def execute(self) -> ActionResponse:
+        """Run the action, parse the task results and collect any dumps or files
+
+        :return: Detailed results of the requested action task.
+        :rtype: ActionResponse
+        """
+        generator = TaskFactoryGenerator(self._action_id[:3])
+        factory = generator.get_factory()
+
+        action = factory.get_action(
+            conn=self._conn,
+            action_id=self._action_id,
+            retry_count=self._retry_count,
+            mapping_params=self._mapping_params,
+        )
+        task = await AsyncAction(action, self._poll_interval).execute()
+
+        with Tracing.span("anaplan.task_parse", task_id=task.results.get("taskId")):
+            parser = factory.get_parser(
+                conn=self._conn, results=task.results, url=task.url
+            )
+            parser_responses = parser.results
+
+        dumps = [
+            self.get_error_dump(response.task_endpoint)
+            for response in parser_responses
+            if response.dump
+        ]
+        files = [
+            self.download_file(response.file_id)
+            for response in parser_responses
+            if response.file
+        ]
+
+        results = await asyncio.gather(*dumps, *files)
+        return ActionResponse(
+            parser_responses, list(results[: len(dumps)]), list(results[len(dumps) :])
+        )
+
+    async def download_file(self, file_id: str) -> str:
+        """Download an exported file
+
+        :param file_id: ID of the file to download
+        :type file_id: str
+        :return: File contents
+        :rtype: str
+        """
+        with Tracing.span("anaplan.file_download", file_id=file_id):
+            download = await AsyncFileDownload.create(self._conn, file_id)
+            return await download.download_file()
+
+    async def get_error_dump(self, endpoint: str) -> DataFrame:
+        """Fetches the failure dump of an Anaplan Import action if available
+
+        :param endpoint: API endpoint for the anaplan action
+        :type endpoint: str
+        :return: Failure dump for an import action
+        :rtype: DataFrame
+        """
+        post_header = {
+            "Authorization": self._conn.authorization.token_value,
+            "Content-Type": "application/json",
+        }
+
+        edf = pd.DataFrame()
+        dump = b""
+
+        try:
+            logger.debug("Fetching error dump")
+            with Tracing.span("anaplan.error_dump"):
+                dump = (
+                    await self._handler.make_request(
+                        endpoint,
+                        "GET",
+                        headers=post_header,
+                        context={"operation": "error_dump"},
+                    )
+                ).content
+            logger.debug("Error dump downloaded.")
+        except Exception as e:
+            logger.error(f"Error fetching error dump {e}", exc_info=True)
+
+        try:
+            edf = pd.read_csv(BytesIO(dump))
+        except (EmptyDataError, ParserError) as e:
+            logger.error(f"Error loading error dump to dataframe {e}", exc_info=True)
+        except ParserWarning as w:
+            logger.warning(f"Warning raised while parsing csv {w}", exc_info=True)
+
+        return edf
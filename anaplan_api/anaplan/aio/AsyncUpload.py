@@ -0,0 +1,406 @@
+import asyncio
+import logging
+import os
+import zlib
+from time import monotonic
+from typing import AsyncIterable, AsyncIterator, Iterator, List, Optional, Set, Union
+from .AsyncFile import AsyncFile
+from .AsyncUploadLimits import AsyncUploadLimits
+from ..Upload import Upload
+from ..ChunkSizeTuner import ChunkSizeTuner
+from ..UploadManifest import UploadManifest
+from ..UploadPlan import UploadPlan
+from ..UploadSource import UploadSource
+from ..models.UploadResponse import UploadResponse
+from ..util.RetryPolicy import RetryPolicy
+from ..util.Tracing import Tracing
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncUpload(AsyncFile):
+
+    async def upload(self, chunk_size: int, data):
+        pass
+
+    async def upload_source(
+        self,
+        chunk_size: Union[int, str],
+        source: UploadSource,
+        workers: int = 1,
+        manifest: Optional[UploadManifest] = None,
+        verify: bool = True,
+        limits: Optional[AsyncUploadLimits] = None,
+    ) -> Optional[UploadResponse]:
+        """Upload data read lazily from a source, marking the file complete once every chunk is confirmed.
+        The source is read in the default executor so other jobs keep running.
+
+        :param chunk_size: Desired size of the chunk, in megabytes, or "auto" to size chunks from the
+            measured bandwidth, latency and compression ratio
+        :type chunk_size: Union[int, str]
+        :param source: Data to upload
+        :type source: UploadSource
+        :param workers: Number of chunks uploaded concurrently
+        :type workers: int
+        :param manifest: Manifest recording confirmed chunks, so an interrupted upload resumes from
+            where it stopped instead of starting again
+        :type manifest: UploadManifest, optional
+        :param verify: With a manifest, check the server's chunk list before completing the upload
+            and send any missing chunks again
+        :type verify: bool
+        :param limits: Chunk request and compression limits shared with the uploads of other files
+        :type limits: AsyncUploadLimits, optional
+        :raises Exception: A chunk could not be uploaded, or the server is missing chunks
+        :return: Chunk count, sizes and per-stage timings of the upload, marked skipped when the upload
+            cache shows the file already holds the data
+        :rtype: UploadResponse, optional
+        """
+        endpoint = self.endpoint
+        response = None
+        plan = UploadPlan(self, chunk_size, source, manifest, Upload._upload_cache)
+        skipped = await asyncio.get_running_loop().run_in_executor(None, plan.skip)
+        if skipped is not None:
+            return skipped
+
+        # Posting the metadata starts the upload again, discarding the chunks already sent
+        metadata_update = plan.resume() or await self.file_metadata(endpoint)
+        if metadata_update:
+            logger.info(f"Starting upload of file {self.file_id}.")
+
+            response = await self._upload_source_chunks(endpoint, plan, workers, limits)
+            if manifest is not None and response.chunks and verify:
+                response = await self._verify_chunks(endpoint, plan, workers, response, limits)
+
+            # Only mark the file complete once every chunk has been confirmed
+            if response.chunks and await self.file_metadata(f"{endpoint}complete"):
+                metadata = await self._listed_metadata() if plan.upload_cache is not None else None
+                plan.completed(response, metadata)
+
+        return response
+
+    async def _listed_metadata(self) -> Optional[dict]:
+        """Fetch the files list again for the upload cache, after an upload changed the file"""
+        try:
+            await self.get_metadata()
+            self.set_file_details()
+            return self.metadata
+        except Exception as e:
+            logger.warning(f"Upload of file {self.file_id} left out of the upload cache: {e}")
+            return None
+
+    async def _upload_source_chunks(
+        self,
+        endpoint: str,
+        plan: UploadPlan,
+        workers: int,
+        limits: Optional[AsyncUploadLimits] = None,
+    ) -> UploadResponse:
+        chunks = plan.chunks()
+        try:
+            response = await self.upload_chunks(
+                endpoint,
+                self._read_chunks(chunks),
+                workers,
+                manifest=plan.manifest,
+                tuner=plan.tuner,
+                limits=limits,
+            )
+        finally:
+            chunks.close()
+        return plan.checked(response)
+
+    async def _verify_chunks(
+        self,
+        endpoint: str,
+        plan: UploadPlan,
+        workers: int,
+        response: UploadResponse,
+        limits: Optional[AsyncUploadLimits] = None,
+    ) -> UploadResponse:
+        """Send chunks missing from the server's chunk list again, once"""
+        if not plan.missing(response, await self.chunk_list(endpoint)):
+            return response
+        response = await self._upload_source_chunks(endpoint, plan, workers, limits)
+        plan.received(response, await self.chunk_list(endpoint))
+        return response
+
+    @staticmethod
+    async def _read_chunks(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+        """Advance a chunk iterator in the default executor"""
+        loop = asyncio.get_running_loop()
+        while True:
+            data = await loop.run_in_executor(None, next, chunks, None)
+            if data is None:
+                break
+            yield data
+
+    async def upload_chunks(
+        self,
+        endpoint: str,
+        chunks: AsyncIterable[bytes],
+        workers: int = 1,
+        max_buffered: Optional[int] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        compression_level: int = 6,
+        compressors: Optional[int] = None,
+        manifest: Optional[UploadManifest] = None,
+        tuner: Optional[ChunkSizeTuner] = None,
+        limits: Optional[AsyncUploadLimits] = None,
+    ) -> UploadResponse:
+        """Upload chunks with reading, compression and sending overlapped, keeping up to ``workers``
+        chunk requests in flight. At most ``max_buffered`` chunks are read ahead of the confirmed
+        ones, and a chunk that fails is retried on its own by the retry policy before the upload is
+        abandoned.
+
+        :param endpoint: URL of the specified file
+        :type endpoint: str
+        :param chunks: Uncompressed chunk data in upload order
+        :type chunks: AsyncIterable[bytes]
+        :param workers: Number of chunks uploaded concurrently
+        :type workers: int
+        :param max_buffered: Maximum chunks held in memory, defaults to twice the workers
+        :type max_buffered: int, optional
+        :param retry_policy: Policy for each chunk's PUT, defaults to the handler-wide policy
+        :type retry_policy: RetryPolicy, optional
+        :param compression_level: zlib compression level from 1 (fastest) to 9 (smallest)
+        :type compression_level: int
+        :param compressors: Number of chunks compressed concurrently in the default executor, defaults to
+            the workers up to the CPU count
+        :type compressors: int, optional
+        :param manifest: Manifest recording confirmed chunks, chunks it already holds are skipped
+        :type manifest: UploadManifest, optional
+        :param tuner: Chunk size tuner to report each chunk's compression ratio and send time to
+        :type tuner: ChunkSizeTuner, optional
+        :param limits: Chunk request and compression limits shared with the uploads of other files,
+            used instead of this upload's own workers and compressors
+        :type limits: AsyncUploadLimits, optional
+        :raises Exception: A chunk could not be uploaded
+        :return: Chunk count, sizes and the time spent in each stage
+        :rtype: UploadResponse
+        """
+        if compressors is None:
+            compressors = min(workers, os.cpu_count() or 1)
+        if workers < 1 or compressors < 1:
+            raise ValueError("workers and compressors must be at least 1")
+
+        started = monotonic()
+        window = max(max_buffered or 2 * workers, workers)
+        if limits is not None:
+            compress_slots, send_slots = limits.compress, limits.send
+        else:
+            compress_slots, send_slots = asyncio.Semaphore(compressors), asyncio.Semaphore(workers)
+        pending: Set[asyncio.Task] = set()
+        totals = {
+            "read": 0.0,
+            "compress": 0.0,
+            "send": 0.0,
+            "bytes_read": 0,
+            "bytes_sent": 0,
+            "resumed": 0,
+        }
+        loop = asyncio.get_running_loop()
+        # Compressed chunks take a send slot in chunk order, whichever finishes compressing first
+        turn = asyncio.Condition()
+        sequence = {"next": 0}
+
+        async def hand_over(chunk_num: int) -> None:
+            async with turn:
+                await turn.wait_for(lambda: sequence["next"] == chunk_num)
+
+        async def next_turn() -> None:
+            async with turn:
+                sequence["next"] += 1
+                turn.notify_all()
+
+        async def process(chunk_num: int, data: bytes) -> None:
+            # Compress slots may be shared with other files, so none is held while waiting for a turn
+            async with compress_slots:
+                compress_started = monotonic()
+                digest = None
+                if manifest is not None:
+                    digest = await loop.run_in_executor(None, manifest.digest, data)
+                if digest is not None and manifest.confirmed(chunk_num, digest):
+                    data = None
+                else:
+                    compressed = await self.compress_chunk(chunk_num, data, compression_level)
+                    if tuner is not None:
+                        tuner.observe_compression(len(data), len(compressed))
+                    data = compressed
+                totals["compress"] += monotonic() - compress_started
+            if data is None:
+                totals["resumed"] += 1
+                await hand_over(chunk_num)
+                await next_turn()
+                return
+            await hand_over(chunk_num)
+            await send_slots.acquire()
+            await next_turn()
+            try:
+                send_started = monotonic()
+                await self.send_chunk(
+                    f"{endpoint}chunks/{chunk_num}", chunk_num, data, retry_policy
+                )
+                totals["send"] += monotonic() - send_started
+                if tuner is not None:
+                    tuner.observe_send(len(data), monotonic() - send_started)
+            finally:
+                send_slots.release()
+            if manifest is not None:
+                manifest.confirm(chunk_num, digest)
+            totals["bytes_sent"] += len(data)
+            logger.debug(f"Chunk {chunk_num + 1} confirmed.")
+
+        chunk_count = 0
+        source = chunks.__aiter__()
+        try:
+            while True:
+                if len(pending) >= window:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        task.result()
+                read_started = monotonic()
+                try:
+                    data = await source.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    totals["read"] += monotonic() - read_started
+                totals["bytes_read"] += len(data)
+                pending.add(asyncio.ensure_future(process(chunk_count, data)))
+                chunk_count += 1
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    task.result()
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            raise
+
+        return UploadResponse(
+            self.file_id,
+            chunk_count,
+            totals["bytes_read"],
+            totals["bytes_sent"],
+            totals["read"],
+            totals["compress"],
+            totals["send"],
+            monotonic() - started,
+            compressors,
+            workers,
+            totals["resumed"],
+        )
+
+    async def chunk_list(self, endpoint: str) -> List[int]:
+        """Get the chunks of the file that the server has received
+
+        :param endpoint: URL of the specified file
+        :type endpoint: str
+        :raises Exception: Exception from AsyncRequestHandler exception group
+        :return: IDs of the received chunks
+        :rtype: List[int]
+        """
+        try:
+            with Tracing.span("anaplan.chunk_list", file_id=self.file_id):
+                chunk_list = await self.handler.get_json(**UploadPlan.chunk_list_request(self, endpoint))
+        except Exception as e:
+            logger.error(f"Error fetching chunk list {e}", exc_info=True)
+            raise Exception(f"Error fetching chunk list {e}")
+
+        return UploadPlan.chunk_ids(chunk_list)
+
+    async def file_metadata(self, endpoint: str) -> bool:
+        """Update file metadata in Anaplan model as first step in file upload process
+
+        :param endpoint: URL of the specified file
+        :raises Exception: Exception from AsyncRequestHandler exception group
+        :return: Whether metadata was successfully updated
+        :rtype: bool
+        """
+        request = UploadPlan.metadata_request(self, endpoint)
+        operation = request["context"]["operation"]
+
+        try:
+            logger.debug("Updating file metadata.")
+            with Tracing.span(f"anaplan.{operation}", file_id=self.file_id):
+                await self.handler.make_request(**request)
+            logger.debug("Complete!")
+        except Exception as e:
+            logger.error(f"Error setting metadata {e}", exc_info=True)
+            raise Exception(f"Error setting metadata {e}")
+
+        return True
+
+    async def file_data(self, url: str, chunk_num: int, data: bytes) -> bool:
+        """Compress a data chunk off the event loop, then upload it to the specified file
+
+        :param url: URL of the  specified file
+        :type url: str
+        :param chunk_num: ID of the chunk being uploaded
+        :type chunk_num: int
+        :param data: Data to upload
+        :type data: bytes
+        :raises Exception: Exception from AsyncRequestHandler exception group
+        :return: Whether file data upload was successful
+        :rtype: bool
+        """
+        return await self.send_chunk(url, chunk_num, await self.compress_chunk(chunk_num, data))
+
+    async def compress_chunk(self, chunk_num: int, data: bytes, level: int = 6) -> bytes:
+        """Gzip a data chunk in the default executor so the event loop keeps running
+
+        :param chunk_num: ID of the chunk being compressed
+        :type chunk_num: int
+        :param data: Uncompressed data
+        :type data: bytes
+        :param level: zlib compression level from 1 (fastest) to 9 (smallest)
+        :type level: int
+        :raises OSError: Data could not be compressed
+        :return: Gzip-compressed data
+        :rtype: bytes
+        """
+        try:
+            with Tracing.span("anaplan.compress", chunk=chunk_num, bytes_in=len(data)) as span:
+                compressed = await asyncio.get_running_loop().run_in_executor(
+                    None, Upload.compress_data, data, level
+                )
+                span.set_attribute("bytes_out", len(compressed))
+        except (OSError, zlib.error) as e:
+            logger.error(f"Error compressing data: {e}", exc_info=True)
+            raise OSError(f"Error compressing data: {e}")
+        return compressed
+
+    async def send_chunk(
+        self, url: str, chunk_num: int, data: bytes, retry_policy: Optional[RetryPolicy] = None
+    ) -> bool:
+        """Upload a gzip-compressed data chunk to the specified file
+
+        :param url: URL of the  specified file
+        :type url: str
+        :param chunk_num: ID of the chunk being uploaded
+        :type chunk_num: int
+        :param data: Gzip-compressed data
+        :type data: bytes
+        :param retry_policy: Policy for this request, defaults to the handler-wide policy
+        :type retry_policy: RetryPolicy, optional
+        :raises Exception: Exception from AsyncRequestHandler exception group
+        :return: Whether file data upload was successful
+        :rtype: bool
+        """
+        try:
+            logger.debug(f"Attempting to upload chunk {chunk_num + 1}")
+            with Tracing.span("anaplan.upload_chunk", chunk=chunk_num, bytes=len(data)):
+                await self.handler.make_request(
+                    **UploadPlan.chunk_request(self, url, chunk_num, data, retry_policy)
+                )
+            logger.debug(f"Chunk {chunk_num + 1} uploaded successfully.")
+        except Exception as e:
+            logger.error(f"Error uploading chunk {chunk_num + 1}, {e}", exc_info=True)
+            raise Exception(f"Error uploading chunk {chunk_num + 1}, {e}")
+
+        return True
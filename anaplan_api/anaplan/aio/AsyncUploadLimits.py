@@ -0,0 +1,22 @@
+import asyncio
+import os
+from typing import Optional
+
+
+class AsyncUploadLimits:
+    """Limits shared by the uploads of several files on one event loop, so uploading them together
+    keeps the same number of chunk requests in flight and compressions running as a single upload would
+
+    :param max_chunks: Chunk requests in flight across all files
+    :type max_chunks: int
+    :param compressors: Chunks compressed at once across all files, defaults to the CPU count
+    :type compressors: int, optional
+    """
+
+    def __init__(self, max_chunks: int = 4, compressors: Optional[int] = None):
+        if max_chunks < 1 or (compressors is not None and compressors < 1):
+            raise ValueError("max_chunks and compressors must be at least 1")
+        self.max_chunks = max_chunks
+        self.compressors = compressors or os.cpu_count() or 1
+        self.send = asyncio.Semaphore(self.max_chunks)
+        self.compress = asyncio.Semaphore(self.compressors)
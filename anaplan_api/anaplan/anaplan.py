@@ -6,18 +6,27 @@
 # ===============================================================================
 from __future__ import annotations
 import logging
-from typing import TYPE_CHECKING
+import os
+from typing import IO, TYPE_CHECKING, Dict, Iterable, Mapping, Optional, Union
 from .authentication.AuthorizationManager import AuthorizationManager
+from .BulkUpload import BulkUpload
 from .UploadFactory import UploadFactory
+from .UploadManifest import UploadManifest
+from .UploadSource import ArrowSource, DataFrameSource
 from .TaskController import TaskController
 from .Resources import Resources
 from .ResourceParserList import ResourceParserList
 from .FileDownload import FileDownload
+from .util.Tracing import Tracing
 
 if TYPE_CHECKING:
+    from pandas import DataFrame
     from .models.ActionResponse import ActionResponse
     from .models.AnaplanConnection import AnaplanConnection
     from .models.AnaplanResourceList import AnaplanResource
+    from .models.FileUploadResult import FileUploadResult
+    from .models.UploadResponse import UploadResponse
+    from .UploadSource import UploadSource
 
 logger = logging.getLogger(__name__)
 
@@ -35,23 +44,131 @@ def authorize(method: str, **kwargs) -> AuthorizationManager:
             and handle automatic refresh of the token.
     :rtype: AuthorizationManager
     """
-    return AuthorizationManager(method, **kwargs)
+    with Tracing.span("anaplan.authorize", method=method):
+        return AuthorizationManager(method, **kwargs)
 
 
 def file_upload(
-    conn: AnaplanConnection, file_id: str, chunk_size: int, data: str
-) -> None:
+    conn: AnaplanConnection,
+    file_id: str,
+    chunk_size: Union[int, str],
+    data: Union[str, os.PathLike, UploadSource, IO, Iterable],
+    workers: int = 1,
+    manifest: Union[str, os.PathLike, UploadManifest, None] = None,
+) -> Optional[UploadResponse]:
     """Upload a file to Anaplan model
 
     :param conn: AnaplanConnection object which contains AuthToken object, workspace ID, and model ID
     :param file_id: ID of the file in Anaplan
-    :param chunk_size: Desired chunk size of the upload request between 1-50
-    :param data: Data to load, either path to local file or string
+    :param chunk_size: Desired chunk size of the upload request between 1-50, or "auto" to tune it while uploading
+    :param data: Data to load: path to local file, str or bytes data, binary or text file object, iterable of
+        bytes, str or rows, or an UploadSource such as PathSource(path, encoding="cp1252")
+    :param workers: Number of chunks uploaded concurrently
+    :param manifest: Path of a manifest recording confirmed chunks. If the upload is interrupted, calling
+        file_upload again with the same manifest resumes it from the first unconfirmed chunk.
+    :return: Chunk count, sizes and per-stage timings of the upload
+    :rtype: UploadResponse, optional
+    """
+
+    with Tracing.span(
+        "anaplan.file_upload",
+        workspace_id=conn.workspace,
+        model_id=conn.model,
+        file_id=file_id,
+        chunk_size=chunk_size,
+        workers=workers,
+    ):
+        if manifest is not None and not isinstance(manifest, UploadManifest):
+            manifest = UploadManifest(manifest)
+        file = UploadFactory(data)
+        uploader = file.get_uploader(conn, file_id)
+        return uploader.upload(chunk_size, file.source, workers, manifest=manifest)
+
+
+def upload_dataframe(
+    conn: AnaplanConnection,
+    file_id: str,
+    chunk_size: Union[int, str],
+    frame: DataFrame,
+    workers: int = 1,
+    index: bool = False,
+    delimiter: str = ",",
+    use_arrow: bool = False,
+) -> Optional[UploadResponse]:
+    """Upload a pandas DataFrame to Anaplan model as CSV, serialized one batch of rows at a time
+
+    :param conn: AnaplanConnection object which contains AuthToken object, workspace ID, and model ID
+    :param file_id: ID of the file in Anaplan
+    :param chunk_size: Desired chunk size of the upload request between 1-50, or "auto" to tune it while uploading
+    :param frame: Data to load
+    :param workers: Number of chunks uploaded concurrently
+    :param index: Write the index as the first column
+    :param delimiter: Field separator
+    :param use_arrow: Serialize with pyarrow.csv, which is faster but formats dates, floats and quoting
+        differently from DataFrame.to_csv
+    :return: Chunk count, sizes and per-stage timings of the upload
+    :rtype: UploadResponse, optional
     """
+    source = DataFrameSource(frame, index=index, delimiter=delimiter, use_arrow=use_arrow)
+    return file_upload(conn, file_id, chunk_size, source, workers)
+
+
+def upload_arrow(
+    conn: AnaplanConnection,
+    file_id: str,
+    chunk_size: Union[int, str],
+    data,
+    workers: int = 1,
+    delimiter: str = ",",
+) -> Optional[UploadResponse]:
+    """Upload Arrow data to Anaplan model as CSV written by pyarrow.csv, one slice of rows at a time
 
-    file = UploadFactory(data)
-    uploader = file.get_uploader(conn, file_id)
-    uploader.upload(chunk_size, data)
+    :param conn: AnaplanConnection object which contains AuthToken object, workspace ID, and model ID
+    :param file_id: ID of the file in Anaplan
+    :param chunk_size: Desired chunk size of the upload request between 1-50, or "auto" to tune it while uploading
+    :param data: pyarrow Table, RecordBatch, RecordBatchReader or iterable of record batches
+    :param workers: Number of chunks uploaded concurrently
+    :param delimiter: Field separator
+    :raises ImportError: pyarrow is not installed
+    :return: Chunk count, sizes and per-stage timings of the upload
+    :rtype: UploadResponse, optional
+    """
+    source = ArrowSource(data, delimiter=delimiter)
+    return file_upload(conn, file_id, chunk_size, source, workers)
+
+
+def upload_many(
+    conn: AnaplanConnection,
+    sources: Mapping[str, Union[str, os.PathLike, UploadSource, IO, Iterable]],
+    chunk_size: Union[int, str] = 10,
+    max_chunks: int = 4,
+    compressors: Optional[int] = None,
+    max_files: Optional[int] = None,
+    abort_on_error: bool = False,
+) -> Dict[str, FileUploadResult]:
+    """Upload several files to Anaplan model concurrently, fetching the model's files list once
+
+    :param conn: AnaplanConnection object which contains AuthToken object, workspace ID, and model ID
+    :param sources: Data to load by file ID, each anything file_upload accepts
+    :param chunk_size: Desired chunk size of the upload request between 1-50, or "auto" to tune it while uploading
+    :param max_chunks: Number of chunks uploaded concurrently across all files
+    :param compressors: Number of chunks compressed concurrently across all files, defaults to the CPU count
+    :param max_files: Number of files uploaded concurrently, defaults to max_chunks
+    :param abort_on_error: Stop the remaining uploads when one file fails
+    :return: Status, upload summary, error and timings of each file, by file ID
+    :rtype: Dict[str, FileUploadResult]
+    """
+    with Tracing.span(
+        "anaplan.upload_many",
+        workspace_id=conn.workspace,
+        model_id=conn.model,
+        files=len(sources),
+        chunk_size=chunk_size,
+        max_chunks=max_chunks,
+    ):
+        return BulkUpload(
+            conn, sources, chunk_size, max_chunks, compressors, max_files, abort_on_error
+        ).run()
 
 
 def execute_action(
@@ -70,7 +187,13 @@ def execute_action(
     :rtype: ActionResponse
     """
 
-    controller = TaskController(conn, action_id, retry_count, mapping_params)
+    with Tracing.span(
+        "anaplan.execute_action",
+        workspace_id=conn.workspace,
+        model_id=conn.model,
+        action_id=action_id,
+    ):
+        controller = TaskController(conn, action_id, retry_count, mapping_params)
 
     return controller.response
 
@@ -90,10 +213,16 @@ def get_list(conn: AnaplanConnection, resource: str) -> AnaplanResource:
     :rtype: AnaplanResource
     """
 
-    resources = Resources(conn=conn, resource=resource)
-    resources_list = resources.get_resources()
-    resource_parser = ResourceParserList()
-    return resource_parser.get_parser(resources_list)
+    with Tracing.span(
+        "anaplan.get_list",
+        workspace_id=conn.workspace,
+        model_id=conn.model,
+        resource=resource,
+    ):
+        resources = Resources(conn=conn, resource=resource)
+        resources_list = resources.get_resources()
+        resource_parser = ResourceParserList()
+        return resource_parser.get_parser(resources_list)
 
 
 # ===========================================================================
@@ -110,5 +239,11 @@ def get_file(conn: AnaplanConnection, file_id: str) -> str:
     :rtype: str
     """
 
-    file_download = FileDownload(conn=conn, file_id=file_id)
-    return file_download.download_file()
+    with Tracing.span(
+        "anaplan.get_file",
+        workspace_id=conn.workspace,
+        model_id=conn.model,
+        file_id=file_id,
+    ):
+        file_download = FileDownload(conn=conn, file_id=file_id)
+        return file_download.download_file()
@@ -5,12 +5,14 @@
 # Input:			Username & Password, or SHA keypair
 # Output:			Anaplan JWT and token expiry time
 # ===============================================================================
-from typing import Tuple
+from typing import Optional, Tuple
 import json
 import re
 import logging
 from ..util.Util import AuthenticationFailedError
 from ..util.RequestHandler import RequestHandler
+from ..util.JsonCodec import JsonCodec
+from ..util.Transport import Transport
 
 
 logger = logging.getLogger(__name__)
@@ -21,8 +23,16 @@ class AnaplanAuthentication(object):
     Represents an authentication attempt for Anaplan API
     """
 
-    def __init__(self, **kwargs):
-        self.handler = RequestHandler("https://auth.anaplan.com/token/")
+    def __init__(self, transport: Optional[Transport] = None, **kwargs):
+        """
+        :param transport: Transport for auth requests, defaults to a RequestHandler for the Anaplan auth server
+        :type transport: Transport, optional
+        """
+        self.handler = (
+            transport
+            if transport is not None
+            else RequestHandler("https://auth.anaplan.com/token/")
+        )
 
     def auth_header(self, username: str, password: str):
         pass
@@ -42,18 +52,29 @@ class AnaplanAuthentication(object):
         if body is None:
             logger.info("Authenticating via Basic.")
             try:
-                authenticate = self.handler.make_request(
-                    endpoint, "POST", headers=header
-                ).json()
+                authenticate = JsonCodec.decode(
+                    self.handler.make_request(
+                        endpoint,
+                        "POST",
+                        headers=header,
+                        context={"operation": "auth_authenticate"},
+                    )
+                )
             except Exception as e:
                 logger.error(f"Error fetching auth token {e}", exc_info=True)
                 raise Exception(f"Error fetching auth token {e}")
         else:
             logger.info("Authenticating via Certificate.")
             try:
-                authenticate = self.handler.make_request(
-                    endpoint, "POST", headers=header, data=json.dumps(body)
-                ).json()
+                authenticate = JsonCodec.decode(
+                    self.handler.make_request(
+                        endpoint,
+                        "POST",
+                        headers=header,
+                        data=json.dumps(body),
+                        context={"operation": "auth_authenticate"},
+                    )
+                )
             except Exception as e:
                 logger.error(f"Error fetching auth token {e}", exc_info=True)
                 raise Exception(f"Error fetching auth token {e}")
@@ -114,7 +135,14 @@ class AnaplanAuthentication(object):
 
         try:
             logger.debug("Verifying auth token.")
-            validate = self.handler.make_request(endpoint, "GET", headers=header).json()
+            validate = JsonCodec.decode(
+                self.handler.make_request(
+                    endpoint,
+                    "GET",
+                    headers=header,
+                    context={"operation": "auth_validate"},
+                )
+            )
         except Exception as e:
             logger.error(f"Error verifying auth token {e}", exc_info=True)
             raise Exception(f"Error verifying auth token {e}")
@@ -139,7 +167,14 @@ class AnaplanAuthentication(object):
         endpoint = "refresh"
         header = {"Authorization": "".join(["AnaplanAuthToken ", token])}
         try:
-            refresh = self.handler.make_request(endpoint, "POST", headers=header).json()
+            refresh = JsonCodec.decode(
+                self.handler.make_request(
+                    endpoint,
+                    "POST",
+                    headers=header,
+                    context={"operation": "auth_refresh"},
+                )
+            )
         except Exception as e:
             logger.error(f"Error verifying auth token {e}", exc_info=True)
             raise Exception(f"Error verifying auth token {e}")
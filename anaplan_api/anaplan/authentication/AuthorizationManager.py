@@ -35,7 +35,7 @@ class AuthorizationManager:
     _auth_token: AuthToken
 
     def __init__(self, method: str, **kwargs):
-        self.authorizer = AnaplanAuthentication()
+        self.authorizer = AnaplanAuthentication(transport=kwargs.get("transport"))
         self.timer = None
         self.create_auth(method.lower(), **kwargs)
         self.start()
@@ -51,7 +51,9 @@ class AuthorizationManager:
         token, expiry = authenticator.authenticate(
             authenticator.auth_request(header_string, post_data)
         )
-        self._auth_token = AuthToken(token, expiry)
+        # Keeps the rate limits of the user's requests when the token is refreshed
+        identity = kwargs.get("email") or kwargs.get("certificate")
+        self._auth_token = AuthToken(token, expiry, identity)
 
     @property
     def auth_token(self) -> AuthToken:
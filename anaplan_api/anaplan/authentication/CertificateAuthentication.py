@@ -15,9 +15,10 @@ from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.backends import default_backend
 from base64 import b64encode
-from typing import Dict
+from typing import Dict, Optional
 from .AnaplanAuthentication import AnaplanAuthentication
 from .CertificateHandler import CertificateHandler
+from ..util.Transport import Transport
 from ..util.Util import InvalidKeyError
 
 logger = logging.getLogger(__name__)
@@ -34,8 +35,8 @@ class CertificateAuthentication(AnaplanAuthentication):
     # This function reads a user's public certificate as a string, base64
     # encodes that value, then returns the certificate authorization header.
     # ===========================================================================
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
+    def __init__(self, transport: Optional[Transport] = None, **kwargs):
+        super().__init__(transport=transport)
         self.certificate_details = CertificateHandler(**kwargs)
 
     def auth_header(self, certificate: str, **kwargs) -> Dict[str, str]:
@@ -0,0 +1,505 @@
+from __future__ import annotations
+import gzip
+import json
+import re
+import threading
+import time
+import uuid
+from base64 import b64decode
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from ..models.AnaplanVersion import AnaplanVersion
+from .FakeTransport import FakeTransport
+
+AUTH_URL = "https://auth.anaplan.com/token/"
+
+_RESOURCE_TYPES = {
+    "112": "imports",
+    "116": "exports",
+    "117": "actions",
+    "118": "processes",
+}
+
+FakeResponse = Tuple[int, Dict[str, str], bytes]
+
+
+@dataclass
+class FakeFile:
+    """File stored in a fake model"""
+
+    id: str
+    name: str
+    chunks: Dict[int, bytes] = field(default_factory=dict)
+    chunk_count: int = 0
+
+    @property
+    def content(self) -> bytes:
+        return b"".join(self.chunks[i] for i in sorted(self.chunks))
+
+    def listing(self) -> dict:
+        return {"id": self.id, "name": self.name, "chunkCount": self.chunk_count}
+
+
+@dataclass
+class FakeAction:
+    """Import, export, action or process defined in a fake model
+
+    :param dump: CSV failure dump returned for import tasks, None if the import has no failures
+    :param export: File content produced when an export runs
+    :param children: IDs of the actions run by a process
+    """
+
+    id: str
+    name: str
+    dump: Optional[bytes] = None
+    export: Optional[bytes] = None
+    children: List[str] = field(default_factory=list)
+
+
+@dataclass
+class FakeModel:
+    workspace: str
+    id: str
+    name: str
+    files: Dict[str, FakeFile] = field(default_factory=dict)
+    actions: Dict[str, FakeAction] = field(default_factory=dict)
+    lists: List[dict] = field(default_factory=list)
+
+
+@dataclass
+class FakeTask:
+    id: str
+    model: FakeModel
+    action: FakeAction
+    polls: int = 0
+
+
+class FakeAnaplan:
+    """In-memory implementation of the Bulk API endpoints used by the library: files, chunks,
+    complete, tasks, dumps, users, workspaces, models, and auth authenticate/validate/refresh.
+
+    Pass :meth:`transport` to an AnaplanConnection and :meth:`auth_transport` to ``anaplan.authorize``
+    to run the library against it. All state is guarded by one lock so it can be shared by threads.
+
+    :param polls_until_complete: Number of status requests that report a task IN_PROGRESS
+    :type polls_until_complete: int
+    :param require_auth: Reject API requests that do not carry a token issued by this backend
+    :type require_auth: bool
+    :param token_ttl: Seconds until an issued token expires
+    :type token_ttl: float
+    """
+
+    def __init__(
+        self,
+        polls_until_complete: int = 0,
+        require_auth: bool = True,
+        token_ttl: float = 1800,
+    ):
+        self.polls_until_complete = polls_until_complete
+        self.require_auth = require_auth
+        self.token_ttl = token_ttl
+        self.requests: List[Tuple[str, str]] = []
+        self._lock = threading.RLock()
+        self._models: Dict[Tuple[str, str], FakeModel] = {}
+        self._workspaces: Dict[str, dict] = {}
+        self._users: Dict[str, dict] = {}
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        self._tasks: Dict[str, FakeTask] = {}
+        self._routes: List[Tuple[str, re.Pattern, Callable[..., FakeResponse]]] = []
+
+        api = urlsplit(AnaplanVersion().base_url).path
+        model = api + r"workspaces/(?P<ws>[^/]+)/models/(?P<model>[^/]+)/"
+        task = model + r"(?P<kind>imports|exports|actions|processes)/(?P<action>[^/]+)/tasks"
+        for method, pattern, handler in [
+            ("POST", "/token/authenticate", self._authenticate),
+            ("GET", "/token/validate", self._validate),
+            ("POST", "/token/refresh", self._refresh),
+            ("GET", api + r"users/me", self._current_user),
+            ("GET", api + r"users/(?P<user>[^/]+)", self._user),
+            ("GET", api + r"users/(?P<user>[^/]+)/workspaces", self._user_workspaces),
+            ("GET", api + r"users/(?P<user>[^/]+)/models", self._user_models),
+            ("GET", model + r"(?P<resource>files|imports|exports|actions|processes|lists)", self._list),
+            ("POST", model + r"files/(?P<file>[^/]+)/?", self._file_metadata),
+            ("POST", model + r"files/(?P<file>[^/]+)/complete", self._file_complete),
+            ("GET", model + r"files/(?P<file>[^/]+)/chunks", self._chunk_list),
+            ("PUT", model + r"files/(?P<file>[^/]+)/chunks/(?P<chunk>\d+)", self._put_chunk),
+            ("GET", model + r"files/(?P<file>[^/]+)/chunks/(?P<chunk>\d+)", self._get_chunk),
+            ("POST", task, self._create_task),
+            ("GET", task + r"/(?P<task>[^/]+)", self._task_status),
+            ("GET", task + r"/(?P<task>[^/]+)/dumps?(?:/[^/]+)?", self._dump),
+        ]:
+            self._routes.append((method, re.compile(f"{pattern}$"), handler))
+
+    # -- Setup -------------------------------------------------------------------------------
+
+    def add_user(self, email: str, password: str = "", user_id: Optional[str] = None) -> str:
+        """Register a user that can authenticate with Basic auth
+
+        :return: User ID
+        :rtype: str
+        """
+        user_id = user_id or uuid.uuid4().hex
+        with self._lock:
+            self._users[user_id] = {
+                "id": user_id,
+                "email": email,
+                "password": password,
+                "active": True,
+                "emailOptIn": False,
+                "lastLoginDate": "2024-01-01T00:00:00.000+0000",
+            }
+        return user_id
+
+    def add_model(self, workspace: str, model: str, name: str = "") -> FakeModel:
+        """Create a model, and its workspace if needed
+
+        :rtype: FakeModel
+        """
+        with self._lock:
+            self._workspaces.setdefault(
+                workspace,
+                {
+                    "id": workspace,
+                    "name": workspace,
+                    "active": True,
+                    "sizeAllowance": 1024**3,
+                    "currentSize": 0,
+                },
+            )
+            return self._models.setdefault(
+                (workspace, model), FakeModel(workspace, model, name or model)
+            )
+
+    def add_file(
+        self, workspace: str, model: str, file_id: str, name: str = "", content: bytes = b""
+    ) -> FakeFile:
+        """Create a file in a model, optionally with existing content in a single chunk
+
+        :rtype: FakeFile
+        """
+        fake_file = FakeFile(file_id, name or file_id)
+        if content:
+            fake_file.chunks[0] = content
+            fake_file.chunk_count = 1
+        with self._lock:
+            self.add_model(workspace, model).files[file_id] = fake_file
+        return fake_file
+
+    def add_action(
+        self,
+        workspace: str,
+        model: str,
+        action_id: str,
+        name: str = "",
+        dump: Optional[bytes] = None,
+        export: Optional[bytes] = None,
+        children: Optional[List[str]] = None,
+    ) -> FakeAction:
+        """Create an import (112), export (116), action (117) or process (118) in a model
+
+        :rtype: FakeAction
+        """
+        if action_id[:3] not in _RESOURCE_TYPES:
+            raise ValueError(f"Unknown action type for {action_id}")
+        action = FakeAction(action_id, name or action_id, dump, export, children or [])
+        with self._lock:
+            fake_model = self.add_model(workspace, model)
+            fake_model.actions[action_id] = action
+            if export is not None:
+                fake_model.files.setdefault(action_id, FakeFile(action_id, action.name))
+        return action
+
+    def issue_token(self, user_id: Optional[str] = None) -> str:
+        """Issue a token directly, bypassing authentication
+
+        :return: Authorization header value
+        :rtype: str
+        """
+        token = uuid.uuid4().hex
+        with self._lock:
+            self._tokens[token] = (user_id or "", time.time() + self.token_ttl)
+        return f"AnaplanAuthToken {token}"
+
+    def file_content(self, workspace: str, model: str, file_id: str) -> bytes:
+        """Get the uploaded content of a file
+
+        :rtype: bytes
+        """
+        with self._lock:
+            return self._models[(workspace, model)].files[file_id].content
+
+    def transport(self, base_url: Optional[str] = None) -> FakeTransport:
+        """Get a transport for Bulk API requests served by this backend
+
+        :rtype: FakeTransport
+        """
+        return FakeTransport(self, base_url or AnaplanVersion().base_url)
+
+    def auth_transport(self) -> FakeTransport:
+        """Get a transport for authentication requests served by this backend
+
+        :rtype: FakeTransport
+        """
+        return FakeTransport(self, AUTH_URL)
+
+    # -- Dispatch ----------------------------------------------------------------------------
+
+    def handle(self, method: str, url: str, data, headers: dict) -> FakeResponse:
+        """Serve one request
+
+        :param method: HTTP method
+        :param url: Full request URL
+        :param data: Request body
+        :param headers: Request headers
+        :return: Status code, response headers and body
+        """
+        path = urlsplit(url).path
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        elif data is not None:
+            data = bytes(data)
+
+        with self._lock:
+            self.requests.append((method, path))
+            for route_method, pattern, handler in self._routes:
+                match = pattern.match(path)
+                if route_method != method or match is None:
+                    continue
+                if not path.startswith("/token/"):
+                    user_id = self._check_token(headers)
+                    if user_id is None:
+                        return self._json(401, {"status": {"code": 401}})
+                    return handler(data, headers, user_id=user_id, **match.groupdict())
+                return handler(data, headers, **match.groupdict())
+        return self._json(404, {"status": {"code": 404, "message": "Not Found"}})
+
+    @staticmethod
+    def _json(status: int, body: dict) -> FakeResponse:
+        return status, {"Content-Type": "application/json"}, json.dumps(body).encode("utf-8")
+
+    def _check_token(self, headers: dict) -> Optional[str]:
+        authorization = headers.get("Authorization", "")
+        if not self.require_auth:
+            return self._token_user(authorization) or ""
+        return self._token_user(authorization)
+
+    def _token_user(self, authorization: str) -> Optional[str]:
+        token = authorization.replace("AnaplanAuthToken ", "", 1)
+        user_id, expires = self._tokens.get(token, (None, 0.0))
+        return user_id if expires > time.time() else None
+
+    def _model(self, ws: str, model: str) -> Optional[FakeModel]:
+        return self._models.get((ws, model))
+
+    def _token_info(self, user_id: str) -> dict:
+        token = uuid.uuid4().hex
+        expires = time.time() + self.token_ttl
+        self._tokens[token] = (user_id, expires)
+        return {"tokenValue": token, "expiresAt": expires * 1000, "refreshTokenId": token}
+
+    # -- Authentication ----------------------------------------------------------------------
+
+    def _authenticate(self, data, headers, **kwargs) -> FakeResponse:
+        authorization = headers.get("Authorization", "")
+        user_id = None
+        if authorization.startswith("Basic "):
+            email, _, password = b64decode(authorization[6:]).decode("utf-8").partition(":")
+            for user in self._users.values():
+                if user["email"] == email and user["password"] == password:
+                    user_id = user["id"]
+        elif authorization.startswith("CACertificate "):
+            user_id = next(iter(self._users), "")
+
+        if user_id is None:
+            return self._json(
+                401, {"status": "FAILURE_BAD_CREDENTIAL", "statusMessage": "Login failed"}
+            )
+        return self._json(
+            201,
+            {
+                "status": "SUCCESS",
+                "statusMessage": "Login successful",
+                "tokenInfo": self._token_info(user_id),
+            },
+        )
+
+    def _validate(self, data, headers, **kwargs) -> FakeResponse:
+        if self._token_user(headers.get("Authorization", "")) is None:
+            return self._json(401, {"status": "FAILURE", "statusMessage": "Token invalid"})
+        return self._json(200, {"status": "SUCCESS", "statusMessage": "Token validated"})
+
+    def _refresh(self, data, headers, **kwargs) -> FakeResponse:
+        user_id = self._token_user(headers.get("Authorization", ""))
+        if user_id is None:
+            return self._json(401, {"status": "FAILURE", "statusMessage": "Token invalid"})
+        return self._json(
+            201,
+            {
+                "status": "SUCCESS",
+                "statusMessage": "Token refreshed",
+                "tokenInfo": self._token_info(user_id),
+            },
+        )
+
+    # -- Users, workspaces and models --------------------------------------------------------
+
+    def _user_details(self, user_id: str) -> Optional[dict]:
+        user = self._users.get(user_id)
+        if user is None:
+            return None
+        return {key: value for key, value in user.items() if key != "password"}
+
+    def _current_user(self, data, headers, user_id: str, **kwargs) -> FakeResponse:
+        return self._user(data, headers, user_id=user_id, user=user_id)
+
+    def _user(self, data, headers, user: str, **kwargs) -> FakeResponse:
+        details = self._user_details(user)
+        if details is None:
+            return self._json(404, {"status": {"code": 404}})
+        return self._json(200, {"status": {"code": 200}, "user": details})
+
+    def _user_workspaces(self, data, headers, **kwargs) -> FakeResponse:
+        return self._json(
+            200,
+            {"status": {"code": 200}, "workspaces": list(self._workspaces.values())},
+        )
+
+    def _user_models(self, data, headers, **kwargs) -> FakeResponse:
+        models = [
+            {
+                "id": fake_model.id,
+                "activeState": "UNLOCKED",
+                "name": fake_model.name,
+                "currentWorkspaceId": fake_model.workspace,
+                "currentWorkspaceName": self._workspaces[fake_model.workspace]["name"],
+            }
+            for fake_model in self._models.values()
+        ]
+        return self._json(200, {"status": {"code": 200}, "models": models})
+
+    def _list(self, data, headers, ws: str, model: str, resource: str, **kwargs) -> FakeResponse:
+        fake_model = self._model(ws, model)
+        if fake_model is None:
+            return self._json(404, {"status": {"code": 404}})
+        if resource == "files":
+            items = [fake_file.listing() for fake_file in fake_model.files.values()]
+        elif resource == "lists":
+            items = list(fake_model.lists)
+        else:
+            items = [
+                {"id": action.id, "name": action.name}
+                for action in fake_model.actions.values()
+                if _RESOURCE_TYPES[action.id[:3]] == resource
+            ]
+        return self._json(200, {"status": {"code": 200}, resource: items})
+
+    # -- Files -------------------------------------------------------------------------------
+
+    def _file(self, ws: str, model: str, file: str) -> Optional[FakeFile]:
+        fake_model = self._model(ws, model)
+        return None if fake_model is None else fake_model.files.get(file)
+
+    def _file_metadata(self, data, headers, ws: str, model: str, file: str, **kwargs) -> FakeResponse:
+        fake_file = self._file(ws, model, file)
+        if fake_file is None:
+            return self._json(404, {"status": {"code": 404}})
+        fake_file.chunks.clear()
+        fake_file.chunk_count = -1
+        return self._json(200, {"status": {"code": 200}, "file": fake_file.listing()})
+
+    def _file_complete(self, data, headers, ws: str, model: str, file: str, **kwargs) -> FakeResponse:
+        fake_file = self._file(ws, model, file)
+        if fake_file is None:
+            return self._json(404, {"status": {"code": 404}})
+        fake_file.chunk_count = len(fake_file.chunks)
+        return self._json(200, {"status": {"code": 200}, "file": fake_file.listing()})
+
+    def _chunk_list(self, data, headers, ws: str, model: str, file: str, **kwargs) -> FakeResponse:
+        fake_file = self._file(ws, model, file)
+        if fake_file is None:
+            return self._json(404, {"status": {"code": 404}})
+        chunks = [{"id": str(i), "name": f"Chunk {i}"} for i in sorted(fake_file.chunks)]
+        return self._json(200, {"status": {"code": 200}, "chunks": chunks})
+
+    def _put_chunk(self, data, headers, ws: str, model: str, file: str, chunk: str, **kwargs) -> FakeResponse:
+        fake_file = self._file(ws, model, file)
+        if fake_file is None:
+            return self._json(404, {"status": {"code": 404}})
+        if headers.get("Content-Type") == "application/x-gzip":
+            data = gzip.decompress(data)
+        fake_file.chunks[int(chunk)] = data or b""
+        return 204, {}, b""
+
+    def _get_chunk(self, data, headers, ws: str, model: str, file: str, chunk: str, **kwargs) -> FakeResponse:
+        fake_file = self._file(ws, model, file)
+        if fake_file is None or int(chunk) not in fake_file.chunks:
+            return self._json(404, {"status": {"code": 404}})
+        return 200, {"Content-Type": "application/octet-stream"}, fake_file.chunks[int(chunk)]
+
+    # -- Tasks -------------------------------------------------------------------------------
+
+    def _create_task(self, data, headers, ws: str, model: str, kind: str, action: str, **kwargs) -> FakeResponse:
+        fake_model = self._model(ws, model)
+        fake_action = None if fake_model is None else fake_model.actions.get(action)
+        if fake_action is None or _RESOURCE_TYPES[action[:3]] != kind:
+            return self._json(404, {"status": {"code": 404}})
+        task_id = uuid.uuid4().hex.upper()
+        self._tasks[task_id] = FakeTask(task_id, fake_model, fake_action)
+        return self._json(
+            200,
+            {"status": {"code": 200}, "task": {"taskId": task_id, "taskState": "NOT_STARTED"}},
+        )
+
+    def _task_status(self, data, headers, task: str, **kwargs) -> FakeResponse:
+        fake_task = self._tasks.get(task)
+        if fake_task is None:
+            return self._json(404, {"status": {"code": 404}})
+        fake_task.polls += 1
+        if fake_task.polls <= self.polls_until_complete:
+            return self._json(
+                200,
+                {
+                    "status": {"code": 200},
+                    "task": {"taskId": task, "taskState": "IN_PROGRESS", "progress": 0.5},
+                },
+            )
+        return self._json(
+            200,
+            {
+                "status": {"code": 200},
+                "task": {
+                    "taskId": task,
+                    "taskState": "COMPLETE",
+                    "currentStep": "Complete.",
+                    "successful": True,
+                    "result": self._task_result(fake_task.model, fake_task.action),
+                },
+            },
+        )
+
+    def _task_result(self, fake_model: FakeModel, action: FakeAction) -> dict:
+        kind = _RESOURCE_TYPES[action.id[:3]]
+        result = {
+            "objectId": action.id,
+            "successful": True,
+            "failureDumpAvailable": action.dump is not None,
+            "details": [{"localMessageText": f"{action.name} completed"}],
+        }
+        if kind == "exports":
+            export = fake_model.files[action.id]
+            export.chunks = {0: action.export}
+            export.chunk_count = 1
+            result["details"] = [{"type": "exportSucceeded"}]
+        elif kind == "processes":
+            result["nestedResults"] = [
+                self._task_result(fake_model, fake_model.actions[child])
+                for child in action.children
+            ]
+        return result
+
+    def _dump(self, data, headers, task: str, **kwargs) -> FakeResponse:
+        fake_task = self._tasks.get(task)
+        if fake_task is None or fake_task.action.dump is None:
+            return self._json(404, {"status": {"code": 404}})
+        return 200, {"Content-Type": "text/csv"}, fake_task.action.dump
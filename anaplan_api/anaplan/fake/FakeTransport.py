@@ -0,0 +1,46 @@
+from __future__ import annotations
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Tuple
+import requests
+from requests.structures import CaseInsensitiveDict
+from ..util.RequestHandler import RequestHandler
+
+if TYPE_CHECKING:
+    from .FakeAnaplan import FakeAnaplan
+
+
+class FakeTransport(RequestHandler):
+    """Request handler that serves every exchange from a FakeAnaplan backend instead of the network.
+    Retries, rate limits, caching and coalescing behave exactly as with RequestHandler.
+
+    :param backend: Backend that answers the requests
+    :type backend: FakeAnaplan
+    :param base_url: URL prepended to every endpoint
+    :type base_url: str
+    """
+
+    def __init__(self, backend: FakeAnaplan, base_url: str):
+        super().__init__(base_url)
+        self.backend = backend
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        data,
+        headers,
+        timeout: Tuple[float, float],
+        stream: bool,
+    ) -> requests.Response:
+        status, response_headers, body = self.backend.handle(
+            method, url, data, dict(headers or {})
+        )
+
+        response = requests.Response()
+        response.status_code = status
+        response.reason = HTTPStatus(status).phrase
+        response.url = url
+        response.headers = CaseInsensitiveDict(response_headers)
+        response._content = body
+        response._content_consumed = True
+        return response
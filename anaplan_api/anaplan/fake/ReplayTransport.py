@@ -0,0 +1,96 @@
+from __future__ import annotations
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from http import HTTPStatus
+from typing import Dict, List, Optional, Tuple
+import requests
+from requests.structures import CaseInsensitiveDict
+from ..models.AnaplanVersion import AnaplanVersion
+from ..util.Cassette import Cassette, CassetteEntry
+from ..util.RequestHandler import RequestHandler
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayTransport(RequestHandler):
+    """Request handler that serves responses from a recorded Cassette instead of the network.
+
+    Requests are matched on method and URL. Repeated requests to the same URL, such as task status
+    polls, receive the recorded responses in order, and the last one once the recording is exhausted.
+    Every host in the cassette is served, so one cassette can back both the API and auth transports.
+
+    :param cassette: Recorded exchanges
+    :type cassette: Cassette
+    :param base_url: URL prepended to every endpoint
+    :type base_url: str
+    :param emulate_timing: Wait for the recorded duration of each exchange before answering
+    :type emulate_timing: bool
+    :param speed: Factor by which emulated exchanges are faster than recorded
+    :type speed: float
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        base_url: Optional[str] = None,
+        emulate_timing: bool = False,
+        speed: float = 1.0,
+    ):
+        super().__init__(base_url or AnaplanVersion().base_url)
+        if speed <= 0:
+            raise ValueError("speed must be positive")
+        self.emulate_timing = emulate_timing
+        self.speed = speed
+        self._recorded: Dict[Tuple[str, str], List[CassetteEntry]] = defaultdict(list)
+        self._positions: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+        for entry in cassette.entries:
+            self._recorded[(entry.method, entry.url)].append(entry)
+
+    def _next_entry(self, method: str, url: str) -> Optional[CassetteEntry]:
+        key = (method, url)
+        with self._lock:
+            entries = self._recorded.get(key)
+            if not entries:
+                return None
+            position = self._positions[key]
+            self._positions[key] = position + 1
+        return entries[min(position, len(entries) - 1)]
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        data,
+        headers,
+        timeout: Tuple[float, float],
+        stream: bool,
+    ) -> requests.Response:
+        response = requests.Response()
+        response.url = url
+
+        entry = self._next_entry(method, url)
+        if entry is None:
+            logger.warning(f"No recorded response for {method} {url}")
+            response.status_code = 404
+            response.reason = "Not Recorded"
+            response._content = b""
+            return response
+
+        if self.emulate_timing:
+            time.sleep(entry.elapsed / self.speed)
+
+        response.status_code = entry.status
+        try:
+            response.reason = HTTPStatus(entry.status).phrase
+        except ValueError:
+            response.reason = ""
+        response.headers = CaseInsensitiveDict(entry.response_headers)
+        response.elapsed = timedelta(seconds=entry.time_to_first_byte / self.speed)
+        response._content = entry.response_body
+        response._content_consumed = True
+        return response
@@ -6,23 +6,26 @@
 # Output:         None
 # ===============================================================================
 from __future__ import annotations
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 from dataclasses import dataclass
 
 if TYPE_CHECKING:
     from .AuthToken import AuthToken
+    from ..util.Transport import Transport
 
 
 @dataclass
 class AnaplanConnection(object):
     """
     AnaplanConnection object stores AuthToken, workspace and model IDs.
-    Model ID must be unique.
+    Model ID must be unique. An optional Transport replaces the shared RequestHandler
+    for every request made with this connection.
     """
 
     _authorization: AuthToken
     _workspace_id: str
     _model_id: str
+    _transport: Optional[Transport] = None
 
     @property
     def authorization(self) -> AuthToken:
@@ -77,3 +80,21 @@ class AnaplanConnection(object):
         :type new_model_id: str
         """
         self._model_id = new_model_id
+
+    @property
+    def transport(self) -> Optional[Transport]:
+        """Fetch the transport injected for this connection
+
+        :return: Transport used instead of the shared RequestHandler, or None
+        :rtype: Optional[Transport]
+        """
+        return self._transport
+
+    @transport.setter
+    def transport(self, new_transport: Optional[Transport]) -> None:
+        """Set the transport for this connection
+
+        :param new_transport: Transport to use, or None for the shared RequestHandler
+        :type new_transport: Optional[Transport]
+        """
+        self._transport = new_transport
@@ -20,6 +20,7 @@ class AnaplanResourceFile(AnaplanResource):
 
     _raw_response: dict
     _resources: dict
+    _entries: dict
 
     def __init__(self, response: dict):
         """Build dictionary of files with ID as key and chunk count as value.
@@ -29,6 +30,7 @@ class AnaplanResourceFile(AnaplanResource):
         """
         self._raw_response = response
         self._resources = {item["id"]: item["chunkCount"] for item in response}
+        self._entries = {item["id"]: item for item in response}
 
     def __str__(self) -> str:
         """Get all values from the dictionary
@@ -51,6 +53,20 @@ class AnaplanResourceFile(AnaplanResource):
         except ResourceNotFoundError:
             raise ResourceNotFoundError(f"{resource_id} not found in dictionary")
 
+    def entry(self, resource_id: str) -> dict:
+        """Get every field the server lists for a file
+
+        :param resource_id: ID of the file
+        :type resource_id: str
+        :raises ResourceNotFoundError: Error if the requested key does not exist
+        :return: Copy of the file's item in the files list
+        :rtype: dict
+        """
+        try:
+            return dict(self._entries[resource_id])
+        except KeyError:
+            raise ResourceNotFoundError(f"{resource_id} not found in dictionary")
+
     def __len__(self) -> int:
         """Get number of items in the dictionary
 
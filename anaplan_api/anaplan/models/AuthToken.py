@@ -5,8 +5,11 @@
 # Input:          Auth token value and expiry
 # Output:         None
 # ===============================================================================
+import hashlib
 import threading
+import weakref
 from dataclasses import dataclass
+from typing import ClassVar, Optional, Union
 
 
 @dataclass
@@ -17,21 +20,63 @@ class AuthToken(object):
     :type _token_value: str
     :param _token_expiry: Expiry time in epoch
     :type _token_expiry: float
+    :param _principal: Hash identifying the user, unchanged when the token is refreshed
+    :type _principal: str
     :param _refresh_timeout: Amount of time (in seconds) the AuthToken value is valid
     :type _refresh_timeout: int
     """
 
     _token_value: str
     _token_expiry: float
+    _principal: str
+    _tokens: ClassVar[weakref.WeakValueDictionary] = weakref.WeakValueDictionary()
 
-    def __init__(self, token_value: str, token_expiry: float):
+    def __init__(
+        self, token_value: str, token_expiry: float, identity: Union[str, bytes, None] = None
+    ):
+        """
+        :param token_value: AnaplanAuthToken value
+        :type token_value: str
+        :param token_expiry: Expiry time in epoch
+        :type token_expiry: float
+        :param identity: User the token was issued to, such as the email or certificate, defaults to
+            the token value
+        :type identity: Union[str, bytes], optional
+        """
+        if identity is None:
+            identity = token_value
+        if isinstance(identity, str):
+            identity = identity.encode("utf-8")
         self._token_value = token_value
         self._token_expiry = token_expiry
+        self._principal = hashlib.sha256(identity).hexdigest()[:16]
+        AuthToken._tokens[token_value] = self
 
     def __post_init__(self):
         if not self._token_value[:7] == "Anaplan":
             self._token_value = "".join(["AnaplanAuthToken ", self._token_value])
 
+    @staticmethod
+    def principal_for(token_value: str) -> Optional[str]:
+        """Find the principal of the AuthToken currently holding a token value
+
+        :param token_value: Authorization header value
+        :type token_value: str
+        :return: Principal of the token, None if no live AuthToken holds the value
+        :rtype: str, optional
+        """
+        token = AuthToken._tokens.get(token_value)
+        return token.principal if token is not None else None
+
+    @property
+    def principal(self) -> str:
+        """Get the hash identifying the user
+
+        :return: Principal, stable across token refreshes
+        :rtype: str
+        """
+        return self._principal
+
     @property
     def token_value(self) -> str:
         """Get auth token value
@@ -48,7 +93,10 @@ class AuthToken(object):
         :param new_token_value: New token value to set
         :type new_token_value: str
         """
-        self.token_value = new_token_value
+        if AuthToken._tokens.get(self._token_value) is self:
+            del AuthToken._tokens[self._token_value]
+        self._token_value = new_token_value
+        AuthToken._tokens[new_token_value] = self
 
     @property
     def token_expiry(self) -> float:
@@ -57,7 +105,7 @@ class AuthToken(object):
         :return: Token expiry time
         :rtype: float
         """
-        return self.token_expiry
+        return self._token_expiry
 
     @token_expiry.setter
     def token_expiry(self, token_expiry: float) -> None:
@@ -66,4 +114,4 @@ class AuthToken(object):
         :param token_expiry: New expiry time of auth token in epoch
         :type token_expiry: float
         """
-        self.token_expiry = token_expiry
+        self._token_expiry = token_expiry
@@ -0,0 +1,62 @@
+from dataclasses import dataclass
+from typing import Optional
+from .UploadResponse import UploadResponse
+
+
+@dataclass(frozen=True)
+class FileUploadResult:
+    """Outcome of one file of a bulk upload
+
+    :param _file_id: ID of the file
+    :type _file_id: str
+    :param _status: complete, skipped, failed or aborted
+    :type _status: str
+    :param _response: Chunk count, sizes and per-stage timings, None if the upload did not finish
+    :type _response: UploadResponse, optional
+    :param _error: Error that stopped the upload of this file
+    :type _error: BaseException, optional
+    :param _started: Seconds from the start of the bulk upload until this file started
+    :type _started: float
+    :param _elapsed: Seconds this file took to upload
+    :type _elapsed: float
+    """
+
+    _file_id: str
+    _status: str
+    _response: Optional[UploadResponse] = None
+    _error: Optional[BaseException] = None
+    _started: float = 0.0
+    _elapsed: float = 0.0
+
+    @property
+    def file_id(self) -> str:
+        return self._file_id
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @property
+    def response(self) -> Optional[UploadResponse]:
+        return self._response
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        return self._error
+
+    @property
+    def started(self) -> float:
+        return self._started
+
+    @property
+    def elapsed(self) -> float:
+        return self._elapsed
+
+    @property
+    def ok(self) -> bool:
+        """Get whether the file holds the uploaded data
+
+        :return: True if the upload completed or was skipped as unchanged
+        :rtype: bool
+        """
+        return self._status in ("complete", "skipped")
@@ -0,0 +1,138 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class UploadResponse:
+    """Summary of a completed file upload with the time spent in each pipeline stage
+
+    :param _file_id: ID of the uploaded file
+    :type _file_id: str
+    :param _chunks: Number of chunks uploaded
+    :type _chunks: int
+    :param _bytes_read: Uncompressed bytes read from the source
+    :type _bytes_read: int
+    :param _bytes_sent: Compressed bytes sent to Anaplan
+    :type _bytes_sent: int
+    :param _read_time: Seconds spent reading the source
+    :type _read_time: float
+    :param _compress_time: Seconds spent compressing, summed over compressor threads
+    :type _compress_time: float
+    :param _send_time: Seconds spent sending chunks, summed over sender threads
+    :type _send_time: float
+    :param _elapsed: Wall-clock seconds from the first read to the last confirmed chunk
+    :type _elapsed: float
+    :param _compressors: Number of compressor threads
+    :type _compressors: int
+    :param _workers: Number of sender threads
+    :type _workers: int
+    :param _resumed: Chunks skipped because an interrupted upload had already sent them
+    :type _resumed: int
+    :param _skipped: Whether the upload was skipped because the file already held the same data
+    :type _skipped: bool
+    :param _chunk_size: Size of the chunks in bytes, the largest chunk sent when tuned automatically
+    :type _chunk_size: int
+    :param _tuning: Settings and estimates of the chunk size tuner, None for a fixed chunk size
+    :type _tuning: dict, optional
+    """
+
+    _file_id: str
+    _chunks: int
+    _bytes_read: int
+    _bytes_sent: int
+    _read_time: float
+    _compress_time: float
+    _send_time: float
+    _elapsed: float
+    _compressors: int = 1
+    _workers: int = 1
+    _resumed: int = 0
+    _skipped: bool = False
+    _chunk_size: int = 0
+    _tuning: Optional[dict] = None
+
+    @property
+    def file_id(self) -> str:
+        return self._file_id
+
+    @property
+    def chunks(self) -> int:
+        return self._chunks
+
+    @property
+    def bytes_read(self) -> int:
+        return self._bytes_read
+
+    @property
+    def bytes_sent(self) -> int:
+        return self._bytes_sent
+
+    @property
+    def read_time(self) -> float:
+        return self._read_time
+
+    @property
+    def compress_time(self) -> float:
+        return self._compress_time
+
+    @property
+    def send_time(self) -> float:
+        return self._send_time
+
+    @property
+    def elapsed(self) -> float:
+        return self._elapsed
+
+    @property
+    def resumed(self) -> int:
+        return self._resumed
+
+    @property
+    def skipped(self) -> bool:
+        return self._skipped
+
+    @property
+    def chunk_size(self) -> int:
+        return self._chunk_size
+
+    @property
+    def tuning(self) -> Optional[dict]:
+        """Get what the chunk size tuner chose and the measurements behind it
+
+        :return: Initial, final, smallest and largest chunk sizes in bytes, bandwidth in bytes per
+            second, latency in seconds and compression ratio, None for a fixed chunk size
+        :rtype: dict, optional
+        """
+        return self._tuning
+
+    @property
+    def compression_ratio(self) -> float:
+        """Get the ratio of uncompressed to compressed size
+
+        :return: Compression ratio, 0 if nothing was sent
+        :rtype: float
+        """
+        return self._bytes_read / self._bytes_sent if self._bytes_sent else 0.0
+
+    @property
+    def stage_times(self) -> dict:
+        """Get the busy time of each stage per thread, so the stages can be compared
+
+        :return: Seconds per thread for the read, compress and send stages
+        :rtype: dict
+        """
+        return {
+            "read": self._read_time,
+            "compress": self._compress_time / self._compressors,
+            "send": self._send_time / self._workers,
+        }
+
+    @property
+    def bottleneck(self) -> str:
+        """Get the stage that limited the upload
+
+        :return: read, compress or send
+        :rtype: str
+        """
+        stage_times = self.stage_times
+        return max(stage_times, key=stage_times.get)
@@ -0,0 +1,220 @@
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import asdict, dataclass, field
+from time import monotonic
+from typing import FrozenSet, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_REDACTED = "REDACTED"
+_DROPPED_HEADERS = frozenset({"set-cookie", "authorization"})
+
+
+@dataclass
+class CassetteEntry:
+    """One recorded request and response
+
+    :param method: HTTP method
+    :type method: str
+    :param url: Full request URL
+    :type url: str
+    :param status: Response status code
+    :type status: int
+    :param response_body: Response body, with secret JSON fields redacted
+    :type response_body: bytes
+    :param response_headers: Response headers, without cookies
+    :type response_headers: dict
+    :param request_hash: SHA-256 of the request body, empty if there was none
+    :type request_hash: str
+    :param request_size: Size of the request body in bytes
+    :type request_size: int
+    :param principal: Truncated SHA-256 of the Authorization header
+    :type principal: str
+    :param time_to_first_byte: Seconds until the response headers arrived
+    :type time_to_first_byte: float
+    :param elapsed: Seconds until the exchange completed
+    :type elapsed: float
+    """
+
+    method: str
+    url: str
+    status: int
+    response_body: bytes = b""
+    response_headers: dict = field(default_factory=dict)
+    request_hash: str = ""
+    request_size: int = 0
+    principal: str = ""
+    time_to_first_byte: float = 0.0
+    elapsed: float = 0.0
+
+
+class Cassette:
+    """Ordered recording of API exchanges that can be saved to a gzip-compressed JSON file and
+    served back by ReplayTransport.
+
+    Authorization headers and request bodies are never stored, only their hashes and sizes.
+    Response fields that carry credentials, such as the token values returned by the auth API,
+    are replaced in JSON response bodies.
+
+    :param entries: Recorded exchanges
+    :type entries: List[CassetteEntry]
+    :param redact_keys: JSON keys whose values are redacted from response bodies
+    :type redact_keys: FrozenSet[str]
+    """
+
+    VERSION = 1
+
+    def __init__(
+        self,
+        entries: Optional[List[CassetteEntry]] = None,
+        redact_keys: FrozenSet[str] = frozenset({"tokenValue", "refreshTokenId"}),
+    ):
+        self.entries: List[CassetteEntry] = entries or []
+        self.redact_keys = redact_keys
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        data,
+        headers: Optional[dict],
+        status: int,
+        response_headers,
+        response_body: bytes,
+        time_to_first_byte: float,
+        elapsed: float,
+    ) -> CassetteEntry:
+        """Append an exchange, redacting credentials
+
+        :param method: HTTP method
+        :type method: str
+        :param url: Full request URL
+        :type url: str
+        :param data: Request body
+        :param headers: Request headers
+        :type headers: dict, optional
+        :param status: Response status code
+        :type status: int
+        :param response_headers: Response headers
+        :param response_body: Response body
+        :type response_body: bytes
+        :param time_to_first_byte: Seconds until the response headers arrived
+        :type time_to_first_byte: float
+        :param elapsed: Seconds until the exchange completed
+        :type elapsed: float
+        :return: Recorded exchange
+        :rtype: CassetteEntry
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        body = bytes(data) if data else b""
+        authorization = (headers or {}).get("Authorization", "")
+
+        entry = CassetteEntry(
+            method,
+            url,
+            status,
+            self._redact_body(response_body or b""),
+            {
+                key: value
+                for key, value in dict(response_headers).items()
+                if key.lower() not in _DROPPED_HEADERS
+            },
+            hashlib.sha256(body).hexdigest() if body else "",
+            len(body),
+            hashlib.sha256(authorization.encode("utf-8")).hexdigest()[:16]
+            if authorization
+            else "",
+            time_to_first_byte,
+            elapsed,
+        )
+        with self._lock:
+            self.entries.append(entry)
+        return entry
+
+    def tee(self, entry: CassetteEntry, blocks: Iterator[bytes]) -> Iterator[bytes]:
+        """Pass a streamed response body through, storing it in an entry recorded without a body
+        once it has been read. A body that is not read to the end is stored as far as it was read.
+
+        :param entry: Exchange returned by :meth:`record`
+        :type entry: CassetteEntry
+        :param blocks: Response body blocks
+        :type blocks: Iterator[bytes]
+        :return: The same blocks
+        :rtype: Iterator[bytes]
+        """
+        body = bytearray()
+        started = monotonic()
+        try:
+            for block in blocks:
+                body += block
+                yield block
+        finally:
+            entry.elapsed += monotonic() - started
+            entry.response_body = self._redact_body(bytes(body))
+
+    def _redact_body(self, body: bytes) -> bytes:
+        if not body or not body.lstrip().startswith((b"{", b"[")):
+            return body
+        try:
+            document = json.loads(body)
+        except ValueError:
+            return body
+        if not self._redact(document):
+            return body
+        return json.dumps(document).encode("utf-8")
+
+    def _redact(self, document) -> bool:
+        """Replace redacted keys in place, returning whether anything changed"""
+        changed = False
+        if isinstance(document, dict):
+            for key, value in document.items():
+                if key in self.redact_keys and value is not None:
+                    document[key] = _REDACTED
+                    changed = True
+                else:
+                    changed = self._redact(value) or changed
+        elif isinstance(document, list):
+            for value in document:
+                changed = self._redact(value) or changed
+        return changed
+
+    def save(self, path: str) -> None:
+        """Write the cassette to a gzip-compressed JSON file
+
+        :param path: Destination file
+        :type path: str
+        """
+        with self._lock:
+            entries = [asdict(entry) for entry in self.entries]
+        for entry in entries:
+            entry["response_body"] = base64.b64encode(entry["response_body"]).decode("ascii")
+
+        with gzip.open(path, "wt", encoding="utf-8") as cassette_file:
+            json.dump({"version": self.VERSION, "entries": entries}, cassette_file)
+        logger.info(f"Saved {len(entries)} recorded requests to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        """Read a cassette written by :meth:`save`
+
+        :param path: Cassette file
+        :type path: str
+        :rtype: Cassette
+        """
+        with gzip.open(path, "rt", encoding="utf-8") as cassette_file:
+            document = json.load(cassette_file)
+
+        if document.get("version") != cls.VERSION:
+            raise ValueError(f"Unsupported cassette version {document.get('version')}")
+
+        entries = []
+        for entry in document["entries"]:
+            entry["response_body"] = base64.b64decode(entry["response_body"])
+            entries.append(CassetteEntry(**entry))
+        return cls(entries)
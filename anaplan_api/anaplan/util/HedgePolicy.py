@@ -0,0 +1,151 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, FrozenSet, Optional
+from .TimeoutPolicy import LatencyWindow, TimeoutPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class HedgePolicy:
+    """Opt-in hedging of idempotent GETs. When a task status poll or metadata request has not
+    answered within the delay quantile of its endpoint's recent latency, a duplicate is sent on
+    another pooled connection and whichever responds first is used; the other is discarded.
+
+    Hedges are paid for from a token budget: every eligible request earns ``budget`` tokens, up to
+    ``burst``, and each hedge spends one, so at most that fraction of requests is duplicated.
+
+    :param delay_quantile: Latency quantile after which a request is hedged
+    :type delay_quantile: float
+    :param default_delay: Hedge delay in seconds until the endpoint has min_samples latencies
+    :type default_delay: float
+    :param min_delay: Lower bound of the hedge delay in seconds
+    :type min_delay: float
+    :param budget: Fraction of eligible requests that may be hedged
+    :type budget: float
+    :param burst: Maximum number of hedges that can be saved up
+    :type burst: float
+    :param operation_classes: Operation classes eligible for hedging
+    :type operation_classes: FrozenSet[str]
+    :param window: Number of latency samples kept per endpoint
+    :type window: int
+    :param min_samples: Samples required before the delay follows the observed latency
+    :type min_samples: int
+    :param max_workers: Threads sending hedged requests for the synchronous handler
+    :type max_workers: int
+    """
+
+    def __init__(
+        self,
+        delay_quantile: float = 0.95,
+        default_delay: float = 1.0,
+        min_delay: float = 0.05,
+        budget: float = 0.05,
+        burst: float = 10,
+        operation_classes: FrozenSet[str] = frozenset({"poll", "metadata"}),
+        window: int = 200,
+        min_samples: int = 20,
+        max_workers: int = 32,
+    ):
+        if not 0 < delay_quantile <= 1:
+            raise ValueError("delay_quantile must be between 0 and 1")
+        if budget < 0 or burst < 1:
+            raise ValueError("budget must not be negative and burst must be at least 1")
+        self.delay_quantile = delay_quantile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.budget = budget
+        self.burst = burst
+        self.operation_classes = operation_classes
+        self.window = window
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._tokens = burst
+        self._latencies: Dict[str, LatencyWindow] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def applies(self, method: str, idempotent: bool, context: Optional[dict]) -> bool:
+        """Check whether a request may be hedged, earning budget for it if so
+
+        :param method: HTTP method
+        :type method: str
+        :param idempotent: Whether the request can safely be repeated
+        :type idempotent: bool
+        :param context: Operation context passed to make_request
+        :type context: dict, optional
+        :rtype: bool
+        """
+        if method != "GET" or not idempotent:
+            return False
+        if TimeoutPolicy.operation_class(context) not in self.operation_classes:
+            return False
+        with self._lock:
+            self._tokens = min(self._tokens + self.budget, self.burst)
+        return True
+
+    def delay(self, endpoint: str) -> float:
+        """Get the time to wait for a response before hedging
+
+        :param endpoint: Endpoint template, from RequestHooks.template
+        :type endpoint: str
+        :rtype: float
+        """
+        latencies = self._latencies.get(endpoint)
+        if latencies is None or len(latencies) < self.min_samples:
+            return self.default_delay
+        return max(latencies.percentile(self.delay_quantile), self.min_delay)
+
+    def acquire(self) -> bool:
+        """Spend a token for a hedge
+
+        :return: Whether the budget allows the hedge
+        :rtype: bool
+        """
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self.hedged += 1
+            return True
+
+    def won(self) -> None:
+        """Count a hedge that answered before the original request"""
+        with self._lock:
+            self.hedge_wins += 1
+
+    def observe(self, endpoint: str, latency: float) -> None:
+        """Record the time a request waited for its response headers
+
+        :param endpoint: Endpoint template, from RequestHooks.template
+        :type endpoint: str
+        :param latency: Seconds until the response headers arrived
+        :type latency: float
+        """
+        latencies = self._latencies.get(endpoint)
+        if latencies is None:
+            with self._lock:
+                latencies = self._latencies.setdefault(endpoint, LatencyWindow(self.window))
+        latencies.add(latency)
+
+    def executor(self) -> ThreadPoolExecutor:
+        """Get the thread pool sending hedged requests, creating it on first use
+
+        :rtype: ThreadPoolExecutor
+        """
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        self.max_workers, thread_name_prefix="anaplan-hedge"
+                    )
+        return self._executor
+
+    def shutdown(self) -> None:
+        """Stop the thread pool once in-flight requests finish"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    """Cached response body with its validators
+
+    :param content: Response body
+    :type content: bytes
+    :param headers: Response headers
+    :type headers: dict
+    :param etag: ETag validator, sent back as If-None-Match
+    :type etag: str, optional
+    :param last_modified: Last-Modified validator, sent back as If-Modified-Since
+    :type last_modified: str, optional
+    :param expires_at: Epoch time until which the entry is served without revalidation
+    :type expires_at: float
+    """
+
+    content: bytes
+    headers: dict = field(default_factory=dict)
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    expires_at: float = 0.0
+
+    @property
+    def fresh(self) -> bool:
+        """Whether the entry can be served without contacting the server"""
+        return time.time() < self.expires_at
+
+    @property
+    def has_validators(self) -> bool:
+        """Whether the server supplied an ETag or Last-Modified header"""
+        return bool(self.etag or self.last_modified)
+
+    def conditional_headers(self) -> dict:
+        """Get headers asking the server to answer 304 if the resource is unchanged
+
+        :rtype: dict
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """LRU cache of GET responses for metadata endpoints, optionally persisted to disk.
+
+    Responses carrying an ETag or Last-Modified header are always revalidated with a conditional
+    request and served from the cache on 304. Responses without validators are served from the
+    cache for ``ttl`` seconds, or not cached at all when ``ttl`` is 0.
+
+    :param max_entries: Number of responses kept in memory
+    :type max_entries: int
+    :param ttl: Seconds to serve a response that has no validators
+    :type ttl: float
+    :param cache_dir: Directory to persist entries in, None to keep them in memory only
+    :type cache_dir: str, optional
+    """
+
+    def __init__(
+        self, max_entries: int = 128, ttl: float = 0, cache_dir: Optional[str] = None
+    ):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._cache_dir = cache_dir
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(url: str, headers: Optional[Mapping]) -> str:
+        """Build the cache key for a request. Entries are scoped to the auth principal.
+
+        :param url: Request URL
+        :type url: str
+        :param headers: Request headers
+        :type headers: dict, optional
+        :rtype: str
+        """
+        authorization = (headers or {}).get("Authorization", "")
+        return hashlib.sha256(f"{authorization}\n{url}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Look up an entry, loading it from disk if it is not in memory
+
+        :param key: Cache key from :meth:`key`
+        :type key: str
+        :rtype: CacheEntry, optional
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._load(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def store(self, key: str, content: bytes, headers: Mapping) -> None:
+        """Cache a 200 response if it has validators or a TTL applies
+
+        :param key: Cache key from :meth:`key`
+        :type key: str
+        :param content: Response body
+        :type content: bytes
+        :param headers: Response headers
+        :type headers: Mapping
+        """
+        entry = CacheEntry(
+            content,
+            dict(headers),
+            headers.get("ETag"),
+            headers.get("Last-Modified"),
+        )
+        if not entry.has_validators:
+            if self._ttl <= 0:
+                return
+            entry.expires_at = time.time() + self._ttl
+
+        self._remember(key, entry)
+        self._save(key, entry)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop one entry, or every entry when key is None
+
+        :param key: Cache key from :meth:`key`
+        :type key: str, optional
+        """
+        with self._lock:
+            keys = list(self._entries) if key is None else [key]
+            for item in keys:
+                self._entries.pop(item, None)
+
+        if self._cache_dir is not None:
+            names = os.listdir(self._cache_dir) if key is None else [f"{key}.json"]
+            for name in names:
+                try:
+                    os.remove(os.path.join(self._cache_dir, name))
+                except OSError:
+                    pass
+
+    def _remember(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._cache_dir, f"{key}.json")
+
+    def _load(self, key: str) -> Optional[CacheEntry]:
+        if self._cache_dir is None:
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as cache_file:
+                record = json.load(cache_file)
+            record["content"] = record["content"].encode("latin-1")
+            return CacheEntry(**record)
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+
+    def _save(self, key: str, entry: CacheEntry) -> None:
+        if self._cache_dir is None:
+            return
+        record = asdict(entry)
+        record["content"] = entry.content.decode("latin-1")
+        temp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as cache_file:
+                json.dump(record, cache_file)
+            os.replace(temp_path, self._path(key))
+        except OSError as e:
+            logger.warning(f"Unable to persist cache entry: {e}")
@@ -0,0 +1,38 @@
+import io
+from typing import Iterator, Optional
+
+
+class IterStream(io.RawIOBase):
+    """Read-only binary stream over an iterator of byte blocks, e.g. a streamed response body.
+
+    Wrap in ``io.BufferedReader`` or ``io.TextIOWrapper`` to hand it to readers such as
+    ``pandas.read_csv`` without holding the whole body in memory.
+
+    :param blocks: Iterator yielding byte blocks
+    :type blocks: Iterator[bytes]
+    """
+
+    def __init__(self, blocks: Iterator[bytes]):
+        self._blocks = blocks
+        self._pending: Optional[memoryview] = None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        """Copy the next available bytes into the buffer
+
+        :param buffer: Writable buffer to fill
+        :return: Number of bytes copied, 0 at end of stream
+        :rtype: int
+        """
+        while not self._pending:
+            block = next(self._blocks, None)
+            if block is None:
+                return 0
+            self._pending = memoryview(block)
+
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
@@ -0,0 +1,80 @@
+import json
+import logging
+from typing import Optional, Union
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional dependency
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+if msgspec is not None:
+
+    class _TaskState(msgspec.Struct):
+        taskState: str = ""
+
+    class _TaskStatus(msgspec.Struct):
+        task: Optional[_TaskState] = None
+
+
+class JsonCodec:
+    """Decodes API responses with the fastest JSON library installed: msgspec, then orjson, then the
+    standard library. Every response body the library parses goes through this class.
+
+    :param backend: Name of the library used to decode JSON
+    :type backend: str
+    """
+
+    if msgspec is not None:
+        backend = "msgspec"
+        _decoder = msgspec.json.Decoder()
+        _task_decoder = msgspec.json.Decoder(_TaskStatus)
+    elif orjson is not None:
+        backend = "orjson"
+    else:
+        backend = "json"
+
+    @classmethod
+    def loads(cls, content: Union[bytes, str]):
+        """Parse a JSON document
+
+        :param content: JSON document
+        :type content: bytes or str
+        :return: Parsed document
+        """
+        if cls.backend == "msgspec":
+            return cls._decoder.decode(content)
+        if cls.backend == "orjson":
+            return orjson.loads(content)
+        return json.loads(content)
+
+    @classmethod
+    def decode(cls, response):
+        """Parse the body of a response as JSON
+
+        :param response: Response with a bytes ``content`` attribute
+        :type response: requests.Response or AsyncResponse
+        :return: Parsed response body
+        """
+        return cls.loads(response.content)
+
+    @classmethod
+    def task_state(cls, content: bytes) -> Optional[str]:
+        """Read only ``task.taskState`` from a task status payload. With msgspec the rest of the
+        document, including large result details, is skipped without building objects.
+
+        :param content: Task status response body
+        :type content: bytes
+        :return: Task state, or None if the payload has no task
+        :rtype: str, optional
+        """
+        if cls.backend == "msgspec":
+            status = cls._task_decoder.decode(content)
+            return None if status.task is None else status.task.taskState or None
+        return cls.loads(content).get("task", {}).get("taskState")
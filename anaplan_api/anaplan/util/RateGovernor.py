@@ -0,0 +1,419 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional, Tuple
+from ..models.AuthToken import AuthToken
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_MODEL_PATTERN = re.compile(r"workspaces/([^/]+)(?:/models/([^/?]+))?")
+
+
+@dataclass
+class BucketState:
+    """Token bucket state shared by every caller of one governor key
+
+    :param tokens: Tokens available at ``updated``, negative when requests are queued
+    :type tokens: float
+    :param updated: Wall clock time the token count refers to, may lie in the future while paused
+    :type updated: float
+    :param rate: Request rate set after the last throttling response
+    :type rate: float
+    :param throttled_at: Wall clock time of the last throttling response
+    :type throttled_at: float
+    """
+
+    tokens: float
+    updated: float
+    rate: float
+    throttled_at: float = 0.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket. After a 429 the rate is cut and then recovers linearly to the
+    configured ceiling, so callers settle just under the server limit instead of oscillating.
+
+    :param rate: Requests per second allowed once recovered
+    :type rate: float
+    :param burst: Maximum number of requests sent back to back
+    :type burst: float
+    :param min_rate: Lowest rate the bucket backs off to
+    :type min_rate: float
+    :param backoff_factor: Rate multiplier applied on each throttling response
+    :type backoff_factor: float
+    :param recovery_period: Seconds to climb from zero back to the full rate
+    :type recovery_period: float
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        min_rate: float = 0.1,
+        backoff_factor: float = 0.5,
+        recovery_period: float = 60,
+    ):
+        self.max_rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.backoff_factor = backoff_factor
+        self.recovery_period = recovery_period
+        self._lock = threading.Lock()
+        self._state = BucketState(burst, time.time(), rate)
+
+    def _current_rate(self, state: BucketState, now: float) -> float:
+        recovered = self.max_rate * (now - state.throttled_at) / self.recovery_period
+        return min(self.max_rate, state.rate + max(recovered, 0.0))
+
+    def _reserve(self, state: BucketState, now: float) -> float:
+        rate = self._current_rate(state, now)
+        ref = max(now, state.updated)
+        state.tokens = min(
+            self.burst, state.tokens + max(now - state.updated, 0.0) * rate
+        )
+        state.updated = ref
+        state.tokens -= 1
+        return (ref - now) + max(-state.tokens, 0.0) / rate
+
+    def _throttle(self, state: BucketState, now: float, pause: float) -> None:
+        state.rate = max(self.min_rate, self._current_rate(state, now) * self.backoff_factor)
+        state.throttled_at = now
+        state.tokens = min(state.tokens, 0.0)
+        state.updated = max(state.updated, now + pause)
+
+    def reserve(self) -> float:
+        """Take a token, returning how long the caller must wait before sending
+
+        :return: Delay in seconds
+        :rtype: float
+        """
+        with self._lock:
+            return self._reserve(self._state, time.time())
+
+    def throttle(self, pause: float = 0.0) -> None:
+        """Record a throttling response, reducing the rate and pausing all callers
+
+        :param pause: Seconds during which no request is sent, e.g. from Retry-After
+        :type pause: float
+        """
+        with self._lock:
+            self._throttle(self._state, time.time(), pause)
+
+
+class FileTokenBucket(TokenBucket):
+    """Token bucket whose state lives in a locked file so that every process on the host shares it
+
+    :param path: State file, created on first use
+    :type path: str
+    """
+
+    def __init__(self, path: str, rate: float, burst: float, **kwargs):
+        if fcntl is None:
+            raise RuntimeError("File-backed rate limits require fcntl (POSIX)")
+        super().__init__(rate, burst, **kwargs)
+        self.path = path
+
+    @contextmanager
+    def _locked_state(self):
+        with open(self.path, "a+") as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                state_file.seek(0)
+                raw = state_file.read()
+                try:
+                    state = BucketState(**json.loads(raw))
+                except (ValueError, TypeError):
+                    state = BucketState(self.burst, time.time(), self.max_rate)
+                yield state
+                state_file.seek(0)
+                state_file.truncate()
+                state_file.write(json.dumps(state.__dict__))
+                state_file.flush()
+            finally:
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+
+    def reserve(self) -> float:
+        with self._locked_state() as state:
+            return self._reserve(state, time.time())
+
+    def throttle(self, pause: float = 0.0) -> None:
+        with self._locked_state() as state:
+            self._throttle(state, time.time(), pause)
+
+
+class InFlightLimiter:
+    """Caps the number of concurrent requests for one governor key within a process
+
+    :param limit: Maximum number of requests in flight
+    :type limit: int
+    """
+
+    def __init__(self, limit: int):
+        self._semaphore = threading.BoundedSemaphore(limit)
+
+    def try_acquire(self):
+        """Take a slot without waiting
+
+        :return: Token to pass to :meth:`release`, or None if every slot is taken
+        """
+        return True if self._semaphore.acquire(blocking=False) else None
+
+    def acquire(self):
+        """Wait for a slot
+
+        :return: Token to pass to :meth:`release`
+        """
+        self._semaphore.acquire()
+        return True
+
+    def release(self, slot) -> None:
+        self._semaphore.release()
+
+
+class FileInFlightLimiter(InFlightLimiter):
+    """Caps concurrent requests across processes with one lock file per slot
+
+    :param prefix: Path prefix of the slot lock files
+    :type prefix: str
+    :param limit: Maximum number of requests in flight on the host
+    :type limit: int
+    :param poll_interval: Seconds between attempts when every slot is taken
+    :type poll_interval: float
+    """
+
+    def __init__(self, prefix: str, limit: int, poll_interval: float = 0.01):
+        if fcntl is None:
+            raise RuntimeError("File-backed rate limits require fcntl (POSIX)")
+        self._paths = [f"{prefix}.slot{i}" for i in range(limit)]
+        self._poll_interval = poll_interval
+
+    def try_acquire(self):
+        for path in self._paths:
+            slot = open(path, "a")
+            try:
+                fcntl.flock(slot, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return slot
+            except OSError:
+                slot.close()
+        return None
+
+    def acquire(self):
+        while True:
+            slot = self.try_acquire()
+            if slot is not None:
+                return slot
+            time.sleep(self._poll_interval)
+
+    def release(self, slot) -> None:
+        fcntl.flock(slot, fcntl.LOCK_UN)
+        slot.close()
+
+
+class RateGovernor:
+    """Client-side request rate and concurrency limits keyed by user, workspace and model.
+
+    One governor is shared by every thread that uses the request handlers. The user is identified by the
+    principal of the AuthToken sending the request rather than the token value, which is replaced whenever
+    it is refreshed, so a long job keeps one budget per user and model. When
+    ``lock_dir`` is set the token buckets and in-flight slots are kept in lock files in that directory,
+    so separate worker processes on the same host obey a single budget. Without fcntl the limits fall
+    back to the current process.
+
+    :param rate: Requests per second per key
+    :type rate: float
+    :param burst: Requests that may be sent back to back per key
+    :type burst: float
+    :param max_in_flight: Maximum concurrent requests per key
+    :type max_in_flight: int
+    :param lock_dir: Directory for cross-process state files, None to limit within the process only
+    :type lock_dir: str, optional
+    :param bucket_options: Extra TokenBucket arguments (min_rate, backoff_factor, recovery_period)
+    """
+
+    def __init__(
+        self,
+        rate: float = 10,
+        burst: float = 10,
+        max_in_flight: int = 8,
+        lock_dir: Optional[str] = None,
+        **bucket_options,
+    ):
+        if rate <= 0 or burst < 1 or max_in_flight < 1:
+            raise ValueError("rate must be positive, burst and max_in_flight at least 1")
+
+        self._rate = rate
+        self._burst = burst
+        self._max_in_flight = max_in_flight
+        self._lock_dir = lock_dir
+        self._bucket_options = bucket_options
+        self._limits: Dict[Tuple[str, str, str], Tuple[TokenBucket, InFlightLimiter]] = {}
+        self._lock = threading.Lock()
+
+        if lock_dir is not None and fcntl is None:
+            logger.warning("File-backed rate limits require fcntl (POSIX), limiting within the process only")
+            self._lock_dir = None
+        elif lock_dir is not None:
+            os.makedirs(lock_dir, exist_ok=True)
+
+    @staticmethod
+    def key_for(url: str, headers: Optional[Mapping] = None) -> Tuple[str, str, str]:
+        """Derive the governor key of a request
+
+        :param url: Request URL
+        :type url: str
+        :param headers: Request headers, whose Authorization value identifies the user
+        :type headers: Mapping, optional
+        :return: Principal, workspace ID and model ID, each empty when the request does not have one
+        :rtype: Tuple[str, str, str]
+        """
+        authorization = (headers or {}).get("Authorization", "")
+        principal = AuthToken.principal_for(authorization) if authorization else ""
+        if principal is None:
+            principal = hashlib.sha256(authorization.encode("utf-8")).hexdigest()[:16]
+        match = _MODEL_PATTERN.search(url)
+        if match is None:
+            return principal, "", ""
+        return principal, match.group(1), match.group(2) or ""
+
+    def _get_limits(self, key: Tuple[str, str, str]) -> Tuple[TokenBucket, InFlightLimiter]:
+        limits = self._limits.get(key)
+        if limits is not None:
+            return limits
+
+        with self._lock:
+            if key not in self._limits:
+                if self._lock_dir is None:
+                    bucket = TokenBucket(self._rate, self._burst, **self._bucket_options)
+                    in_flight = InFlightLimiter(self._max_in_flight)
+                else:
+                    name = hashlib.sha256("/".join(key).encode("utf-8")).hexdigest()[:24]
+                    prefix = os.path.join(self._lock_dir, name)
+                    bucket = FileTokenBucket(
+                        f"{prefix}.bucket", self._rate, self._burst, **self._bucket_options
+                    )
+                    in_flight = FileInFlightLimiter(prefix, self._max_in_flight)
+                self._limits[key] = (bucket, in_flight)
+            return self._limits[key]
+
+    @contextmanager
+    def acquire(self, key: Tuple[str, str, str]):
+        """Wait for a token and an in-flight slot, holding the slot for the duration of the block
+
+        :param key: Governor key from :meth:`key_for`
+        :type key: Tuple[str, str, str]
+        """
+        bucket, in_flight = self._get_limits(key)
+        slot = in_flight.acquire()
+        try:
+            delay = bucket.reserve()
+            if delay > 0:
+                time.sleep(delay)
+            yield
+        finally:
+            in_flight.release(slot)
+
+    @asynccontextmanager
+    async def acquire_async(self, key: Tuple[str, str, str], poll_interval: float = 0.01):
+        """Coroutine variant of :meth:`acquire` that never blocks the event loop
+
+        :param key: Governor key from :meth:`key_for`
+        :type key: Tuple[str, str, str]
+        :param poll_interval: Seconds between attempts when every slot is taken
+        :type poll_interval: float
+        """
+        bucket, in_flight = self._get_limits(key)
+        slot = in_flight.try_acquire()
+        while slot is None:
+            await asyncio.sleep(poll_interval)
+            slot = in_flight.try_acquire()
+        try:
+            delay = await self._reserve_async(bucket)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield
+        finally:
+            in_flight.release(slot)
+
+    def try_acquire(self, key: Tuple[str, str, str]):
+        """Take an in-flight slot without waiting, for optional requests that are skipped at the limit.
+        The caller waits for :meth:`reserve` before sending and hands the slot back with :meth:`release`.
+
+        :param key: Governor key from :meth:`key_for`
+        :type key: Tuple[str, str, str]
+        :return: Slot to pass to :meth:`release`, or None if every slot is taken
+        """
+        return self._get_limits(key)[1].try_acquire()
+
+    def reserve(self, key: Tuple[str, str, str]) -> float:
+        """Take a token for a request sent in a slot from :meth:`try_acquire`
+
+        :param key: Governor key from :meth:`key_for`
+        :type key: Tuple[str, str, str]
+        :return: Seconds to wait before sending
+        :rtype: float
+        """
+        return self._get_limits(key)[0].reserve()
+
+    async def reserve_async(self, key: Tuple[str, str, str]) -> float:
+        """Coroutine variant of :meth:`reserve` that never blocks the event loop
+
+        :param key: Governor key from :meth:`key_for`
+        :type key: Tuple[str, str, str]
+        :return: Seconds to wait before sending
+        :rtype: float
+        """
+        return await self._reserve_async(self._get_limits(key)[0])
+
+    @staticmethod
+    async def _reserve_async(bucket: TokenBucket) -> float:
+        # The state file lock of a shared bucket may be held by another process
+        if isinstance(bucket, FileTokenBucket):
+            return await asyncio.get_running_loop().run_in_executor(None, bucket.reserve)
+        return bucket.reserve()
+
+    def release(self, key: Tuple[str, str, str], slot) -> None:
+        """Hand back a slot taken with :meth:`try_acquire`
+
+        :param key: Governor key from :meth:`key_for`
+        :type key: Tuple[str, str, str]
+        :param slot: Slot returned by :meth:`try_acquire`
+        """
+        self._get_limits(key)[1].release(slot)
+
+    def throttled(self, key: Tuple[str, str, str], pause: Optional[float] = None) -> None:
+        """Record a 429 for the key so every caller slows down together
+
+        :param key: Governor key from :meth:`key_for`
+        :type key: Tuple[str, str, str]
+        :param pause: Seconds from the Retry-After header, if any
+        :type pause: float, optional
+        """
+        logger.debug(f"Request rate throttled for user {key[0]}, workspace {key[1]}, model {key[2]}")
+        self._get_limits(key)[0].throttle(pause or 0.0)
+
+    async def throttled_async(self, key: Tuple[str, str, str], pause: Optional[float] = None) -> None:
+        """Coroutine variant of :meth:`throttled` that never blocks the event loop
+
+        :param key: Governor key from :meth:`key_for`
+        :type key: Tuple[str, str, str]
+        :param pause: Seconds from the Retry-After header, if any
+        :type pause: float, optional
+        """
+        logger.debug(f"Request rate throttled for user {key[0]}, workspace {key[1]}, model {key[2]}")
+        bucket = self._get_limits(key)[0]
+        if isinstance(bucket, FileTokenBucket):
+            await asyncio.get_running_loop().run_in_executor(None, bucket.throttle, pause or 0.0)
+        else:
+            bucket.throttle(pause or 0.0)
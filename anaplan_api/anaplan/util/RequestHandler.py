@@ -1,5 +1,12 @@
+import atexit
 import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from contextlib import contextmanager, nullcontext
 import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
 from requests.exceptions import (
     HTTPError,
     ConnectionError,
@@ -9,17 +16,229 @@ from requests.exceptions import (
     ReadTimeout,
     RequestException,
 )
-from typing import Union
+from time import monotonic, sleep
+from typing import Callable, Iterator, Optional, Tuple, Union
+from .Cassette import Cassette
+from .HedgePolicy import HedgePolicy
+from .HttpCache import CacheEntry, HttpCache
+from .JsonCodec import JsonCodec
+from .RateGovernor import RateGovernor
+from .RequestHooks import RequestEvent, RequestHooks
+from .RequestPlan import RequestPlan
+from .RetryPolicy import RetryPolicy
+from .SingleFlight import SingleFlight
+from .TimeoutPolicy import TimeoutPolicy
 
 logger = logging.getLogger(__name__)
 
 
 class RequestHandler:
+    """Issues API requests through a keep-alive connection pool shared by every handler in the process.
+
+    :param _base_url: URL prepended to every endpoint
+    :type _base_url: str
+    :param _session: Session shared by all RequestHandler instances
+    :type _session: requests.Session
+    :param _session_lock: Guards creation and replacement of the shared session
+    :type _session_lock: threading.Lock
+    :param _pool_connections: Number of per-host connection pools to cache
+    :type _pool_connections: int
+    :param _pool_maxsize: Maximum number of connections kept open to a single host
+    :type _pool_maxsize: int
+    :param _pool_block: Whether to wait for a free connection once a host reaches _pool_maxsize
+    :type _pool_block: bool
+    :param _retry_policy: Policy applied to requests that do not pass their own
+    :type _retry_policy: RetryPolicy
+    :param _governor: Client-side rate and concurrency limits, disabled when None
+    :type _governor: RateGovernor, optional
+    :param _cache: Conditional GET cache for requests made with cache=True, disabled when None, the default
+    :type _cache: HttpCache, optional
+    :param _single_flight: Coalesces identical concurrent GETs made through get_json
+    :type _single_flight: SingleFlight
+    :param _hooks: Lifecycle hooks notified of every request attempt
+    :type _hooks: RequestHooks
+    :param _recorder: Cassette receiving every exchange while recording, None when not recording
+    :type _recorder: Cassette, optional
+    :param _timeout_policy: Chooses connect and read timeouts for each request
+    :type _timeout_policy: TimeoutPolicy
+    :param _hedge_policy: Duplicates slow polls and metadata GETs, disabled when None
+    :type _hedge_policy: HedgePolicy, optional
+    """
+
     _base_url: str
+    _session: Optional[requests.Session] = None
+    _session_lock: threading.Lock = threading.Lock()
+    _pool_connections: int = 10
+    _pool_maxsize: int = 10
+    _pool_block: bool = False
+    _retry_policy: RetryPolicy = RetryPolicy()
+    _governor: Optional[RateGovernor] = None
+    _cache: Optional[HttpCache] = None
+    _single_flight: SingleFlight = SingleFlight()
+    _hooks: RequestHooks = RequestHooks()
+    _recorder: Optional[Cassette] = None
+    _timeout_policy: TimeoutPolicy = TimeoutPolicy()
+    _hedge_policy: Optional[HedgePolicy] = None
 
     def __init__(self, base_url: str) -> None:
         self._base_url = base_url
 
+    @classmethod
+    def configure_pool(
+        cls, pool_connections: int = 10, pool_maxsize: int = 10, pool_block: bool = False
+    ) -> None:
+        """Set connection pool limits. The current session is closed and rebuilt on next use.
+
+        :param pool_connections: Number of hosts to keep connection pools for
+        :type pool_connections: int
+        :param pool_maxsize: Maximum number of open connections per host
+        :type pool_maxsize: int
+        :param pool_block: Block until a connection is free instead of opening a throwaway one
+        :type pool_block: bool
+        """
+        if pool_connections < 1 or pool_maxsize < 1:
+            raise ValueError("Pool sizes must be at least 1")
+
+        with cls._session_lock:
+            cls._pool_connections = pool_connections
+            cls._pool_maxsize = pool_maxsize
+            cls._pool_block = pool_block
+            old_session, RequestHandler._session = RequestHandler._session, None
+
+        if old_session is not None:
+            old_session.close()
+
+    @classmethod
+    def get_session(cls) -> requests.Session:
+        """Get the shared session, creating it on first use
+
+        :return: Session with pooled HTTPS adapter
+        :rtype: requests.Session
+        """
+        session = RequestHandler._session
+        if session is not None:
+            return session
+
+        with cls._session_lock:
+            if RequestHandler._session is None:
+                adapter = HTTPAdapter(
+                    pool_connections=cls._pool_connections,
+                    pool_maxsize=cls._pool_maxsize,
+                    pool_block=cls._pool_block,
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                RequestHandler._session = session
+                logger.debug(
+                    f"Created HTTP session pool, {cls._pool_connections} hosts, "
+                    f"{cls._pool_maxsize} connections per host"
+                )
+            return RequestHandler._session
+
+    @classmethod
+    def close_session(cls) -> None:
+        """Close all pooled connections. A new session is created on the next request."""
+        with cls._session_lock:
+            session, RequestHandler._session = RequestHandler._session, None
+
+        if session is not None:
+            session.close()
+
+    @classmethod
+    def set_retry_policy(cls, retry_policy: RetryPolicy) -> None:
+        """Replace the retry policy used by requests that do not pass their own
+
+        :param retry_policy: Policy applied to every request
+        :type retry_policy: RetryPolicy
+        """
+        RequestHandler._retry_policy = retry_policy
+
+    @classmethod
+    def set_cache(cls, cache: Optional[HttpCache]) -> None:
+        """Cache metadata GETs for every handler, or disable caching with None. Caching is off by default.
+
+        :param cache: Cache shared by all handlers
+        :type cache: HttpCache, optional
+        """
+        RequestHandler._cache = cache
+
+    @classmethod
+    def set_governor(cls, governor: Optional[RateGovernor]) -> None:
+        """Limit request rate and concurrency for every handler, or remove the limits with None
+
+        :param governor: Governor shared by all threads using the handlers
+        :type governor: RateGovernor, optional
+        """
+        RequestHandler._governor = governor
+
+    @classmethod
+    def set_timeout_policy(cls, timeout_policy: TimeoutPolicy) -> None:
+        """Replace the policy choosing connect and read timeouts for every handler
+
+        :param timeout_policy: Policy shared by all handlers
+        :type timeout_policy: TimeoutPolicy
+        """
+        RequestHandler._timeout_policy = timeout_policy
+
+    @classmethod
+    def set_hedge_policy(cls, hedge_policy: Optional[HedgePolicy]) -> None:
+        """Hedge slow idempotent GETs for every handler, or stop hedging with None
+
+        :param hedge_policy: Policy shared by all handlers
+        :type hedge_policy: HedgePolicy, optional
+        """
+        previous, RequestHandler._hedge_policy = RequestHandler._hedge_policy, hedge_policy
+        if previous is not None and previous is not hedge_policy:
+            previous.shutdown()
+
+    @classmethod
+    def add_hook(cls, event: str, hook: Callable[[RequestEvent], None]) -> None:
+        """Register a hook called for every request made by any handler
+
+        :param event: One of start, first_byte, end, retry or error
+        :type event: str
+        :param hook: Callable receiving the RequestEvent of the attempt
+        :type hook: Callable[[RequestEvent], None]
+        """
+        RequestHandler._hooks.register(event, hook)
+
+    @classmethod
+    def remove_hook(cls, event: str, hook: Callable[[RequestEvent], None]) -> None:
+        """Unregister a hook added with add_hook
+
+        :param event: Event the hook was registered for
+        :type event: str
+        :param hook: Hook to remove
+        :type hook: Callable[[RequestEvent], None]
+        """
+        RequestHandler._hooks.unregister(event, hook)
+
+    @classmethod
+    def start_recording(cls, cassette: Optional[Cassette] = None) -> Cassette:
+        """Record every request made by any handler, including auth requests, until stop_recording.
+        The HTTP cache is cleared so the recording does not depend on earlier responses.
+
+        :param cassette: Cassette to append to, a new one if None
+        :type cassette: Cassette, optional
+        :return: Cassette receiving the exchanges
+        :rtype: Cassette
+        """
+        if RequestHandler._cache is not None:
+            RequestHandler._cache.invalidate()
+        RequestHandler._recorder = cassette if cassette is not None else Cassette()
+        return RequestHandler._recorder
+
+    @classmethod
+    def stop_recording(cls) -> Optional[Cassette]:
+        """Stop recording
+
+        :return: Cassette holding the recorded exchanges, None if not recording
+        :rtype: Cassette, optional
+        """
+        cassette, RequestHandler._recorder = RequestHandler._recorder, None
+        return cassette
+
     def make_request(
         self,
         endpoint: str,
@@ -27,24 +246,406 @@ class RequestHandler:
         data=None,
         headers=None,
         override_url=None,
+        retry_policy: Optional[RetryPolicy] = None,
+        idempotent: Optional[bool] = None,
+        stream: bool = False,
+        cache: bool = False,
+        context: Optional[dict] = None,
     ) -> requests.Response:
+        """Send a request, retrying transient failures according to the retry policy
+
+        :param endpoint: Endpoint appended to the base URL
+        :type endpoint: str
+        :param method: HTTP method
+        :type method: str
+        :param data: Request body
+        :param headers: Request headers
+        :type headers: dict
+        :param override_url: Full URL to use instead of the base URL and endpoint
+        :type override_url: str
+        :param retry_policy: Policy for this request, defaults to the handler-wide policy
+        :type retry_policy: RetryPolicy, optional
+        :param idempotent: Whether the request can safely be repeated, inferred from the method if None
+        :type idempotent: bool, optional
+        :param stream: Return once headers arrive and leave the body unread; the caller must close the response
+        :type stream: bool
+        :param cache: Serve a GET from the HTTP cache when the server confirms it is unchanged
+        :type cache: bool
+        :param context: Operation the request belongs to, passed to lifecycle hooks
+        :type context: dict, optional
+        :raises Exception: Request failed and could not be retried
+        :return: Successful response
+        :rtype: requests.Response
+        """
         url: str = override_url if override_url else self._base_url + endpoint
-        response: Union[requests.Response | None] = None
-        try:
-            response = requests.request(
-                method, url, data=data, headers=headers, timeout=(15, 90)
+        http_cache = self._cache if cache and not stream and method == "GET" else None
+        if http_cache is None:
+            return self._request(
+                method, url, endpoint, data, headers, retry_policy, idempotent, stream, context
             )
-            response.raise_for_status()
-        except (
-            HTTPError,
-            ConnectionError,
-            SSLError,
-            Timeout,
-            ConnectTimeout,
-            ReadTimeout,
-            RequestException,
-        ) as e:
-            logger.error(f"Error with API request {e}", exc_info=True)
-            raise Exception(f"Error with API request {e}")
 
+        cache_key = http_cache.key(url, headers)
+        entry = http_cache.get(cache_key)
+        if entry is not None and entry.fresh:
+            logger.debug(f"Serving {endpoint} from cache")
+            return self._cached_response(entry, url)
+        if entry is not None and entry.has_validators:
+            headers = {**(headers or {}), **entry.conditional_headers()}
+
+        response = self._request(
+            method, url, endpoint, data, headers, retry_policy, idempotent, stream, context
+        )
+        if response.status_code == 304 and entry is not None:
+            logger.debug(f"{endpoint} not modified, serving from cache")
+            return self._cached_response(entry, url)
+        if response.status_code == 200:
+            http_cache.store(cache_key, response.content, response.headers)
         return response
+
+    def _request(
+        self,
+        method: str,
+        url: str,
+        endpoint: str,
+        data,
+        headers,
+        retry_policy: Optional[RetryPolicy],
+        idempotent: Optional[bool],
+        stream: bool,
+        context: Optional[dict] = None,
+        events: Optional[list] = None,
+        recordings: Optional[list] = None,
+    ) -> requests.Response:
+        """Send a request through the shared session, applying the governor and retry policy.
+        When events is given, the RequestEvent of a successful streamed attempt is appended to it so
+        the caller can report the end of the body. When recordings is given, a successful streamed
+        response is recorded without its body, and the cassette and entry are appended to it so the
+        caller can record the body as it is read."""
+        plan = RequestPlan(
+            method,
+            url,
+            endpoint,
+            data,
+            headers,
+            retry_policy if retry_policy else self._retry_policy,
+            idempotent,
+            context,
+            self._governor,
+            self._hooks,
+            self._timeout_policy,
+            self._hedge_policy,
+        )
+        governor = plan.governor
+
+        while True:
+            response: Union[requests.Response | None] = None
+            try:
+                with governor.acquire(plan.key) if governor else nullcontext():
+                    plan.begin()
+                    sent = monotonic()
+                    timeout = self._timeout(plan.timeout(), plan.deadline)
+                    if plan.hedge is not None:
+                        response = self._send_hedged(
+                            plan.hedge,
+                            plan.template,
+                            governor,
+                            plan.key,
+                            method,
+                            url,
+                            data,
+                            headers,
+                            timeout,
+                            stream,
+                        )
+                    else:
+                        response = self._send(method, url, data, headers, timeout, stream)
+                    recorder = self._recorder
+                    if recorder is not None:
+                        # Reading the content of a streamed download here would load it into memory
+                        tee = stream and recordings is not None and response.ok
+                        entry = recorder.record(
+                            method,
+                            url,
+                            data,
+                            headers,
+                            response.status_code,
+                            response.headers,
+                            b"" if tee else response.content,
+                            response.elapsed.total_seconds(),
+                            monotonic() - sent,
+                        )
+                        if tee:
+                            recordings.append((recorder, entry))
+                plan.first_byte(response.status_code, response.elapsed.total_seconds())
+                if stream and events is not None and response.ok and plan.event is not None:
+                    events.append(plan.event)
+                else:
+                    plan.end(None if stream else len(response.content))
+                if governor and response.status_code == 429:
+                    governor.throttled(plan.key, plan.policy.retry_after(response.headers))
+                response.raise_for_status()
+                plan.succeeded(response.elapsed.total_seconds())
+                return response
+            except (
+                HTTPError,
+                ConnectionError,
+                SSLError,
+                Timeout,
+                ConnectTimeout,
+                ReadTimeout,
+                RequestException,
+            ) as e:
+                if response is not None:
+                    delay = plan.retry_delay(e, response.status_code, response.headers)
+                    response.close()
+                else:
+                    delay = plan.retry_delay(e)
+                sleep(delay)
+
+    def get_json(
+        self,
+        endpoint: str,
+        headers=None,
+        override_url=None,
+        **kwargs,
+    ):
+        """GET an endpoint and parse the JSON body. Identical concurrent GETs for the same auth
+        principal share one request and receive the same parsed object, which must not be modified.
+
+        :param endpoint: Endpoint appended to the base URL
+        :type endpoint: str
+        :param headers: Request headers
+        :type headers: dict
+        :param override_url: Full URL to use instead of the base URL and endpoint
+        :type override_url: str
+        :param kwargs: Additional arguments for make_request
+        :raises Exception: Request failed and could not be retried
+        :return: Parsed response body
+        """
+        url: str = override_url if override_url else self._base_url + endpoint
+        return self._single_flight.do(
+            HttpCache.key(url, headers),
+            lambda: JsonCodec.decode(
+                self.make_request(
+                    endpoint, "GET", headers=headers, override_url=override_url, **kwargs
+                )
+            ),
+        )
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        data,
+        headers,
+        timeout: Tuple[float, float],
+        stream: bool,
+    ) -> requests.Response:
+        """Perform a single HTTP exchange. Subclasses override this to replace the network,
+        keeping retries, rate limits and caching from RequestHandler.
+
+        :param method: HTTP method
+        :type method: str
+        :param url: Full request URL
+        :type url: str
+        :param data: Request body
+        :param headers: Request headers
+        :type headers: dict
+        :param timeout: Connect and read timeouts in seconds
+        :type timeout: Tuple[float, float]
+        :param stream: Leave the body unread
+        :type stream: bool
+        :rtype: requests.Response
+        """
+        return self.get_session().request(
+            method, url, data=data, headers=headers, timeout=timeout, stream=stream
+        )
+
+    def _send_hedged(
+        self,
+        hedge: HedgePolicy,
+        template: str,
+        governor: Optional[RateGovernor],
+        key: Optional[Tuple[str, str, str]],
+        method: str,
+        url: str,
+        data,
+        headers,
+        timeout: Tuple[float, float],
+        stream: bool,
+    ) -> requests.Response:
+        """Send a request and, if it has not answered within the hedge delay and the budget allows,
+        a duplicate. The first successful exchange is returned and the other is closed when it ends.
+        The duplicate needs a free governor slot of its own and is not sent without one."""
+        started = threading.Event()
+
+        def send_primary() -> requests.Response:
+            started.set()
+            return self._send(method, url, data, headers, timeout, stream)
+
+        def send_backup(slot) -> requests.Response:
+            try:
+                if governor is not None:
+                    pause = governor.reserve(key)
+                    if pause > 0:
+                        sleep(pause)
+                return self._send(method, url, data, headers, timeout, stream)
+            finally:
+                if governor is not None:
+                    governor.release(key, slot)
+
+        executor = hedge.executor()
+        primary = executor.submit(send_primary)
+        # Time spent waiting for a free hedge thread does not count toward the delay
+        started.wait()
+        delay = hedge.delay(template)
+        done, _ = wait([primary], timeout=delay)
+
+        slot = None
+        if not done and governor is not None:
+            slot = governor.try_acquire(key)
+        if done or (governor is not None and slot is None) or not hedge.acquire():
+            if slot is not None:
+                governor.release(key, slot)
+            response = primary.result()
+        else:
+            logger.debug(f"Hedging {method} {url} after {delay:.2f} seconds")
+            backup = executor.submit(send_backup, slot)
+            pending = {primary, backup}
+            winner: Optional[Future] = None
+            while pending and winner is None:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                winner = next((future for future in done if future.exception() is None), None)
+            if winner is None:
+                winner = primary
+            elif winner is backup:
+                hedge.won()
+            for future in (primary, backup):
+                if future is not winner and not future.cancel():
+                    future.add_done_callback(self._discard)
+            response = winner.result()
+
+        hedge.observe(template, response.elapsed.total_seconds())
+        return response
+
+    @staticmethod
+    def _discard(future: Future) -> None:
+        """Close the response of a hedged exchange that lost the race"""
+        if not future.cancelled() and future.exception() is None:
+            future.result().close()
+
+    @staticmethod
+    def _cached_response(entry: CacheEntry, url: str) -> requests.Response:
+        """Build a response object from a cache entry
+
+        :param entry: Cached response
+        :type entry: CacheEntry
+        :param url: Request URL
+        :type url: str
+        :rtype: requests.Response
+        """
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = CaseInsensitiveDict(entry.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = entry.content
+        return response
+
+    @contextmanager
+    def stream_request(
+        self,
+        endpoint: str,
+        method: str = "GET",
+        data=None,
+        headers=None,
+        override_url=None,
+        block_size: int = 1024**2,
+        retry_policy: Optional[RetryPolicy] = None,
+        idempotent: Optional[bool] = None,
+        context: Optional[dict] = None,
+    ) -> Iterator[Iterator[bytes]]:
+        """Send a request and iterate over the raw response body without loading it into memory.
+        The connection is returned to the pool when the block exits, even if the body was not fully read.
+
+        :param endpoint: Endpoint appended to the base URL
+        :type endpoint: str
+        :param method: HTTP method
+        :type method: str
+        :param data: Request body
+        :param headers: Request headers
+        :type headers: dict
+        :param override_url: Full URL to use instead of the base URL and endpoint
+        :type override_url: str
+        :param block_size: Maximum size of each yielded block in bytes
+        :type block_size: int
+        :param retry_policy: Policy for this request, defaults to the handler-wide policy
+        :type retry_policy: RetryPolicy, optional
+        :param idempotent: Whether the request can safely be repeated, inferred from the method if None
+        :type idempotent: bool, optional
+        :param context: Operation the request belongs to, passed to lifecycle hooks
+        :type context: dict, optional
+        :raises Exception: Request failed and could not be retried
+        :return: Iterator over byte blocks of the response body
+        :rtype: Iterator[bytes]
+        """
+        url: str = override_url if override_url else self._base_url + endpoint
+        events = []
+        recordings = []
+        response = self._request(
+            method,
+            url,
+            endpoint,
+            data,
+            headers,
+            retry_policy,
+            idempotent,
+            True,
+            context,
+            events,
+            recordings,
+        )
+        event = events[0] if events else None
+        blocks = response.iter_content(block_size)
+        if recordings:
+            recorder, entry = recordings[0]
+            blocks = recorder.tee(entry, blocks)
+        try:
+            if event is None:
+                yield blocks
+            else:
+                event.bytes_received = 0
+                yield self._count_blocks(blocks, event)
+        finally:
+            if recordings:
+                blocks.close()
+            response.close()
+            if event is not None:
+                event.elapsed = monotonic() - event.started
+                self._hooks.emit("end", event)
+
+    @staticmethod
+    def _count_blocks(blocks: Iterator[bytes], event: RequestEvent) -> Iterator[bytes]:
+        """Add the size of each block read to the attempt's received bytes"""
+        for block in blocks:
+            event.bytes_received += len(block)
+            yield block
+
+    @staticmethod
+    def _timeout(
+        timeout: Tuple[float, float], deadline: Optional[float]
+    ) -> Tuple[float, float]:
+        """Shorten connect and read timeouts to fit the remaining retry budget
+
+        :param timeout: Connect and read timeouts chosen by the timeout policy
+        :type timeout: Tuple[float, float]
+        :param deadline: Monotonic deadline of the call, or None
+        :type deadline: float, optional
+        :rtype: Tuple[float, float]
+        """
+        if deadline is None:
+            return timeout
+        remaining = max(deadline - monotonic(), 0.1)
+        return min(timeout[0], remaining), min(timeout[1], remaining)
+
+atexit.register(RequestHandler.close_session)
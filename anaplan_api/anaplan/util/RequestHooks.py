@@ -0,0 +1,157 @@
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+EVENTS = ("start", "first_byte", "end", "retry", "error")
+
+_ID_SEGMENT = re.compile(
+    r"(?<=/)(workspaces|models|files|imports|exports|actions|processes|lists|users|tasks|chunks|dumps)/(?!me(?:/|$))[^/]+"
+)
+
+
+@dataclass
+class RequestEvent:
+    """Details of one attempt of an API request, passed to every lifecycle hook
+
+    :param method: HTTP method
+    :type method: str
+    :param endpoint: Endpoint with IDs replaced by placeholders, e.g. workspaces/{id}/models/{id}/files/{id}
+    :type endpoint: str
+    :param url: Full request URL
+    :type url: str
+    :param context: Operation the request belongs to, e.g. {"operation": "upload_chunk", "chunk": 3}
+    :type context: dict
+    :param attempt: Attempt number, starting at 1
+    :type attempt: int
+    :param started: Monotonic time the attempt started
+    :type started: float
+    :param bytes_sent: Size of the request body
+    :type bytes_sent: int
+    :param status: Response status code, None until headers arrive or if none arrived
+    :type status: int, optional
+    :param bytes_received: Size of the response body, None until it has been read
+    :type bytes_received: int, optional
+    :param time_to_first_byte: Seconds from sending to receiving the response headers. Covers
+        connection setup, TLS and server processing.
+    :type time_to_first_byte: float, optional
+    :param elapsed: Seconds from sending to the end of the attempt
+    :type elapsed: float, optional
+    :param retry_delay: Seconds until the next attempt, set on retry events
+    :type retry_delay: float, optional
+    :param error: Failure of the attempt, set on retry and error events
+    :type error: BaseException, optional
+    """
+
+    method: str
+    endpoint: str
+    url: str
+    context: dict = field(default_factory=dict)
+    attempt: int = 1
+    started: float = 0.0
+    bytes_sent: int = 0
+    status: Optional[int] = None
+    bytes_received: Optional[int] = None
+    time_to_first_byte: Optional[float] = None
+    elapsed: Optional[float] = None
+    retry_delay: Optional[float] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def transfer_time(self) -> Optional[float]:
+        """Seconds spent receiving the response body
+
+        :rtype: float, optional
+        """
+        if self.elapsed is None or self.time_to_first_byte is None:
+            return None
+        return self.elapsed - self.time_to_first_byte
+
+
+class RequestHooks:
+    """Registry of callables notified as each request attempt progresses.
+
+    ``start`` fires before an attempt is sent, ``first_byte`` when its response headers arrive and
+    ``end`` once the response body has been read. ``retry`` fires when an attempt failed and will be
+    repeated, ``error`` when the request failed for good. Hooks run on the requesting thread or
+    event loop, so they must be quick; exceptions they raise are logged and ignored.
+    """
+
+    def __init__(self):
+        self._hooks: Dict[str, List[Callable[[RequestEvent], None]]] = {
+            event: [] for event in EVENTS
+        }
+        self._lock = threading.Lock()
+
+    def register(self, event: str, hook: Callable[[RequestEvent], None]) -> None:
+        """Call a hook for every occurrence of an event
+
+        :param event: One of start, first_byte, end, retry or error
+        :type event: str
+        :param hook: Callable receiving the RequestEvent
+        :type hook: Callable[[RequestEvent], None]
+        """
+        if event not in self._hooks:
+            raise ValueError(f"Unknown request event {event}, expected one of {EVENTS}")
+        with self._lock:
+            self._hooks[event] = self._hooks[event] + [hook]
+
+    def unregister(self, event: str, hook: Callable[[RequestEvent], None]) -> None:
+        """Stop calling a hook registered with :meth:`register`
+
+        :param event: Event the hook was registered for
+        :type event: str
+        :param hook: Hook to remove
+        :type hook: Callable[[RequestEvent], None]
+        """
+        with self._lock:
+            self._hooks[event] = [item for item in self._hooks[event] if item != hook]
+
+    @property
+    def active(self) -> bool:
+        """Whether any hook is registered"""
+        return any(self._hooks.values())
+
+    def emit(self, event: str, request_event: RequestEvent) -> None:
+        """Call every hook registered for an event
+
+        :param event: Event name
+        :type event: str
+        :param request_event: Details of the request attempt
+        :type request_event: RequestEvent
+        """
+        for hook in self._hooks[event]:
+            try:
+                hook(request_event)
+            except Exception as e:
+                logger.warning(f"Request {event} hook failed: {e}", exc_info=True)
+
+    @staticmethod
+    def template(endpoint: str) -> str:
+        """Replace workspace, model, file, action, task and chunk IDs in an endpoint with {id}, so
+        measurements can be grouped by endpoint
+
+        :param endpoint: Endpoint or URL
+        :type endpoint: str
+        :rtype: str
+        """
+        return _ID_SEGMENT.sub(r"\1/{id}", f"/{endpoint}")[1:]
+
+    @staticmethod
+    def body_size(data) -> int:
+        """Get the size of a request body in bytes
+
+        :param data: Request body
+        :rtype: int
+        """
+        if data is None:
+            return 0
+        if isinstance(data, str):
+            return len(data.encode("utf-8"))
+        try:
+            return len(data)
+        except TypeError:
+            return 0
@@ -0,0 +1,189 @@
+import logging
+from time import monotonic
+from typing import Mapping, Optional, Tuple
+from .HedgePolicy import HedgePolicy
+from .RateGovernor import RateGovernor
+from .RequestHooks import RequestEvent, RequestHooks
+from .RetryPolicy import RetryPolicy
+from .TimeoutPolicy import TimeoutPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class RequestPlan:
+    """Decisions about one request that do not depend on the transport, kept across its attempts:
+    whether and when to retry, the governor key, hedging, timeouts and the lifecycle hook events.
+    RequestHandler and AsyncRequestHandler perform the I/O of each attempt and report its outcome here.
+
+    :param method: HTTP method
+    :type method: str
+    :param url: Full request URL
+    :type url: str
+    :param endpoint: Endpoint the URL was built from, used for hook templates and log messages
+    :type endpoint: str
+    :param data: Request body
+    :param headers: Request headers
+    :type headers: Mapping, optional
+    :param policy: Retry policy of the request
+    :type policy: RetryPolicy
+    :param idempotent: Whether the request can safely be repeated, inferred from the method if None
+    :type idempotent: bool, optional
+    :param context: Operation the request belongs to, passed to lifecycle hooks
+    :type context: dict, optional
+    :param governor: Client-side rate and concurrency limits, None when disabled
+    :type governor: RateGovernor, optional
+    :param hooks: Lifecycle hooks notified of every attempt
+    :type hooks: RequestHooks
+    :param timeout_policy: Chooses connect and read timeouts
+    :type timeout_policy: TimeoutPolicy
+    :param hedge_policy: Duplicates slow polls and metadata GETs, None when disabled
+    :type hedge_policy: HedgePolicy, optional
+    """
+
+    def __init__(
+        self,
+        method: str,
+        url: str,
+        endpoint: str,
+        data,
+        headers: Optional[Mapping],
+        policy: RetryPolicy,
+        idempotent: Optional[bool],
+        context: Optional[dict],
+        governor: Optional[RateGovernor],
+        hooks: RequestHooks,
+        timeout_policy: TimeoutPolicy,
+        hedge_policy: Optional[HedgePolicy],
+    ):
+        self.method = method
+        self.url = url
+        self.endpoint = endpoint
+        self.policy = policy
+        self.idempotent = policy.is_idempotent(method) if idempotent is None else idempotent
+        self.context = context
+        self.deadline = policy.deadline()
+        self.governor = governor
+        self.key: Optional[Tuple[str, str, str]] = (
+            governor.key_for(url, headers) if governor else None
+        )
+        self.hooks = hooks
+        self.timeout_policy = timeout_policy
+        self.template = RequestHooks.template(endpoint or url)
+        self.body_size = RequestHooks.body_size(data)
+        self.hedge = (
+            hedge_policy
+            if hedge_policy is not None and hedge_policy.applies(method, self.idempotent, context)
+            else None
+        )
+        self.attempt = 0
+        self.event: Optional[RequestEvent] = None
+
+    def begin(self) -> None:
+        """Start the next attempt, once it holds its governor slot"""
+        self.attempt += 1
+        self.event = None
+        if self.hooks.active:
+            self.event = RequestEvent(
+                self.method,
+                self.template,
+                self.url,
+                self.context or {},
+                self.attempt,
+                monotonic(),
+                self.body_size,
+            )
+            self.hooks.emit("start", self.event)
+
+    def timeout(self) -> Tuple[float, float]:
+        """Get the connect and read timeouts of the next attempt
+
+        :rtype: Tuple[float, float]
+        """
+        return self.timeout_policy.timeout(self.context, self.template, self.body_size)
+
+    def remaining(self) -> Optional[float]:
+        """Get the time left before the retry policy's deadline
+
+        :return: Seconds, at least 0.1, or None without a deadline
+        :rtype: float, optional
+        """
+        if self.deadline is None:
+            return None
+        return max(self.deadline - monotonic(), 0.1)
+
+    def first_byte(self, status: int, time_to_first_byte: float) -> None:
+        """Record the arrival of the attempt's response headers
+
+        :param status: Response status code
+        :type status: int
+        :param time_to_first_byte: Seconds from sending to receiving the headers
+        :type time_to_first_byte: float
+        """
+        if self.event is not None:
+            self.event.status = status
+            self.event.time_to_first_byte = time_to_first_byte
+            self.hooks.emit("first_byte", self.event)
+
+    def end(self, bytes_received: Optional[int] = None) -> None:
+        """Record the end of the attempt's response
+
+        :param bytes_received: Size of the body, None if it was not read
+        :type bytes_received: int, optional
+        """
+        if self.event is not None:
+            if bytes_received is not None:
+                self.event.bytes_received = bytes_received
+            self.event.elapsed = monotonic() - self.event.started
+            self.hooks.emit("end", self.event)
+
+    def succeeded(self, latency: float) -> None:
+        """Record the latency of a successful attempt for the adaptive timeouts
+
+        :param latency: Seconds until the response headers arrived
+        :type latency: float
+        """
+        self.timeout_policy.observe(self.context, self.template, latency)
+
+    def retry_delay(
+        self,
+        error: BaseException,
+        status: Optional[int] = None,
+        headers: Optional[Mapping] = None,
+    ) -> float:
+        """Decide whether a failed attempt is retried, notifying the retry or error hooks
+
+        :param error: Failure of the attempt
+        :type error: BaseException
+        :param status: Response status code, None if no response arrived
+        :type status: int, optional
+        :param headers: Response headers
+        :type headers: Mapping, optional
+        :raises Exception: The request cannot be retried
+        :return: Seconds to wait before the next attempt
+        :rtype: float
+        """
+        if status is not None:
+            delay = self.policy.next_delay(
+                self.attempt, self.idempotent, self.deadline, status=status, headers=headers
+            )
+        else:
+            delay = self.policy.next_delay(self.attempt, self.idempotent, self.deadline, exc=error)
+
+        event = self.event
+        if event is not None:
+            event.error = error
+            event.retry_delay = delay
+            if event.elapsed is None:
+                event.elapsed = monotonic() - event.started
+            self.hooks.emit("error" if delay is None else "retry", event)
+
+        message = str(error) or type(error).__name__
+        if delay is None:
+            logger.error(f"Error with API request {message}", exc_info=error)
+            raise Exception(f"Error with API request {message}")
+
+        logger.warning(
+            f"{self.method} {self.endpoint} failed on attempt {self.attempt}, "
+            f"retrying in {delay:.2f} seconds: {message}"
+        )
+        return delay
@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional, Tuple
+from requests.exceptions import ConnectionError, ConnectTimeout, Timeout
+from urllib3.exceptions import NewConnectionError
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - optional dependency
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+_RETRY_EXCEPTIONS: Tuple[type, ...] = (
+    ConnectionError,
+    Timeout,
+    asyncio.TimeoutError,
+)
+# Refused connections and DNS failures reach requests' ConnectionError as a NewConnectionError
+_CONNECT_EXCEPTIONS: Tuple[type, ...] = (ConnectTimeout, NewConnectionError)
+
+if aiohttp is not None:
+    _RETRY_EXCEPTIONS += (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)
+    _CONNECT_EXCEPTIONS += (aiohttp.ClientConnectorError,)
+
+
+class RetryPolicy:
+    """Decides whether a failed request is retried and how long to wait before the next attempt.
+
+    Idempotent requests (GET, PUT of a chunk) are retried on any transient status or network error.
+    Non-idempotent requests (POST of a task) are only retried when the server cannot have acted on
+    them: the connection was never established, or the request was rejected with a throttling status.
+    Subclass and override the ``is_retryable_*`` methods to change the classification.
+
+    :param max_attempts: Total number of attempts, including the first
+    :type max_attempts: int
+    :param backoff_base: Delay in seconds before the first retry
+    :type backoff_base: float
+    :param backoff_multiplier: Factor applied to the delay after each retry
+    :type backoff_multiplier: float
+    :param max_backoff: Upper bound for a single delay in seconds
+    :type max_backoff: float
+    :param jitter: Randomise each delay between zero and the computed backoff
+    :type jitter: bool
+    :param total_timeout: Time budget in seconds for all attempts of a call, None for no limit
+    :type total_timeout: float, optional
+    :param retry_statuses: Status codes retried for idempotent requests
+    :type retry_statuses: frozenset
+    :param non_idempotent_statuses: Status codes retried for non-idempotent requests
+    :type non_idempotent_statuses: frozenset
+    :param retry_exceptions: Exceptions retried for idempotent requests
+    :type retry_exceptions: tuple
+    :param connect_exceptions: Exceptions raised before the request was sent, retried for every request
+    :type connect_exceptions: tuple
+    :param respect_retry_after: Wait for the duration in a Retry-After header when present
+    :type respect_retry_after: bool
+    """
+
+    IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        backoff_base: float = 0.5,
+        backoff_multiplier: float = 2,
+        max_backoff: float = 60,
+        jitter: bool = True,
+        total_timeout: Optional[float] = None,
+        retry_statuses: frozenset = frozenset({408, 429, 500, 502, 503, 504}),
+        non_idempotent_statuses: frozenset = frozenset({429}),
+        retry_exceptions: Tuple[type, ...] = _RETRY_EXCEPTIONS,
+        connect_exceptions: Tuple[type, ...] = _CONNECT_EXCEPTIONS,
+        respect_retry_after: bool = True,
+    ):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_multiplier = backoff_multiplier
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.total_timeout = total_timeout
+        self.retry_statuses = retry_statuses
+        self.non_idempotent_statuses = non_idempotent_statuses
+        self.retry_exceptions = retry_exceptions
+        self.connect_exceptions = connect_exceptions
+        self.respect_retry_after = respect_retry_after
+
+    def is_idempotent(self, method: str) -> bool:
+        """Check whether a request method can safely be repeated
+
+        :param method: HTTP method
+        :type method: str
+        :rtype: bool
+        """
+        return method.upper() in self.IDEMPOTENT_METHODS
+
+    def is_retryable_status(self, status: int, idempotent: bool) -> bool:
+        """Check whether a response status should be retried
+
+        :param status: HTTP status code
+        :type status: int
+        :param idempotent: Whether the request can safely be repeated
+        :type idempotent: bool
+        :rtype: bool
+        """
+        if idempotent:
+            return status in self.retry_statuses
+        return status in self.non_idempotent_statuses
+
+    def is_retryable_exception(self, exc: BaseException, idempotent: bool) -> bool:
+        """Check whether a network error should be retried
+
+        :param exc: Exception raised while sending the request
+        :type exc: BaseException
+        :param idempotent: Whether the request can safely be repeated
+        :type idempotent: bool
+        :rtype: bool
+        """
+        if self.is_connect_failure(exc):
+            return True
+        return idempotent and isinstance(exc, self.retry_exceptions)
+
+    def is_connect_failure(self, exc: BaseException) -> bool:
+        """Check whether a network error was raised before the request was sent. requests wraps
+        the underlying urllib3 error, so the exceptions it was raised from are checked as well.
+
+        :param exc: Exception raised while sending the request
+        :type exc: BaseException
+        :rtype: bool
+        """
+        seen = set()
+        while exc is not None and id(exc) not in seen:
+            if isinstance(exc, self.connect_exceptions):
+                return True
+            seen.add(id(exc))
+            # requests raises ConnectionError(MaxRetryError(reason=NewConnectionError(...)))
+            wrapped = exc.args[0] if exc.args and isinstance(exc.args[0], BaseException) else None
+            reason = getattr(exc, "reason", None)
+            exc = next(
+                (e for e in (reason, wrapped, exc.__cause__) if isinstance(e, BaseException)),
+                None,
+            )
+        return False
+
+    def deadline(self) -> Optional[float]:
+        """Get the monotonic time after which no further attempts are made
+
+        :return: Deadline, or None if the policy has no time budget
+        :rtype: float, optional
+        """
+        if self.total_timeout is None:
+            return None
+        return time.monotonic() + self.total_timeout
+
+    def backoff(self, attempt: int, headers: Optional[dict] = None) -> float:
+        """Get the delay before the next attempt
+
+        :param attempt: Number of attempts made so far, starting at 1
+        :type attempt: int
+        :param headers: Headers of the failed response, if any
+        :type headers: dict, optional
+        :return: Delay in seconds
+        :rtype: float
+        """
+        if self.respect_retry_after and headers:
+            retry_after = self.retry_after(headers)
+            if retry_after is not None:
+                return min(retry_after, self.max_backoff)
+
+        delay = min(
+            self.backoff_base * (self.backoff_multiplier ** (attempt - 1)),
+            self.max_backoff,
+        )
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    @staticmethod
+    def retry_after(headers: dict) -> Optional[float]:
+        """Parse a Retry-After header given either in seconds or as an HTTP date
+
+        :param headers: Response headers
+        :type headers: dict
+        :return: Seconds to wait, or None if the header is absent or malformed
+        :rtype: float, optional
+        """
+        value = headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+    def next_delay(
+        self,
+        attempt: int,
+        idempotent: bool,
+        deadline: Optional[float],
+        status: Optional[int] = None,
+        headers: Optional[dict] = None,
+        exc: Optional[BaseException] = None,
+    ) -> Optional[float]:
+        """Get the delay before retrying a failed attempt, or None if it should not be retried
+
+        :param attempt: Number of attempts made so far, starting at 1
+        :type attempt: int
+        :param idempotent: Whether the request can safely be repeated
+        :type idempotent: bool
+        :param deadline: Monotonic deadline returned by :meth:`deadline`
+        :type deadline: float, optional
+        :param status: Status code of the failed response
+        :type status: int, optional
+        :param headers: Headers of the failed response
+        :type headers: dict, optional
+        :param exc: Exception raised by the failed attempt
+        :type exc: BaseException, optional
+        :return: Delay in seconds, or None to give up
+        :rtype: float, optional
+        """
+        if attempt >= self.max_attempts:
+            return None
+
+        if exc is not None:
+            retryable = self.is_retryable_exception(exc, idempotent)
+        else:
+            retryable = self.is_retryable_status(status, idempotent)
+        if not retryable:
+            return None
+
+        delay = self.backoff(attempt, headers)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return None
+
+        logger.debug(
+            f"Attempt {attempt} failed ({exc or status}), retrying in {delay:.2f} seconds."
+        )
+        return delay
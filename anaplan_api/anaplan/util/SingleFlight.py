@@ -0,0 +1,85 @@
+import asyncio
+import functools
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    """An in-flight call that followers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls so only the first caller does the work and every
+    caller that arrives while it is running receives the same result or exception.
+
+    Thread callers use :meth:`do`, coroutines use :meth:`do_async`. Results are shared between
+    callers and must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn, or wait for the identical call already in flight
+
+        :param key: Identity of the call
+        :type key: Hashable
+        :param fn: Function performing the call
+        :type fn: Callable
+        :return: Result of fn
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn, or wait for the identical call already in flight on this event loop. The call runs
+        in a task of its own, so cancelling one caller, the first included, leaves the others waiting.
+
+        :param key: Identity of the call
+        :type key: Hashable
+        :param fn: Coroutine function performing the call
+        :type fn: Callable
+        :return: Result of fn
+        """
+        loop = asyncio.get_running_loop()
+        calls = self._async_calls.setdefault(loop, {})
+        task = calls.get(key)
+        if task is None:
+            task = calls[key] = loop.create_task(fn())
+            task.add_done_callback(functools.partial(self._finished, calls, key))
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _finished(calls: dict, key: Hashable, task: asyncio.Task) -> None:
+        if calls.get(key) is task:
+            del calls[key]
+        if not task.cancelled():
+            task.exception()  # Mark retrieved in case every caller was cancelled
@@ -0,0 +1,202 @@
+import math
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional, Tuple
+
+OPERATION_CLASSES = {
+    "task_poll": "poll",
+    "task_post": "commit",
+    "file_metadata": "metadata",
+    "upload_complete": "commit",
+    "chunk_list": "metadata",
+    "list_resources": "metadata",
+    "user_details": "metadata",
+    "list_workspaces": "metadata",
+    "list_models": "metadata",
+    "upload_chunk": "transfer",
+    "download_chunk": "transfer",
+    "error_dump": "transfer",
+    "auth_authenticate": "auth",
+    "auth_validate": "auth",
+    "auth_refresh": "auth",
+}
+
+
+@dataclass
+class TimeoutRule:
+    """Timeouts for one class of operation
+
+    :param connect: Seconds to establish a connection
+    :type connect: float
+    :param read: Seconds to wait for the server before enough latency samples exist
+    :type read: float
+    :param min_read: Lower bound of the adaptive read timeout
+    :type min_read: float
+    :param max_read: Upper bound of the adaptive and byte-rate read timeout
+    :type max_read: float
+    :param adaptive: Derive the read timeout from observed latency of the endpoint
+    :type adaptive: bool
+    :param min_rate: Slowest acceptable transfer rate in bytes per second. The read timeout is
+        extended by the time the request body takes to send at this rate, None to disable.
+    :type min_rate: float, optional
+    """
+
+    connect: float
+    read: float
+    min_read: float = 1.0
+    max_read: float = 90.0
+    adaptive: bool = True
+    min_rate: Optional[float] = None
+
+
+class LatencyWindow:
+    """Rolling window of the most recent latencies of one endpoint
+
+    :param size: Number of samples kept
+    :type size: int
+    """
+
+    def __init__(self, size: int):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, latency: float) -> None:
+        with self._lock:
+            self._samples.append(latency)
+
+    def percentile(self, quantile: float) -> Optional[float]:
+        """Get a latency percentile using the nearest-rank method
+
+        :param quantile: Quantile between 0 and 1
+        :type quantile: float
+        :return: Latency in seconds, None if there are no samples
+        :rtype: float, optional
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(math.ceil(quantile * len(samples)) - 1, 0)
+        return samples[rank]
+
+
+class TimeoutPolicy:
+    """Chooses connect and read timeouts per operation class: task polls, metadata, bulk transfers,
+    authentication and commits. Once an endpoint has enough samples its read timeout becomes a multiple of
+    its observed latency percentile, so a hung status poll is abandoned after a few seconds while
+    a slow endpoint keeps the headroom it needs. Transfers use a fixed idle timeout, since the read
+    timeout bounds the gap between received bytes rather than the whole download, extended for
+    uploads by the time the chunk takes to send at the rule's minimum byte rate. Commits, the task POST
+and upload completion, are not retried after a read timeout, so they keep a long fixed timeout.
+
+    :param rules: Timeout rule per operation class, merged over the defaults
+    :type rules: Dict[str, TimeoutRule], optional
+    :param quantile: Latency quantile the adaptive read timeout is based on
+    :type quantile: float
+    :param multiplier: Factor applied to the latency quantile
+    :type multiplier: float
+    :param window: Number of latency samples kept per endpoint
+    :type window: int
+    :param min_samples: Samples required before the read timeout adapts
+    :type min_samples: int
+    """
+
+    DEFAULT_RULES = {
+        "poll": TimeoutRule(connect=5, read=15, min_read=2, max_read=30),
+        "metadata": TimeoutRule(connect=5, read=30, min_read=5, max_read=60),
+        "auth": TimeoutRule(connect=5, read=30, min_read=5, max_read=60),
+        "commit": TimeoutRule(connect=10, read=120, max_read=120, adaptive=False),
+        "transfer": TimeoutRule(
+            connect=10, read=30, max_read=600, adaptive=False, min_rate=64 * 1024
+        ),
+        "default": TimeoutRule(connect=15, read=90, adaptive=False),
+    }
+
+    def __init__(
+        self,
+        rules: Optional[Dict[str, TimeoutRule]] = None,
+        quantile: float = 0.99,
+        multiplier: float = 3.0,
+        window: int = 200,
+        min_samples: int = 20,
+    ):
+        if not 0 < quantile <= 1:
+            raise ValueError("quantile must be between 0 and 1")
+        self.rules = {**self.DEFAULT_RULES, **(rules or {})}
+        self.quantile = quantile
+        self.multiplier = multiplier
+        self.window = window
+        self.min_samples = min_samples
+        self._latencies: Dict[str, LatencyWindow] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def operation_class(context: Optional[dict]) -> str:
+        """Map a request's operation context to its operation class
+
+        :param context: Operation context passed to make_request
+        :type context: dict, optional
+        :rtype: str
+        """
+        operation = (context or {}).get("operation")
+        return OPERATION_CLASSES.get(operation, "default")
+
+    def _window(self, endpoint: str) -> LatencyWindow:
+        latencies = self._latencies.get(endpoint)
+        if latencies is None:
+            with self._lock:
+                latencies = self._latencies.setdefault(endpoint, LatencyWindow(self.window))
+        return latencies
+
+    def rule(self, context: Optional[dict]) -> TimeoutRule:
+        """Get the rule for a request
+
+        :param context: Operation context passed to make_request
+        :type context: dict, optional
+        :rtype: TimeoutRule
+        """
+        return self.rules.get(self.operation_class(context), self.rules["default"])
+
+    def timeout(
+        self, context: Optional[dict], endpoint: str, body_size: int = 0
+    ) -> Tuple[float, float]:
+        """Get connect and read timeouts for a request
+
+        :param context: Operation context passed to make_request
+        :type context: dict, optional
+        :param endpoint: Endpoint template, from RequestHooks.template
+        :type endpoint: str
+        :param body_size: Size of the request body in bytes
+        :type body_size: int
+        :rtype: Tuple[float, float]
+        """
+        rule = self.rule(context)
+        read = rule.read
+
+        if rule.adaptive:
+            latencies = self._latencies.get(endpoint)
+            if latencies is not None and len(latencies) >= self.min_samples:
+                observed = latencies.percentile(self.quantile) * self.multiplier
+                read = min(max(observed, rule.min_read), rule.max_read)
+
+        if rule.min_rate and body_size:
+            read = min(read + body_size / rule.min_rate, rule.max_read)
+
+        return rule.connect, read
+
+    def observe(self, context: Optional[dict], endpoint: str, latency: float) -> None:
+        """Record the time a successful request waited for its response headers
+
+        :param context: Operation context passed to make_request
+        :type context: dict, optional
+        :param endpoint: Endpoint template, from RequestHooks.template
+        :type endpoint: str
+        :param latency: Seconds until the response headers arrived
+        :type latency: float
+        """
+        if self.rule(context).adaptive:
+            self._window(endpoint).add(latency)
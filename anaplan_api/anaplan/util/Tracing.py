@@ -0,0 +1,184 @@
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # pragma: no cover - optional dependency
+    otel_trace = None
+
+logger = logging.getLogger(__name__)
+
+
+class NoOpSpan:
+    """Span that records nothing"""
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+    def record_exception(self, exception: BaseException) -> None:
+        pass
+
+
+class NoOpTracer:
+    """Tracer used when tracing is disabled and OpenTelemetry is not installed"""
+
+    _span = NoOpSpan()
+
+    @contextmanager
+    def start_as_current_span(self, name: str, attributes: Optional[dict] = None):
+        yield self._span
+
+
+@dataclass
+class InMemorySpan:
+    """Finished or running span kept by InMemoryTracer
+
+    :param name: Span name
+    :type name: str
+    :param span_id: Identifier unique within the tracer
+    :type span_id: int
+    :param parent_id: Identifier of the enclosing span, None for a root span
+    :type parent_id: int, optional
+    :param attributes: Attributes set on the span
+    :type attributes: dict
+    :param start: Monotonic start time
+    :type start: float
+    :param end: Monotonic end time, None while the span is running
+    :type end: float, optional
+    :param error: Exception that ended the span, if any
+    :type error: BaseException, optional
+    """
+
+    name: str
+    span_id: int
+    parent_id: Optional[int] = None
+    attributes: dict = field(default_factory=dict)
+    start: float = 0.0
+    end: Optional[float] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Seconds between start and end, None while the span is running"""
+        return None if self.end is None else self.end - self.start
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exception: BaseException) -> None:
+        self.error = exception
+
+
+class InMemoryTracer:
+    """Tracer that keeps every span in a list, for tests and ad hoc profiling without a collector.
+    Parent spans are tracked per thread and per asyncio task.
+
+    :param spans: Spans in the order they were started
+    :type spans: List[InMemorySpan]
+    """
+
+    def __init__(self):
+        self.spans: List[InMemorySpan] = []
+        self._ids = itertools.count(1)
+        self._current: ContextVar[Optional[InMemorySpan]] = ContextVar(
+            f"anaplan_span_{id(self)}", default=None
+        )
+
+    @contextmanager
+    def start_as_current_span(self, name: str, attributes: Optional[dict] = None):
+        parent = self._current.get()
+        span = InMemorySpan(
+            name,
+            next(self._ids),
+            parent.span_id if parent else None,
+            dict(attributes or {}),
+            time.monotonic(),
+        )
+        self.spans.append(span)
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            span.end = time.monotonic()
+            self._current.reset(token)
+
+    def find(self, name: str) -> List[InMemorySpan]:
+        """Get every span with the given name
+
+        :param name: Span name
+        :type name: str
+        :rtype: List[InMemorySpan]
+        """
+        return [span for span in self.spans if span.name == name]
+
+    def children(self, span: InMemorySpan) -> List[InMemorySpan]:
+        """Get the direct children of a span
+
+        :param span: Parent span
+        :type span: InMemorySpan
+        :rtype: List[InMemorySpan]
+        """
+        return [item for item in self.spans if item.parent_id == span.span_id]
+
+    def clear(self) -> None:
+        """Discard all recorded spans"""
+        self.spans.clear()
+
+
+class Tracing:
+    """Entry point for the spans the library emits around each phase of an upload, action or download.
+
+    By default spans go to the OpenTelemetry tracer provider when the opentelemetry API is installed,
+    which discards them unless the application configures an SDK, and nowhere otherwise. Call
+    :meth:`set_tracer` with an InMemoryTracer, or any object offering OpenTelemetry's
+    ``start_as_current_span``, to collect them elsewhere.
+
+    :param _tracer: Tracer receiving spans, resolved on first use when None
+    :type _tracer: object, optional
+    """
+
+    _tracer = None
+
+    @classmethod
+    def set_tracer(cls, tracer) -> None:
+        """Send spans to a tracer, or restore the default with None
+
+        :param tracer: OpenTelemetry tracer, InMemoryTracer or NoOpTracer
+        """
+        Tracing._tracer = tracer
+
+    @classmethod
+    def get_tracer(cls):
+        """Get the tracer receiving spans
+
+        :return: Active tracer
+        """
+        if Tracing._tracer is None:
+            Tracing._tracer = (
+                otel_trace.get_tracer("anaplan_api")
+                if otel_trace is not None
+                else NoOpTracer()
+            )
+        return Tracing._tracer
+
+    @classmethod
+    @contextmanager
+    def span(cls, name: str, **attributes) -> Iterator:
+        """Run a block inside a span that is a child of the current span
+
+        :param name: Span name, e.g. anaplan.upload.chunk
+        :type name: str
+        :param attributes: Span attributes, None values are omitted
+        :return: Span object, supporting set_attribute
+        """
+        attributes = {key: value for key, value in attributes.items() if value is not None}
+        with cls.get_tracer().start_as_current_span(name, attributes=attributes) as span:
+            yield span
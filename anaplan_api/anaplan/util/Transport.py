@@ -0,0 +1,44 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, ContextManager, Iterator, Optional, Protocol, runtime_checkable
+
+if TYPE_CHECKING:
+    import requests
+    from .RetryPolicy import RetryPolicy
+
+
+@runtime_checkable
+class Transport(Protocol):
+    """Interface the library uses to talk to Anaplan. RequestHandler is the network implementation;
+    any object providing these methods can be set on an AnaplanConnection instead."""
+
+    def make_request(
+        self,
+        endpoint: str,
+        method: str = "GET",
+        data=None,
+        headers=None,
+        override_url=None,
+        retry_policy: Optional[RetryPolicy] = None,
+        idempotent: Optional[bool] = None,
+        stream: bool = False,
+        cache: bool = False,
+        context: Optional[dict] = None,
+    ) -> requests.Response:
+        """Send a request and return the successful response"""
+
+    def stream_request(
+        self,
+        endpoint: str,
+        method: str = "GET",
+        data=None,
+        headers=None,
+        override_url=None,
+        block_size: int = 1024**2,
+        retry_policy: Optional[RetryPolicy] = None,
+        idempotent: Optional[bool] = None,
+        context: Optional[dict] = None,
+    ) -> ContextManager[Iterator[bytes]]:
+        """Send a request and iterate over the response body in byte blocks"""
+
+    def get_json(self, endpoint: str, headers=None, override_url=None, **kwargs):
+        """GET an endpoint and return the parsed JSON body"""
@@ -0,0 +1,92 @@
+import hashlib
+import tracemalloc
+import zlib
+import pytest
+from anaplan_api.anaplan.StreamUpload import StreamUpload
+from anaplan_api.anaplan.UploadSource import MemorySource
+from anaplan_api.anaplan.fake.FakeAnaplan import FakeAnaplan
+from anaplan_api.anaplan.models.AnaplanConnection import AnaplanConnection
+from anaplan_api.anaplan.models.AuthToken import AuthToken
+
+MB = 1024**2
+CHUNK_MB = 2
+ROW = "1000001,Product with an accented name é,North region,2024-01-01,12345.67\n"
+# Allocations that do not grow with the chunk size: compressor state, threads and request bookkeeping
+FIXED_OVERHEAD = 1 * MB
+
+
+class DigestingAnaplan(FakeAnaplan):
+    """Backend that keeps a hash of each chunk instead of its data, so the upload's own allocations
+    are all that tracemalloc sees"""
+
+    def __init__(self):
+        super().__init__()
+        self.digests = {}
+        self.compressed_sizes = {}
+
+    def _put_chunk(self, data, headers, ws, model, file, chunk, **kwargs):
+        decompressor = zlib.decompressobj(wbits=31)
+        content_hash = hashlib.sha256()
+        pending = data
+        while pending:
+            content_hash.update(decompressor.decompress(pending, 64 * 1024))
+            pending = decompressor.unconsumed_tail
+        self.digests[int(chunk)] = content_hash.hexdigest()
+        self.compressed_sizes[int(chunk)] = len(data)
+        self._file(ws, model, file).chunks[int(chunk)] = b""
+        return 204, {}, b""
+
+
+@pytest.fixture
+def backend():
+    return DigestingAnaplan()
+
+
+@pytest.fixture
+def upload(backend):
+    user_id = backend.add_user("user@example.com", "password")
+    backend.add_file("WS", "M", "F1", "data.csv")
+    conn = AnaplanConnection(AuthToken(backend.issue_token(user_id), 0), "WS", "M", backend.transport())
+    return StreamUpload(conn, "F1")
+
+
+def expected_digests(data: bytes, chunk_size: int) -> dict:
+    return {
+        i: hashlib.sha256(data[start : start + chunk_size]).hexdigest()
+        for i, start in enumerate(range(0, len(data), chunk_size))
+    }
+
+
+def peak_overhead(send) -> int:
+    """Run an upload and measure its peak memory above what was allocated before it started"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        send()
+        return tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("kind", ["str", "bytes"])
+def test_in_memory_upload_holds_about_one_chunk(backend, upload, kind):
+    text = ROW * (48 * MB // len(ROW.encode("utf-8")))
+    data = text if kind == "str" else text.encode("utf-8")
+
+    overhead = peak_overhead(lambda: upload.upload(CHUNK_MB, data))
+
+    encoded = data.encode("utf-8") if kind == "str" else data
+    assert backend.digests == expected_digests(encoded, CHUNK_MB * MB)
+    assert overhead <= CHUNK_MB * MB + max(backend.compressed_sizes.values()) + FIXED_OVERHEAD
+
+
+def test_memory_source_bytes_are_not_copied():
+    data = bytes(range(256)) * (16 * MB // 256)
+    source = MemorySource(data)
+
+    def read():
+        for chunk in source.chunks(CHUNK_MB * MB):
+            assert chunk.obj is data
+
+    assert peak_overhead(read) < 64 * 1024